@@ -0,0 +1,77 @@
+"""Throughput of several processes writing the same database.
+
+Starts --writers processes that each add --operations to-dos one at a time,
+completing every other one, then checks that no write was lost and prints
+the writes per second and the writes that failed with a locked database.
+
+    $ python -m benchmarks.bench_concurrency [--writers N] [--operations N]
+"""
+
+import argparse
+import collections
+import multiprocessing
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Tuple
+
+
+def write(args: Tuple[Path, int, int]) -> collections.Counter:
+    """Add operations to-dos from one process and count the error codes."""
+    from udo.database import DatabaseHandler
+
+    db_path, writer, operations = args
+    handler = DatabaseHandler(db_path)
+    errors = collections.Counter()
+    for number in range(operations):
+        response = handler.write_todos([
+            {"description": f"writer {writer} todo {number}", "due": datetime.now()}
+        ])
+        errors[response.error] += 1
+        if number % 2 and response.error == 0:
+            errors[handler.update_todo(response.todo_list[0]["id"], done=1).error] += 1
+    return errors
+
+
+def main() -> None:
+    from udo import ERRORS, SUCCESS
+    from udo.database import DatabaseHandler, dispose_engines, init_database
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=200)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "_todo.sqlite"
+        init_database(db_path)
+        dispose_engines()
+
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(options.writers) as pool:
+            # start the interpreters before the clock
+            pool.map(abs, range(options.writers))
+            start = time.perf_counter()
+            results = pool.map(
+                write, [(db_path, writer, options.operations) for writer in range(options.writers)]
+            )
+            elapsed = time.perf_counter() - start
+
+        errors = sum(results, collections.Counter())
+        rows = len(DatabaseHandler(db_path).read_todos().todo_list) - 1
+        dispose_engines()
+
+    expected = options.writers * options.operations
+    writes = sum(errors.values())
+    print(f"{options.writers} writers x {options.operations} to-dos in {elapsed:.2f} s")
+    print(f"{writes / elapsed:.0f} writes/s, {rows} of {expected} to-dos stored")
+    for code, count in sorted(errors.items()):
+        if code != SUCCESS:
+            print(f"{count} writes failed: {ERRORS[code]}")
+    if rows != expected:
+        raise SystemExit("writes were lost")
+
+
+if __name__ == "__main__":
+    main()
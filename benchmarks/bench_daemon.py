@@ -0,0 +1,91 @@
+"""Latency of the CLI with and without the resident daemon.
+
+Times `rptodo add` and `rptodo list` in fresh interpreters, first in-process
+and then with `rptodo daemon` serving the same database, and the latency of
+a single request on a warm client against a warm in-process Todoer.
+
+    $ python -m benchmarks.bench_daemon [--runs N] [--rows N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_startup import COMMANDS, run_cli, time_command
+
+
+def request_latency(env, db_path: Path, runs: int) -> dict:
+    """Median seconds of get_sorted_todo_list, in-process and via the daemon."""
+    code = (
+        "import statistics, sys, time\n"
+        "from pathlib import Path\n"
+        "from udo.daemon import DaemonTodoer\n"
+        "from udo.udo import Todoer\n"
+        "db_path = Path(sys.argv[1])\n"
+        "for todoer in (Todoer(db_path), DaemonTodoer.connect(db_path)):\n"
+        "    todoer.get_sorted_todo_list(False)\n"
+        "    timings = []\n"
+        "    for _ in range(int(sys.argv[2])):\n"
+        "        start = time.perf_counter()\n"
+        "        todoer.get_sorted_todo_list(False)\n"
+        "        timings.append(time.perf_counter() - start)\n"
+        "    print(statistics.median(timings))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code, str(db_path), str(runs)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return {"in-process": float(output[0]), "daemon": float(output[1])}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {**os.environ, "XDG_CONFIG_HOME": tmp_dir, "HOME": tmp_dir}
+        db_path = Path(tmp_dir) / "_todo.sqlite"
+        run_cli(["-m", "udo", "init", "--db-path", str(db_path)], env)
+        source = Path(tmp_dir) / "todos.jsonl"
+        source.write_text("".join(
+            f'{{"description": "todo {i}", "due": "tomorrow"}}\n'
+            for i in range(options.rows)
+        ))
+        run_cli(["-m", "udo", "import", str(source)], env)
+
+        cli_timings = {}
+        for name in ("add", "list"):
+            cli_timings[name] = [time_command(COMMANDS[name], env, options.runs)]
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "udo", "daemon"],
+            env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            socket_path = Path(tmp_dir) / "rptodo" / "daemon.sock"
+            while not socket_path.exists():
+                time.sleep(0.01)
+            for name in ("add", "list"):
+                cli_timings[name].append(time_command(COMMANDS[name], env, options.runs))
+            latency = request_latency(env, db_path, options.runs)
+        finally:
+            run_cli(["-m", "udo", "daemon", "--stop"], env)
+            server.wait(10)
+
+    print(f"{'':<22} {'in-process':>12} {'daemon':>12}")
+    for name, (local, served) in cli_timings.items():
+        print(f"{'rptodo ' + name:<22} {local * 1000:9.1f} ms {served * 1000:9.1f} ms")
+    print(
+        f"{'warm list request':<22} {latency['in-process'] * 1000:9.2f} ms "
+        f"{latency['daemon'] * 1000:9.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Throughput of the due date parser.
+
+Parses --count due strings with parse_due, first the words the old
+dictionary-and-ToDoDate parser understands, next to that parser, and then
+a mix of the whole grammar, and prints the strings per second of each.
+
+    $ python -m benchmarks.bench_due [--count N]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+from typing import Callable, List
+
+# words the old parser reaches without relativedelta
+LEGACY_WORDS = [
+    "today", "td", "tomorrow", "tm", "week", "wk", "mon", "Friday", "sunday", "05", "17", "28",
+]
+MIXED_WORDS = LEGACY_WORDS + [
+    "next fri", "next month", "in 3 days", "+2w", "end of month", "eoy", "mar", "2027",
+    "2024-05-03", "2024-05-03T08:15",
+]
+# the map_options table of the old parser, for the words above
+MAP_OPTIONS = {
+    "today": "today",
+    "tomorrow": "tomorrow",
+    **{weekday: "day" for weekday in ("mon", "tue", "wed", "thu", "fri", "sat", "sun")},
+    "week": "this_week",
+    **{f"{date:02}": "date" for date in range(1, 32)},
+}
+
+
+def legacy_sort_due(due: str) -> datetime:
+    """The parser before parse_due: chained lookups and a ToDoDate per call."""
+    from udo.due_options import ToDoDate, due_options, map_weekday
+
+    val = due_options[due]
+    mapped = MAP_OPTIONS[val]
+    if mapped == "today":
+        return ToDoDate().due_today()
+    elif mapped == "tomorrow":
+        return ToDoDate().due_tomorrow()
+    elif mapped == "day":
+        return ToDoDate().due_weekday(map_weekday(val))
+    elif mapped == "this_week":
+        return ToDoDate().due_weekday(7)
+    return ToDoDate().due_date(int(val))
+
+
+def throughput(parse: Callable[[str], datetime], strings: List[str]) -> float:
+    start = time.perf_counter()
+    for due in strings:
+        parse(due)
+    return len(strings) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    from udo.due_options import parse_due
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    options = parser.parse_args()
+
+    rng = random.Random(0)
+    legacy = [rng.choice(LEGACY_WORDS) for _ in range(options.count)]
+    mixed = [rng.choice(MIXED_WORDS) for _ in range(options.count)]
+    now = datetime.now()
+    cases = [
+        ("legacy words, old parser", legacy_sort_due, legacy),
+        ("legacy words, parse_due", parse_due, legacy),
+        ("legacy words, parse_due(now=)", lambda due: parse_due(due, now), legacy),
+        ("mixed grammar, parse_due", parse_due, mixed),
+    ]
+    for name, parse, strings in cases:
+        print(f"{name:<32} {throughput(parse, strings):12,.0f} strings/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark the time bucketing behind `rptodo list`.
+
+Fills an in-memory database with N to-dos spread over the listed window and
+times `DBFiteredResponse`. The cost per row should stay flat as N grows and
+every run should issue a single SELECT, whatever the number of buckets.
+
+    $ python -m benchmarks.bench_list [N ...]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import sqlalchemy as sqla
+from sqlalchemy.orm import Session
+
+from udo import SUCCESS
+from udo.database import Base, DBFiteredResponse, ToDo
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def fill(engine, size: int, now: datetime) -> None:
+    rng = random.Random(size)
+    rows = [
+        {
+            "description": f"todo {i}",
+            "priority": rng.randint(1, 3),
+            "done": 0,
+            "progress": 0,
+            "due": now + timedelta(days=rng.uniform(-60, 365)),
+        }
+        for i in range(size)
+    ]
+    with engine.begin() as connection:
+        connection.execute(sqla.insert(ToDo), rows)
+
+
+def run(size: int) -> tuple:
+    now = datetime.now()
+    engine = sqla.create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    fill(engine, size, now)
+
+    statements = []
+    sqla.event.listen(
+        engine, "before_cursor_execute",
+        lambda *args: statements.append(args[2])
+    )
+    with Session(engine) as session:
+        start = time.perf_counter()
+        DBFiteredResponse(session.query(ToDo).where(ToDo.done == 0), SUCCESS, now)
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed, len(statements)
+
+
+def main(sizes) -> None:
+    print(f"{'rows':>10} {'seconds':>10} {'us/row':>8} {'queries':>8}")
+    for size in sizes:
+        elapsed, queries = run(size)
+        print(f"{size:>10} {elapsed:>10.4f} {elapsed / size * 1e6:>8.2f} {queries:>8}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
@@ -0,0 +1,76 @@
+"""Benchmark the peak memory of reading the to-do list.
+
+Compares the list reads, which select the TodoRow columns with SQLAlchemy
+Core, against the former path that hydrated every ToDo through the ORM and
+copied it with as_dict. Peak memory is measured with tracemalloc, so it
+covers the Python allocations of each read and not the SQLite page cache.
+
+    $ python -m benchmarks.bench_memory [100k 1m ...]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+from benchmarks.generate import SIZES
+
+DEFAULT_SIZES = ("100k", "1m")
+
+
+def orm_read(db_path: Path) -> Callable:
+    """The read path before TodoRow: ORM objects copied into dicts."""
+    from udo.database import DatabaseHandler, ToDo
+
+    handler = DatabaseHandler(db_path)
+
+    def read():
+        with handler._session() as session:
+            return [todo.as_dict() for todo in session.query(ToDo).all()]
+
+    return read
+
+
+def rows_read(db_path: Path) -> Callable:
+    from udo.database import DatabaseHandler
+
+    handler = DatabaseHandler(db_path)
+    return lambda: handler.read_todos().todo_list
+
+
+def measure(read: Callable) -> Tuple[float, int, int]:
+    """Return the seconds, the peak and the retained bytes of one read."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    todo_list = read()
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del todo_list
+    return elapsed, peak, retained
+
+
+def main(sizes) -> None:
+    from benchmarks.run import dataset
+    from udo.database import dispose_engines, get_db_uri_by_path, get_engine_by_uri
+
+    print(f"{'rows':>9} {'path':>5} {'seconds':>8} {'peak MiB':>9} {'kept MiB':>9}")
+    for name in sizes:
+        size = SIZES.get(name.lower()) or int(name)
+        db_path = dataset(size, 0)
+        # create the engine first, so that its setup is not measured
+        get_engine_by_uri(get_db_uri_by_path(db_path))
+        for label, path in (("orm", orm_read), ("rows", rows_read)):
+            elapsed, peak, retained = measure(path(db_path))
+            print(
+                f"{size:>9} {label:>5} {elapsed:>8.2f} "
+                f"{peak / 2**20:>9.1f} {retained / 2**20:>9.1f}"
+            )
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or DEFAULT_SIZES)
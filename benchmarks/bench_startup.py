@@ -0,0 +1,113 @@
+"""Cold-start budget for the `rptodo` CLI.
+
+Runs `--version`, `add` and `list` in fresh interpreters against a throwaway
+config directory and reports the median wall-clock time of each, next to the
+heaviest imports reported by `python -X importtime`. Exits with status 1 when
+a command goes over its budget.
+
+    $ python -m benchmarks.bench_startup [--runs N] [--top N] [--scale X]
+"""
+
+import argparse
+import fcntl
+import os
+import pty
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import termios
+import time
+from pathlib import Path
+
+# seconds, median of the runs
+BUDGETS = {
+    "--version": 0.25,
+    "add": 1.00,
+    "list": 1.00,
+}
+
+COMMANDS = {
+    "--version": ["--version"],
+    "add": ["add", "Benchmark", "to-do", "--due", "tomorrow"],
+    "list": ["list"],
+}
+
+
+def run_cli(args, env, stderr=subprocess.DEVNULL) -> subprocess.CompletedProcess:
+    # `list` sizes its output after the terminal, so give it one
+    master, slave = pty.openpty()
+    fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", 40, 120, 0, 0))
+    try:
+        return subprocess.run(
+            [sys.executable, *args],
+            env=env,
+            stdin=slave,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+            check=True,
+        )
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def time_command(args, env, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_cli(["-m", "udo", *args], env)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def heaviest_imports(args, env, top: int) -> list:
+    """Return the top cumulative import times (us) of a command."""
+    with tempfile.TemporaryFile() as stderr:
+        run_cli(["-X", "importtime", "-m", "udo", *args], env, stderr=stderr)
+        stderr.seek(0)
+        lines = stderr.read().decode().splitlines()
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # only top-level imports, nested ones are part of their parent
+        if name.startswith(" ") and not name.startswith("  "):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument(
+        "--scale", type=float, default=1.0,
+        help="Multiply the budgets, for slower or faster machines."
+    )
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {**os.environ, "XDG_CONFIG_HOME": tmp_dir, "HOME": tmp_dir}
+        db_path = Path(tmp_dir) / "_todo.sqlite"
+        run_cli(["-m", "udo", "init", "--db-path", str(db_path)], env)
+
+        failed = False
+        for name, args in COMMANDS.items():
+            elapsed = time_command(args, env, options.runs)
+            budget = BUDGETS[name] * options.scale
+            over = elapsed > budget
+            failed |= over
+            print(
+                f"{name:<10} {elapsed * 1000:8.1f} ms  "
+                f"budget {budget * 1000:6.0f} ms  {'OVER' if over else 'ok'}"
+            )
+            for cumulative, module in heaviest_imports(args, env, options.top):
+                print(f"{'':<12}{cumulative / 1000:8.1f} ms  {module}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Deterministic synthetic to-do databases for the benchmarks.
+
+The same size, seed and reference time always give the same rows. Due dates
+are spread over the list buckets the way a real list is: a tail of overdue
+work, a bulk of tasks in the coming weeks and a few far in the future.
+
+    $ python -m benchmarks.generate SIZE PATH [--seed N]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+import random
+from typing import Dict, Iterator, Optional
+
+SIZES = {
+    "1k": 1_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+# (share, lowest and highest offset in days from now)
+DUE_SPREAD = (
+    (0.15, -120, 0),
+    (0.10, 0, 2),
+    (0.30, 2, 30),
+    (0.35, 30, 330),
+    (0.10, 330, 365),
+)
+PRIORITY_WEIGHTS = (0.2, 0.6, 0.2)
+DONE_SHARE = 0.3
+
+WORDS = (
+    "call", "write", "review", "fix", "plan", "buy", "send", "read", "clean",
+    "book", "pay", "update", "report", "email", "draft", "release", "meet",
+    "prepare", "check", "order", "the", "a", "new", "weekly", "team", "budget",
+)
+
+BATCH_SIZE = 10_000
+
+
+def reference_time() -> datetime:
+    """Today at noon, so runs of the same day share their due dates."""
+    return datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def rows(size: int, seed: int = 0, now: Optional[datetime] = None) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    now = now or reference_time()
+    shares = [share for share, _, _ in DUE_SPREAD]
+    for _ in range(size):
+        _, low, high = rng.choices(DUE_SPREAD, shares)[0]
+        due = now + timedelta(days=rng.uniform(low, high))
+        done = 1 if rng.random() < DONE_SHARE else 0
+        yield {
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(2, 9))),
+            "priority": rng.choices((1, 2, 3), PRIORITY_WEIGHTS)[0],
+            "done": done,
+            "progress": 100 if done else rng.choice((0, 0, 10, 25, 50, 75)),
+            "due": due.replace(hour=23, minute=59, second=59, microsecond=0),
+        }
+
+
+def generate(db_path: Path, size: int, seed: int = 0, now: Optional[datetime] = None) -> Path:
+    """Create db_path with size generated to-dos, using bulk inserts."""
+    from udo import SUCCESS
+    from udo.database import DatabaseHandler, init_database
+    from udo.transfer import batched
+
+    if db_path.exists():
+        raise FileExistsError(db_path)
+    init_database(db_path)
+    handler = DatabaseHandler(db_path)
+    # drop the dummy to-do init_database adds, so the size is exact
+    handler.delete_all()
+    response = handler.write_todo_batches(batched(rows(size, seed, now), BATCH_SIZE))
+    if response.error != SUCCESS:
+        raise RuntimeError(f"writing {db_path} failed after {response.count} rows")
+    return db_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("size", help=f"number of rows or one of {', '.join(SIZES)}")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args()
+    size = SIZES.get(options.size.lower()) or int(options.size)
+    generate(options.path, size, options.seed)
+
+
+if __name__ == "__main__":
+    main()
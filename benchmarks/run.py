@@ -0,0 +1,173 @@
+"""Benchmark suite for the Todoer operations and the `rptodo list` render.
+
+Each size gets a generated database (cached in benchmarks/.data) copied to
+a scratch file, since some operations write. Every operation is timed
+--repeat times and the median is kept. Results are written as JSON, and
+--compare flags the operations slower than a saved baseline by more than
+--threshold.
+
+    $ python -m benchmarks.run [--sizes 1k,100k] [--save results.json]
+    $ python -m benchmarks.run --compare baseline.json [--threshold 0.25]
+"""
+
+import argparse
+import contextlib
+from datetime import datetime
+import io
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+from benchmarks.generate import SIZES, generate
+
+DATA_DIR = Path(__file__).parent / ".data"
+
+
+def dataset(size: int, seed: int) -> Path:
+    """Return the cached database of size rows, generating it if needed."""
+    DATA_DIR.mkdir(exist_ok=True)
+    day = datetime.now().strftime("%Y%m%d")
+    path = DATA_DIR / f"todos-{size}-{seed}-{day}.sqlite"
+    if not path.exists():
+        scratch = path.with_suffix(".tmp")
+        for stale in DATA_DIR.glob(scratch.name + "*"):
+            stale.unlink()
+        generate(scratch, size, seed)
+        _checkpoint(scratch)
+        scratch.rename(path)
+    return path
+
+
+def _checkpoint(db_path: Path) -> None:
+    """Fold the WAL into the database file so that it can be copied alone."""
+    from udo.database import dispose_engines
+
+    dispose_engines()
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA journal_mode=DELETE")
+    connection.close()
+
+
+def median_time(function: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        # the CLI prints as it goes
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def render_list(db_path: Path) -> Callable:
+    from typer.testing import CliRunner
+    from udo import cli, config
+
+    config_file = db_path.with_name(db_path.name + ".ini")
+    config_file.write_text(f"[General]\ndatabase = {db_path}\nuri = sqlite:///{db_path}\n")
+    runner = CliRunner()
+
+    def render():
+        config_file_path = config.CONFIG_FILE_PATH
+        config.CONFIG_FILE_PATH = config_file
+        try:
+            result = runner.invoke(cli.app, ["list"], env={"COLUMNS": "120"})
+        finally:
+            config.CONFIG_FILE_PATH = config_file_path
+        if result.exit_code != 0:
+            raise RuntimeError(result.output)
+
+    return render
+
+
+def bench_size(size: int, seed: int, repeat: int) -> Dict[str, float]:
+    from udo.database import dispose_engines
+    from udo.udo import Todoer
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir) / "_todo.sqlite"
+        shutil.copyfile(dataset(size, seed), db_path)
+        todoer = Todoer(db_path)
+        rng = random.Random(seed)
+        removable = iter(range(size, 0, -1))
+
+        cases = {
+            "add": lambda: todoer.add(["benchmark", "task"], 2, 0, "tomorrow"),
+            "get_todo_list": todoer.get_todo_list,
+            "get_sorted_todo_list": lambda: todoer.get_sorted_todo_list(False),
+            "stats": todoer.stats,
+            "update": lambda: todoer.update(rng.randint(1, size), priority=3),
+            "set_done": lambda: todoer.set_done(rng.randint(1, size)),
+            "remove": lambda: todoer.remove(next(removable)),
+            "list_render": render_list(db_path),
+        }
+        results = {name: median_time(case, repeat) for name, case in cases.items()}
+        # this one empties the database, so it runs once and last
+        results["remove_all"] = median_time(todoer.remove_all, 1)
+        dispose_engines()
+    return results
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> list:
+    """Return (size, operation, baseline, current) for every regression."""
+    regressions = []
+    for size, operations in results["results"].items():
+        for name, current in operations.items():
+            previous = baseline["results"].get(size, {}).get(name)
+            if previous is not None and current > previous * (1 + threshold):
+                regressions.append((size, name, previous, current))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1k,100k", help=f"comma separated, of {', '.join(SIZES)} or row counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    options = parser.parse_args()
+
+    results = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": options.seed,
+            "repeat": options.repeat,
+        },
+        "results": {},
+    }
+    for name in options.sizes.split(","):
+        size = SIZES.get(name.strip().lower()) or int(name)
+        results["results"][str(size)] = bench_size(size, options.seed, options.repeat)
+
+    output = json.dumps(results, indent=2)
+    if options.save:
+        options.save.write_text(output + "\n")
+    print(output)
+
+    if options.compare:
+        regressions = compare(results, json.loads(options.compare.read_text()), options.threshold)
+        for size, name, previous, current in regressions:
+            print(
+                f"REGRESSION {name} at {size} rows: {previous * 1000:.2f} ms -> "
+                f"{current * 1000:.2f} ms (+{(current / previous - 1) * 100:.0f}%)",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,9 @@ from udo import (
 )
 
 import os
+import shutil
+import tempfile
+from pathlib import Path
 
 import sqlalchemy as sqla
 from sqlalchemy import String, Engine, DateTime
@@ -74,4 +77,31 @@ class BaseTest:
     def teardown_class(self):
         self.session.rollback()
         self.session.close()
-        Base.metadata.drop_all(self.engine)
\ No newline at end of file
+        Base.metadata.drop_all(self.engine)
+
+
+class HandlerTest:
+    """Runs each test against a fresh database created by init_database."""
+
+    def setup_method(self):
+        from udo import config, database
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = Path(self.tmp_dir) / "_todo.sqlite"
+        assert database.init_database(self.db_path) == SUCCESS
+        self.handler = database.DatabaseHandler(self.db_path)
+
+        # point the CLI at the test database
+        self.config_file_path = config.CONFIG_FILE_PATH
+        config.CONFIG_FILE_PATH = Path(self.tmp_dir) / "config.ini"
+        config.CONFIG_FILE_PATH.write_text(
+            f"[General]\ndatabase = {self.db_path}\n"
+            f"uri = {database.get_db_uri_by_path(self.db_path)}\n"
+        )
+
+    def teardown_method(self):
+        from udo import config, database
+
+        config.CONFIG_FILE_PATH = self.config_file_path
+        database.dispose_engines()
+        shutil.rmtree(self.tmp_dir)
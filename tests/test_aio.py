@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from udo import SUCCESS
+from udo.aio import AsyncDatabaseHandler, AsyncTodoer, DatabaseWorker
+from udo.udo import CurrentTodo
+
+from tests.setup import HandlerTest
+
+
+def test_worker_does_not_block_loop():
+
+    async def main():
+        worker = DatabaseWorker()
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        await asyncio.gather(*(worker.run(time.sleep, 0.05) for _ in range(4)))
+        beat.cancel()
+        await worker.aclose()
+        return ticks
+
+    # 0.2s of blocking calls ran while the loop kept ticking
+    assert asyncio.run(main()) >= 10
+
+
+def test_worker_bounded_queue():
+
+    async def main():
+        worker = DatabaseWorker(queue_size=2)
+        results = await asyncio.gather(*(worker.run(lambda i=i: i * i) for i in range(50)))
+        await worker.aclose()
+        return results
+
+    assert asyncio.run(main()) == [i * i for i in range(50)]
+
+
+class TestAsyncTodoer(HandlerTest):
+
+    def test_concurrent_adds(self):
+
+        async def main():
+            async with AsyncTodoer(self.db_path) as todoer:
+                added = await asyncio.gather(*(
+                    todoer.add([f"task {i}"], 1, 0, "tomorrow") for i in range(100)
+                ))
+                return added, await todoer.get_todo_list(), await todoer.get_sorted_todo_list(False)
+
+        added, todo_list, sorted_list = asyncio.run(main())
+        assert all(isinstance(result, CurrentTodo) and result.error == SUCCESS for result in added)
+        assert len(todo_list) == 101
+        assert len(dict(sorted_list)["tomorrow"]) == 100
+
+    def test_updates(self):
+
+        async def main():
+            async with AsyncTodoer(self.db_path) as todoer:
+                await todoer.add(["task"])
+                done = await todoer.set_done(2)
+                updated = await todoer.update(2, ["renamed"], priority=3)
+                removed = await todoer.remove(1)
+                cleared = await todoer.remove_all()
+                return done, updated, removed, cleared, await todoer.get_todo_list()
+
+        done, updated, removed, cleared, todo_list = asyncio.run(main())
+        assert done.todo["done"] == 1
+        assert updated.todo["description"] == "renamed"
+        assert updated.todo["priority"] == 3
+        assert removed.todo["description"] == "Dummy ToDo"
+        assert cleared.error == SUCCESS
+        assert todo_list == []
+
+    def test_handler(self):
+
+        async def main():
+            async with AsyncDatabaseHandler(self.db_path) as handler:
+                return await handler.read_todos()
+
+        response = asyncio.run(main())
+        assert response.error == SUCCESS
+        assert response.todo_list[0].description == "Dummy ToDo"
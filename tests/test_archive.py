@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from typer.testing import CliRunner
+
+from udo import SUCCESS, cli
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+class TestArchive(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        self.now = datetime.now()
+        self.handler.delete_todo(1)
+        self.handler.write_todos([
+            {"description": "old report", "done": 1, "due": self.now - timedelta(days=90)},
+            {"description": "old open report", "due": self.now - timedelta(days=90)},
+            {"description": "recent report", "done": 1, "due": self.now - timedelta(days=2)},
+            {"description": "last report", "done": 1, "due": self.now - timedelta(days=60)},
+        ])
+
+    def list_ids(self, completed):
+        return sorted(row.id for _, row in self.handler.stream_sorted_todos(completed))
+
+    def test_archive_moves_old_completed(self):
+        response = self.handler.archive_todos(self.now - timedelta(days=30), batch_size=1)
+        assert response == (2, SUCCESS)
+        assert [todo.id for todo in self.handler.read_todos().todo_list] == [3, 4]
+        assert self.list_ids(completed=False) == [3]
+        assert self.list_ids(completed=True) == [2, 3, 4, 5]
+        assert self.handler.archive_todos(self.now - timedelta(days=30)) == (0, SUCCESS)
+
+    def test_ids_are_not_reused(self):
+        self.handler.archive_todos(self.now - timedelta(days=30))
+        todo_list = self.handler.write_todos([{"description": "new", "due": self.now}]).todo_list
+        assert todo_list[0]["id"] == 6
+
+    def test_reads_union_the_archive(self):
+        self.handler.archive_todos(self.now - timedelta(days=30))
+        sorted_ids = [
+            todo.id
+            for _, todo_list in self.handler.read_and_sort_todos(True).todo_list
+            for todo in todo_list
+        ]
+        assert sorted(sorted_ids) == [2, 3, 4, 5]
+        rows = self.handler.query_todos(True, where="description~old", sort="-id").todo_list
+        assert [row.id for row in rows] == [3, 2]
+        assert [todo["id"] for todo in self.handler.stream_todos()] == [2, 3, 4, 5]
+
+        found = self.handler.search_todos("report", completed=True).todo_list
+        assert sorted(todo["id"] for todo in found) == [2, 3, 4, 5]
+        assert [todo["id"] for todo in self.handler.search_todos("report").todo_list] == [3]
+        assert self.handler.rebuild_search_index() == (4, SUCCESS)
+
+    def test_archive_command(self):
+        result = runner.invoke(cli.app, ["archive", "--older-than", "70"])
+        assert result.exit_code == 0, result.output
+        assert "1 to-dos were archived" in result.stdout
+        result = runner.invoke(cli.app, ["list", "--all", "--no-pager"])
+        assert "old report" in result.stdout
+        result = runner.invoke(cli.app, ["list", "--no-pager"])
+        assert "old report" not in result.stdout
@@ -0,0 +1,72 @@
+from datetime import datetime
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+
+from typer.testing import CliRunner
+
+from udo import cli, completion, config
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+class TestCompletion(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        self.handler.write_todos([
+            {"description": f"Water\tthe plants {number}\nagain", "due": datetime.now()}
+            for number in range(11)
+        ])
+
+    def test_complete_from_the_index(self):
+        assert not completion.index_path(self.db_path).exists()
+        completions = completion.complete(self.db_path, "1")
+        assert completion.index_path(self.db_path).exists()
+        assert [todo_id for todo_id, _ in completions] == ["1", "10", "11", "12"]
+        assert completions[1] == ("10", "Water the plants 8 again")
+        assert completion.complete(self.db_path, "3,7-1")[0] == ("3,7-1", "Dummy ToDo")
+        assert completion.complete(self.db_path, "99") == []
+        assert len(completion.complete(self.db_path, "")) == 12
+
+    def test_index_follows_the_writes(self):
+        completion.complete(self.db_path, "")
+        self.handler.write_todos([{"description": "new", "due": datetime.now()}])
+        self.handler.delete_todo(10)
+        self.handler.update_todo(11, description="renamed")
+        self.handler.update_todo(12, priority=1)
+        assert completion.complete(self.db_path, "1") == [
+            ("1", "Dummy ToDo"), ("11", "renamed"), ("12", "Water the plants 10 again"), ("13", "new"),
+        ]
+        self.handler.delete_all()
+        assert completion.complete(self.db_path, "") == []
+
+    def test_shell_completion(self):
+        env = {"_RPTODO_COMPLETE": "complete_bash", "COMP_WORDS": "rptodo update-desc 1", "COMP_CWORD": "2"}
+        result = runner.invoke(cli.app, [], prog_name="rptodo", env=env)
+        assert result.stdout.split() == ["1", "10", "11", "12"]
+        env = {"_RPTODO_COMPLETE": "complete_zsh", "_TYPER_COMPLETE_ARGS": "rptodo remove 2,1"}
+        result = runner.invoke(cli.app, [], prog_name="rptodo", env=env)
+        assert '"2,10":"Water the plants 8 again"' in result.stdout
+
+    def test_does_not_load_the_database_layer(self):
+        completion.complete(self.db_path, "")
+        # the child process finds the test config in its own app directory
+        app_dir = Path(self.tmp_dir) / "rptodo"
+        app_dir.mkdir()
+        shutil.copy(config.CONFIG_FILE_PATH, app_dir / "config.ini")
+        script = (
+            "import sys\n"
+            "from udo import cli\n"
+            "print(len(cli.complete_ids('1')), 'sqlalchemy' in sys.modules)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True, text=True, check=True,
+            env={**os.environ, "XDG_CONFIG_HOME": self.tmp_dir},
+        )
+        assert result.stdout.split() == ["4", "False"]
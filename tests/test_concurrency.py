@@ -0,0 +1,126 @@
+import multiprocessing
+import sqlite3
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sqla
+
+from udo import DB_LOCKED_ERROR, DB_WRITE_ERROR, SUCCESS, concurrency, database
+
+from tests.setup import HandlerTest
+
+WRITERS = 4
+OPERATIONS = 25
+
+
+def busy_error(code=sqlite3.SQLITE_BUSY):
+    error = sqlite3.OperationalError("database is locked")
+    error.sqlite_errorcode = code
+    return sqla.exc.OperationalError("INSERT", {}, error)
+
+
+def test_is_busy():
+    assert concurrency.is_busy(busy_error())
+    assert concurrency.is_busy(busy_error(sqlite3.SQLITE_BUSY_SNAPSHOT))
+    assert concurrency.is_busy(busy_error(sqlite3.SQLITE_LOCKED))
+    assert not concurrency.is_busy(busy_error(sqlite3.SQLITE_CONSTRAINT))
+    assert concurrency.write_error(busy_error()) == DB_LOCKED_ERROR
+    assert concurrency.write_error(sqla.exc.IntegrityError("INSERT", {}, None)) == DB_WRITE_ERROR
+
+
+def test_retry_backs_off_while_busy():
+    calls, delays = [], []
+
+    def call():
+        calls.append(1)
+        if len(calls) < 3:
+            raise busy_error()
+        return "written"
+
+    assert concurrency.retry(call, sleep=delays.append) == "written"
+    assert len(calls) == 3
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= concurrency.FIRST_DELAY
+    assert 0 <= delays[1] <= 2 * concurrency.FIRST_DELAY
+
+
+def test_retry_gives_up():
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise busy_error()
+
+    with pytest.raises(sqla.exc.OperationalError):
+        concurrency.retry(call, attempts=3, sleep=lambda delay: None)
+    assert len(calls) == 3
+
+    def fail():
+        calls.append(1)
+        raise sqla.exc.IntegrityError("INSERT", {}, None)
+
+    calls.clear()
+    with pytest.raises(sqla.exc.IntegrityError):
+        concurrency.retry(fail, sleep=lambda delay: None)
+    assert len(calls) == 1
+
+
+def write(args):
+    """Add OPERATIONS to-dos, completing every other one, in a new process."""
+    db_path, writer = args
+    handler = database.DatabaseHandler(db_path)
+    errors = []
+    for number in range(OPERATIONS):
+        response = handler.write_todos([
+            {"description": f"writer {writer} todo {number}", "due": datetime(2024, 1, 1)}
+        ])
+        errors.append(response.error)
+        if number % 2 and response.error == SUCCESS:
+            errors.append(handler.update_todo(response.todo_list[0]["id"], done=1).error)
+    return errors
+
+
+class TestConcurrentWrites(HandlerTest):
+
+    def test_writers_begin_immediate(self):
+        engine = database.get_engine_by_uri(database.get_db_uri_by_path(self.db_path))
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        sqla.event.listen(engine, "before_cursor_execute", listener)
+        try:
+            self.handler.update_todo(1, done=1)
+            self.handler.read_todos()
+        finally:
+            sqla.event.remove(engine, "before_cursor_execute", listener)
+        assert statements[0] == "BEGIN IMMEDIATE"
+        assert statements[2] == "BEGIN"
+
+    def test_locked_database(self, monkeypatch):
+        database.dispose_engines()
+        monkeypatch.setattr(database, "SQLITE_PRAGMAS", ("journal_mode=WAL", "busy_timeout=0"))
+        monkeypatch.setattr(concurrency, "FIRST_DELAY", 0.001)
+        holder = sqlite3.connect(self.db_path, isolation_level=None)
+        holder.execute("BEGIN IMMEDIATE")
+        try:
+            assert self.handler.update_todo(1, done=1).error == DB_LOCKED_ERROR
+            assert self.handler.write_todos([{"description": "x", "due": datetime(2024, 1, 1)}]).error == DB_LOCKED_ERROR
+            # readers are not blocked by the writer
+            assert self.handler.read_todos().error == SUCCESS
+        finally:
+            holder.rollback()
+            holder.close()
+        assert self.handler.update_todo(1, done=1).error == SUCCESS
+
+    def test_no_lost_writes(self):
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(WRITERS) as pool:
+            results = pool.map(write, [(self.db_path, writer) for writer in range(WRITERS)])
+        assert all(error == SUCCESS for errors in results for error in errors)
+
+        todo_list = self.handler.read_todos().todo_list[1:]
+        descriptions = sorted(todo.description for todo in todo_list)
+        assert descriptions == sorted(
+            f"writer {writer} todo {number}"
+            for writer in range(WRITERS) for number in range(OPERATIONS)
+        )
+        assert sum(todo.done for todo in todo_list) == WRITERS * (OPERATIONS // 2)
@@ -0,0 +1,128 @@
+import io
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from udo import cli, daemon
+from udo.udo import CurrentTodo
+
+from tests.setup import HandlerTest
+
+
+def test_frame_round_trip():
+    stream = io.BytesIO()
+    daemon.write_frame(stream, {"op": "ping", "args": [1, "two"]})
+    daemon.write_frame(stream, {"op": "shutdown"})
+    stream.seek(0)
+    assert daemon.read_frame(stream) == {"op": "ping", "args": [1, "two"]}
+    assert daemon.read_frame(stream) == {"op": "shutdown"}
+    assert daemon.read_frame(stream) is None
+
+
+def test_truncated_frame():
+    stream = io.BytesIO(daemon.HEADER.pack(10) + b"{}")
+    with pytest.raises(daemon.DaemonError):
+        daemon.read_frame(stream)
+
+
+class TestDaemon(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        self.socket_path = Path(self.tmp_dir) / "daemon.sock"
+        self.socket_path_default = daemon.SOCKET_PATH
+        daemon.SOCKET_PATH = self.socket_path
+
+    def teardown_method(self):
+        daemon.stop()
+        if hasattr(self, "thread"):
+            self.thread.join(5)
+        daemon.SOCKET_PATH = self.socket_path_default
+        super().teardown_method()
+
+    def start(self):
+        self.thread = threading.Thread(target=daemon.serve, args=(self.db_path,))
+        self.thread.start()
+        for _ in range(100):
+            if daemon.is_running():
+                return
+            time.sleep(0.01)
+        raise AssertionError("daemon did not start")
+
+    def test_client_calls(self):
+        self.start()
+        client = daemon.DaemonTodoer.connect(self.db_path)
+        added = client.add(["Walk", "the", "dog"], 1, 0, "today")
+        assert isinstance(added, CurrentTodo)
+        assert added.todo["description"] == "Walk the dog."
+        assert added.todo["id"] == 2
+        assert [todo.description for todo in client.get_todo_list()] == [
+            "Dummy ToDo", "Walk the dog."
+        ]
+        buckets = dict(client.get_sorted_todo_list(False))
+        assert [todo.description for todo in buckets["today"]] == ["Walk the dog."]
+        assert client.set_done(2).todo["done"] == 1
+        assert client.remove_many([(1, 3)], "done=1") == ([{
+            "id": 2, "description": "Walk the dog.", "priority": 1, "done": 1, "progress": 100
+        }], [[3, 3]], 0)
+        client.close()
+
+    def test_other_database_not_served(self):
+        self.start()
+        assert daemon.DaemonTodoer.connect(Path(self.tmp_dir) / "other.sqlite") is None
+
+    def test_stop_removes_socket(self):
+        self.start()
+        assert daemon.stop()
+        self.thread.join(5)
+        assert not self.thread.is_alive()
+        assert not self.socket_path.exists()
+        assert not daemon.stop()
+
+    def test_refuses_second_daemon(self):
+        self.start()
+        with pytest.raises(daemon.DaemonError):
+            daemon.serve(self.db_path)
+
+    def test_stale_socket_replaced(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(str(self.socket_path))
+        stale.close()
+        assert self.socket_path.exists()
+        assert daemon.DaemonTodoer.connect(self.db_path) is None
+        self.start()
+        assert daemon.is_running()
+
+    def test_cli_uses_daemon(self):
+        assert not isinstance(cli.get_todoer(), daemon.DaemonTodoer)
+        self.start()
+        todoer = cli.get_todoer()
+        assert isinstance(todoer, daemon.DaemonTodoer)
+        todoer.close()
+
+    def test_concurrent_clients(self):
+        self.start()
+        # the first client keeps its connection, as remove does at its prompt
+        first = daemon.DaemonTodoer.connect(self.db_path)
+        assert first.find_todos([(1, 1)], None).todo_list[0]["id"] == 1
+        second = daemon.DaemonTodoer.connect(self.db_path)
+        assert second.set_done(1).todo["done"] == 1
+        assert [todo.done for todo in first.get_todo_list()] == [1]
+        second.close()
+        first.close()
+
+    def test_cli_falls_back_when_the_daemon_does_not_answer(self, monkeypatch):
+        # accepts connections but never replies
+        stuck = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stuck.bind(str(self.socket_path))
+        stuck.listen()
+        monkeypatch.setattr(daemon, "CLIENT_TIMEOUT", 0.1)
+        try:
+            with pytest.raises(daemon.DaemonError):
+                daemon.DaemonTodoer.connect(self.db_path)
+            assert not isinstance(cli.get_todoer(), daemon.DaemonTodoer)
+        finally:
+            stuck.close()
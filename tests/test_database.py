@@ -0,0 +1,229 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+import sqlalchemy as sqla
+from sqlalchemy.orm import Session
+
+from udo import ID_ERROR, SUCCESS
+from udo.database import (
+    Base,
+    DBFiteredResponse,
+    ToDo,
+    dispose_engines,
+    get_db_uri_by_path,
+    get_engine_by_uri,
+)
+from udo.due_options import time_buckets
+
+from tests.setup import HandlerTest
+
+NOW = datetime(2024, 3, 15, 10, 30)
+
+
+def test_time_buckets_sorted():
+    bounds, labels = time_buckets(NOW)
+    assert bounds == sorted(bounds)
+    assert len(bounds) == len(labels)
+    assert labels[0] is None
+    assert labels[1:6] == ["outdated", "today", "tomorrow", "this week", "this month"]
+    assert labels[-1] == "this year"
+    assert labels[labels.index("this month") + 1] == "april"
+
+
+def test_time_buckets_month_bounds():
+    bounds, labels = time_buckets(NOW)
+    end_of_april = datetime(2024, 4, 30, 23, 59, 59)
+    end_of_may = datetime(2024, 5, 31, 23, 59, 59)
+    assert labels[bisect_right(bounds, end_of_april)] == "april"
+    assert labels[bisect_right(bounds, end_of_may)] == "may"
+
+
+class TestFilteredResponse:
+
+    def setup_method(self):
+        self.engine = sqla.create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+
+    def teardown_method(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def add(self, description, due, done=0):
+        self.session.add(ToDo({"description": description, "due": due, "done": done}))
+        self.session.commit()
+
+    def buckets(self, query):
+        response = DBFiteredResponse(query, SUCCESS, now=NOW)
+        assert response.error == SUCCESS
+        return {label: [todo.description for todo in todos]
+                for label, todos in response.todo_list}
+
+    def test_each_row_in_one_bucket(self):
+        self.add("late", NOW - timedelta(days=3))
+        self.add("today", NOW + timedelta(hours=2))
+        self.add("tomorrow", NOW + timedelta(days=1, hours=2))
+        self.add("week", NOW + timedelta(days=4))
+        self.add("month", NOW + timedelta(days=20))
+        self.add("june", datetime(2024, 6, 10))
+        self.add("far", NOW + timedelta(days=400))
+        buckets = self.buckets(self.session.query(ToDo))
+
+        assert buckets["outdated"] == ["late"]
+        assert buckets["today"] == ["today"]
+        assert buckets["tomorrow"] == ["tomorrow"]
+        assert buckets["this week"] == ["week"]
+        assert buckets["this month"] == ["month"]
+        assert buckets["june"] == ["june"]
+        placed = [d for todos in buckets.values() for d in todos]
+        assert sorted(placed) == sorted(["late", "today", "tomorrow", "week", "month", "june"])
+
+    def test_latest_bucket_first(self):
+        labels = list(self.buckets(self.session.query(ToDo)))
+        assert labels[0] == "this year"
+        assert labels[-2:] == ["today", "outdated"]
+
+    def test_completed_filter(self):
+        self.add("open", NOW + timedelta(hours=1))
+        self.add("closed", NOW + timedelta(hours=1), done=1)
+        buckets = self.buckets(self.session.query(ToDo).where(ToDo.done == 0))
+        assert buckets["today"] == ["open"]
+
+
+class TestEngines(HandlerTest):
+
+    def test_engine_reused(self):
+        uri = get_db_uri_by_path(self.db_path)
+        assert get_engine_by_uri(uri) is get_engine_by_uri(uri)
+        self.handler.read_todos()
+        self.handler.write_todos([{"description": "a", "due": NOW}])
+        assert get_engine_by_uri(uri) is get_engine_by_uri(uri)
+
+    def test_pragmas(self):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        with engine.connect() as connection:
+            pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1
+            assert pragma("busy_timeout") == 5000
+
+    def test_sessions_closed(self):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        for _ in range(3):
+            self.handler.read_todos()
+            self.handler.read_and_sort_todos(completed=True)
+        assert engine.pool.checkedout() == 0
+
+    def test_dispose_engines(self):
+        uri = get_db_uri_by_path(self.db_path)
+        engine = get_engine_by_uri(uri)
+        dispose_engines()
+        assert get_engine_by_uri(uri) is not engine
+
+
+class TestSingleStatementWrites(HandlerTest):
+
+    def count_statements(self, call):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        statements = []
+
+        def listener(conn, cursor, statement, *args):
+            # the transaction itself is opened with a statement as well
+            if not statement.startswith("BEGIN"):
+                statements.append(statement)
+
+        sqla.event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = call()
+        finally:
+            sqla.event.remove(engine, "before_cursor_execute", listener)
+        return response, statements
+
+    def without_returning(self, monkeypatch):
+        dialect = get_engine_by_uri(get_db_uri_by_path(self.db_path)).dialect
+        for kind in ("insert", "update", "delete"):
+            monkeypatch.setattr(dialect, f"{kind}_returning", False)
+
+    def test_write_returns_ids(self):
+        response, statements = self.count_statements(lambda: self.handler.write_todos([
+            {"description": "a", "due": NOW}, {"description": "b", "due": NOW},
+        ]))
+        assert response.error == SUCCESS
+        assert [todo["id"] for todo in response.todo_list] == [2, 3]
+        assert len(statements) == 1
+
+    def test_update_returns_row(self):
+        response, statements = self.count_statements(
+            lambda: self.handler.update_todo(1, done=1, progress=100)
+        )
+        assert response == (
+            {"id": 1, "description": "Dummy ToDo", "priority": 2, "done": 1, "progress": 100},
+            SUCCESS,
+        )
+        assert len(statements) == 1
+
+    def test_delete_returns_row(self):
+        response, statements = self.count_statements(lambda: self.handler.delete_todo(1))
+        assert response.todo["description"] == "Dummy ToDo"
+        assert len(statements) == 1
+        assert self.handler.read_todos().todo_list == []
+
+    def test_missing_id(self):
+        assert self.handler.update_todo(5, done=1) == (None, ID_ERROR)
+        assert self.handler.delete_todo(5) == (None, ID_ERROR)
+
+    def test_fallback_without_returning(self, monkeypatch):
+        self.without_returning(monkeypatch)
+        write, statements = self.count_statements(
+            lambda: self.handler.write_todos([{"description": "a", "due": NOW}])
+        )
+        assert write.todo_list[0]["id"] == 2
+        assert len(statements) == 1
+        update, statements = self.count_statements(lambda: self.handler.update_todo(2, priority=3))
+        assert update.todo["priority"] == 3
+        assert len(statements) == 2
+        delete, statements = self.count_statements(lambda: self.handler.delete_todo(2))
+        assert delete.todo["description"] == "a"
+        assert len(statements) == 2
+
+
+class TestStreamedList(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        # spread over several buckets, with due dates shared by some rows
+        now = datetime.now()
+        self.handler.write_todos([
+            {"description": f"task {number}", "due": now + timedelta(days=number % 7 * 5, hours=1)}
+            for number in range(25)
+        ])
+
+    def test_same_order_as_buckets(self):
+        buckets = self.handler.read_and_sort_todos(completed=True).todo_list
+        expected = [(label, todo.id) for label, todos in buckets for todo in todos]
+        streamed = self.handler.stream_sorted_todos(completed=True, page_size=4)
+        assert [(label, todo.id) for label, todo in streamed] == expected
+
+    def test_keyset_pages(self):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        sqla.event.listen(engine, "before_cursor_execute", listener)
+        try:
+            rows = list(self.handler.stream_sorted_todos(completed=False, page_size=4))
+        finally:
+            sqla.event.remove(engine, "before_cursor_execute", listener)
+        assert len(rows) == 26
+        assert len({label for label, _ in rows}) > 2
+        assert any("(todo.due, todo.id) > (?, ?)" in statement for statement in statements)
+
+    def test_limit_and_offset_in_list_order(self):
+        every = [todo.id for _, todo in self.handler.stream_sorted_todos(True, page_size=4)]
+        page = [todo.id for _, todo in self.handler.stream_sorted_todos(True, limit=5, offset=3, page_size=4)]
+        assert page == every[3:8]
+
+    def test_stream_stops_early(self):
+        rows = self.handler.stream_sorted_todos(True, page_size=4)
+        next(rows)
+        rows.close()
+        assert get_engine_by_uri(get_db_uri_by_path(self.db_path)).pool.checkedout() == 0
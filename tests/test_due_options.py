@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+from typer.testing import CliRunner
+
+from udo import cli, due_options
+from udo.due_options import ToDoDate, parse_due, sort_due
+
+runner = CliRunner()
+
+# a Wednesday
+NOW = datetime(2026, 1, 28, 10, 30)
+
+
+def end_of(year, month, day):
+    return datetime(year, month, day, 23, 59, 59)
+
+
+@pytest.mark.parametrize("due, expected", [
+    ("today", end_of(2026, 1, 28)),
+    ("Tomorrow", end_of(2026, 1, 29)),
+    ("wed", end_of(2026, 2, 4)),
+    ("Friday", end_of(2026, 1, 30)),
+    ("week", end_of(2026, 2, 1)),
+    ("month", end_of(2026, 1, 31)),
+    ("mar", end_of(2026, 3, 31)),
+    ("jan", end_of(2026, 1, 31)),
+    ("june", end_of(2026, 6, 30)),
+    ("year", end_of(2026, 12, 31)),
+    ("2031", end_of(2031, 12, 31)),
+    ("30", end_of(2026, 1, 30)),
+    ("05", end_of(2026, 2, 5)),
+    ("29", end_of(2026, 1, 29)),
+    ("next fri", end_of(2026, 2, 6)),
+    ("next  Mon", end_of(2026, 2, 2)),
+    ("next week", end_of(2026, 2, 8)),
+    ("next month", end_of(2026, 2, 28)),
+    ("in 3 days", end_of(2026, 1, 31)),
+    ("+2w", end_of(2026, 2, 11)),
+    ("+1m", end_of(2026, 2, 28)),
+    ("in 1 year", end_of(2027, 1, 28)),
+    ("end of month", end_of(2026, 1, 31)),
+    ("eoy", end_of(2026, 12, 31)),
+    ("2024-05-03", end_of(2024, 5, 3)),
+    ("2024-05-03T08:15", datetime(2024, 5, 3, 8, 15)),
+])
+def test_parse_due(due, expected):
+    assert parse_due(due, NOW) == expected
+
+
+@pytest.mark.parametrize("due", ["someday", "next today", "32", "in days", "2024-13-01", ""])
+def test_not_a_due_date(due):
+    with pytest.raises(ValueError):
+        parse_due(due, NOW)
+
+
+def test_day_of_month_skips_shorter_months():
+    assert parse_due("30", datetime(2026, 2, 10)) == end_of(2026, 3, 30)
+
+
+def test_memoized_per_day():
+    due_options._resolve.cache_clear()
+    parse_due("next fri", NOW)
+    parse_due("Next Fri", NOW.replace(hour=22))
+    assert due_options._resolve.cache_info().hits == 1
+    assert sort_due("next fri", NOW.replace(day=30)) == end_of(2026, 2, 6)
+    assert due_options._resolve.cache_info().misses == 2
+
+
+def test_todo_date_default_is_the_current_time():
+    assert ToDoDate().month == datetime.now().month
+    assert ToDoDate(NOW).date == 28
+
+
+def test_due_option():
+    result = runner.invoke(cli.app, ["add", "x", "--due", "someday"])
+    assert result.exit_code == 2
+    assert "Not a due date" in result.output
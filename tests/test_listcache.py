@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta
+
+from typer.testing import CliRunner
+
+from udo import cli, listcache, udo
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+class Later(datetime):
+    """A clock two minutes ahead, still on the same day but for a minute."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.now(tz) + timedelta(minutes=2)
+
+
+class TestListCache(HandlerTest):
+
+    def list(self, *args):
+        result = runner.invoke(cli.app, ["list", "--cache", *args], env={"COLUMNS": "80"})
+        assert result.exit_code == 0, result.output
+        return result.stdout
+
+    def test_hit_skips_database(self, monkeypatch):
+        first = self.list()
+        assert "Dummy ToDo" in first
+
+        def no_database(*args):
+            raise AssertionError("the database was opened")
+
+        monkeypatch.setattr(udo, "Todoer", no_database)
+        assert self.list() == first
+
+    def test_write_invalidates(self):
+        self.list()
+        self.handler.write_todos([{"description": "fresh", "due": datetime.now()}])
+        assert "fresh" in self.list()
+
+    def test_expires_when_a_todo_changes_bucket(self, monkeypatch):
+        self.handler.write_todos([{"description": "soon", "due": datetime.now() + timedelta(minutes=1)}])
+        first = self.list()
+        opened = []
+        todoer = udo.Todoer
+        monkeypatch.setattr(udo, "Todoer", lambda *args: opened.append(args) or todoer(*args))
+        assert self.list() == first
+        assert not opened
+        # once "soon" is due it is outdated, later the same day
+        monkeypatch.setattr(listcache, "datetime", Later)
+        self.list()
+        assert opened
+
+    def test_next_bucket_change(self):
+        now = datetime(2026, 5, 13, 9)
+        self.handler.delete_todo(1)
+        assert self.handler.next_bucket_change(False, now=now) is None
+        self.handler.write_todos([
+            {"description": "tonight", "due": datetime(2026, 5, 13, 18)},
+            # moves from tomorrow to today at 10:00
+            {"description": "tomorrow", "due": datetime(2026, 5, 14, 10)},
+            {"description": "next week", "due": datetime(2026, 5, 21, 8)},
+        ])
+        assert self.handler.next_bucket_change(False, now=now) == datetime(2026, 5, 13, 10)
+        assert self.handler.next_bucket_change(False, "description~tonight", now) == datetime(2026, 5, 13, 18)
+        assert self.handler.next_bucket_change(False, now=datetime(2026, 5, 13, 19)) is None
+
+    def test_key_parts(self):
+        key = listcache.cache_key(self.db_path, 80, False, date(2024, 1, 1))
+        assert key == listcache.cache_key(self.db_path, 80, False, date(2024, 1, 1))
+        assert key != listcache.cache_key(self.db_path, 100, False, date(2024, 1, 1))
+        assert key != listcache.cache_key(self.db_path, 80, True, date(2024, 1, 1))
+        assert key != listcache.cache_key(self.db_path, 80, False, date(2024, 1, 2))
+
+    def test_store_and_load(self):
+        assert listcache.load("key") is None
+        listcache.store("key", "output\n")
+        assert listcache.load("key") == "output\n"
+        assert listcache.load("other") is None
@@ -0,0 +1,108 @@
+import sqlite3
+
+import sqlalchemy as sqla
+
+from udo import migrations
+from udo.database import Base, get_db_uri_by_path, get_engine_by_uri
+
+from tests.setup import HandlerTest
+
+LEGACY_SCHEMA = """
+CREATE TABLE todo (
+    id INTEGER NOT NULL,
+    description VARCHAR(240) NOT NULL,
+    priority INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    progress INTEGER NOT NULL,
+    due DATETIME NOT NULL,
+    PRIMARY KEY (id)
+)
+"""
+
+
+def index_names(db_path):
+    with sqlite3.connect(db_path) as connection:
+        rows = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'todo'"
+        )
+        return {name for name, in rows}
+
+
+class TestMigrations(HandlerTest):
+
+    def test_new_database_is_current(self):
+        with sqlite3.connect(self.db_path) as connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+        assert version == migrations.SCHEMA_VERSION
+        assert {"ix_todo_done_due", "ix_todo_priority_due"} <= index_names(self.db_path)
+
+    def test_upgrade_legacy_file(self):
+        legacy_path = self.db_path.with_name("legacy.sqlite")
+        with sqlite3.connect(legacy_path) as connection:
+            connection.execute(LEGACY_SCHEMA)
+            connection.execute(
+                "INSERT INTO todo VALUES (1, 'old', 2, 0, 0, '2023-12-31 00:00:00.000000')"
+            )
+        assert index_names(legacy_path) == set()
+
+        engine = get_engine_by_uri(get_db_uri_by_path(legacy_path))
+        with engine.connect() as connection:
+            assert migrations.get_version(connection) == migrations.SCHEMA_VERSION
+            assert connection.exec_driver_sql("SELECT description FROM todo").scalar() == "old"
+        assert {"ix_todo_done_due", "ix_todo_priority_due"} <= index_names(legacy_path)
+        with sqlite3.connect(legacy_path) as connection:
+            sql, = connection.execute("SELECT sql FROM sqlite_master WHERE name = 'todo'").fetchone()
+            matched = connection.execute(
+                "SELECT rowid FROM todo_fts WHERE todo_fts MATCH 'old'"
+            ).fetchall()
+            stats = connection.execute("SELECT day, count FROM todo_stats").fetchall()
+        # todo was copied to add AUTOINCREMENT, the search index still matches
+        assert "AUTOINCREMENT" in sql
+        assert matched == [(1,)]
+        assert stats == [("2023-12-31", 1)]
+
+    def test_migrate_is_idempotent(self):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        assert migrations.migrate(engine, Base.metadata) == migrations.SCHEMA_VERSION
+
+
+class TestQueryPlans(HandlerTest):
+
+    def query_plans(self, call):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        statements = []
+        listener = lambda conn, cursor, statement, parameters, context, many: (
+            statements.append((statement, parameters))
+        )
+        sqla.event.listen(engine, "before_cursor_execute", listener)
+        try:
+            call()
+        finally:
+            sqla.event.remove(engine, "before_cursor_execute", listener)
+
+        plans = []
+        with engine.connect() as connection:
+            for statement, parameters in statements:
+                # the series are read as well, to expand their occurrences,
+                # and the shards, to attach the ones in the window
+                if "todo_series" in statement or "todo_shard" in statement:
+                    continue
+                if statement.lstrip().upper().startswith("SELECT"):
+                    rows = connection.exec_driver_sql(
+                        "EXPLAIN QUERY PLAN " + statement, parameters
+                    )
+                    plans.append(" ".join(row[-1] for row in rows))
+        return plans
+
+    def test_open_todos_use_done_due_index(self):
+        plans = self.query_plans(lambda: self.handler.read_and_sort_todos(completed=False))
+        assert plans
+        for plan in plans:
+            assert "USING INDEX ix_todo_done_due" in plan
+            assert "TEMP B-TREE" not in plan
+
+    def test_all_todos_use_due_index(self):
+        plans = self.query_plans(lambda: self.handler.read_and_sort_todos(completed=True))
+        assert plans
+        for plan in plans:
+            assert "USING INDEX ix_todo_due" in plan
@@ -0,0 +1,83 @@
+import json
+
+from typer.testing import CliRunner
+
+from udo import cli, output, udo
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+def test_pager(tmp_path, monkeypatch):
+    paged = tmp_path / "paged"
+    monkeypatch.setenv("PAGER", f"sh -c 'cat > {paged}'")
+    monkeypatch.setattr(output.sys.stdout, "isatty", lambda: True, raising=False)
+    assert output.write(iter(["one\n", "two\n"]))
+    assert paged.read_text() == "one\ntwo\n"
+
+
+def test_chunked_list():
+    rows = [("today", udo.TodoRow(number, f"task {number}", 2, 0, 0)) for number in range(300)]
+    chunks = list(output.chunked(cli.render_list(iter(rows), 80)))
+    assert len(chunks) > 2
+    assert len(chunks[0]) < len(chunks[1])
+    text = "".join(chunks)
+    assert text.count("TODAY") == 1
+    assert "task 299" in text
+
+
+def test_format_records():
+    records = [{"id": 1, "description": "tab\there"}, {"id": 2, "description": "two\nlines"}]
+    assert list(output.format_records(records, "tsv")) == [
+        "id\tdescription", "1\ttab\\there", "2\ttwo\\nlines"
+    ]
+    assert json.loads("\n".join(output.format_records(records, "json"))) == records
+    assert list(output.format_records([], "json")) == ["[]"]
+
+
+class TestFormatOption(HandlerTest):
+
+    def invoke(self, *args):
+        result = runner.invoke(cli.app, list(args))
+        return result
+
+    def test_list_jsonl(self):
+        self.invoke("add", "Walk", "the", "dog", "--due", "today")
+        result = self.invoke("list", "--all", "--format", "jsonl")
+        assert result.exit_code == 0, result.output
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [record["description"] for record in records] == ["Walk the dog.", "Dummy ToDo"]
+        assert records[0]["bucket"] == "today"
+        assert records[1]["due"] == "2023-12-31 00:00:00"
+        assert "\x1b" not in result.stdout
+
+    def test_sorted_list_tsv(self):
+        result = self.invoke("list", "--all", "--sort", "-id", "--format", "tsv")
+        assert result.stdout.splitlines() == [
+            "id\tdescription\tpriority\tdone\tprogress\tdue\tseries",
+            "1\tDummy ToDo\t2\t0\t0\t2023-12-31 00:00:00\t",
+        ]
+
+    def test_write_commands(self):
+        added = self.invoke("add", "Call", "mom", "--format", "json")
+        assert json.loads(added.stdout)[0]["id"] == 2
+        completed = self.invoke("complete", "1-3", "--format", "jsonl")
+        assert completed.exit_code == 1
+        assert [json.loads(line)["done"] for line in completed.stdout.splitlines()] == [1, 1]
+        assert 'to-do # "3" failed' in completed.stderr
+        removed = self.invoke("remove", "2", "--force", "--format", "tsv")
+        assert removed.stdout.splitlines()[1].startswith("2\tCall mom.")
+
+    def test_unknown_format(self):
+        assert self.invoke("list", "--format", "xml").exit_code == 2
+
+    def test_list_read_error(self):
+        from udo.database import get_db_uri_by_path, get_engine_by_uri
+
+        with get_engine_by_uri(get_db_uri_by_path(self.db_path)).begin() as connection:
+            connection.exec_driver_sql("ALTER TABLE todo RENAME TO todo_gone")
+        for args in (["list", "--no-pager"], ["list", "--sort", "due"], ["list", "--format", "jsonl"]):
+            result = self.invoke(*args)
+            assert result.exit_code == 1, args
+            assert 'failed with "database read error"' in result.output
@@ -0,0 +1,65 @@
+import json
+import time
+
+from typer.testing import CliRunner
+
+from udo import cli, database, profiling
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+def test_phase_self_time():
+    profile = profiling.start()
+    try:
+        with profiling.phase("outer"):
+            time.sleep(0.02)
+            with profiling.phase("inner"):
+                time.sleep(0.05)
+    finally:
+        profiling.stop()
+    assert 0.05 <= profile.phases["inner"] < 0.1
+    assert 0.02 <= profile.phases["outer"] < 0.05
+
+
+def test_inactive():
+    assert not profiling.active()
+    with profiling.phase("ignored"):
+        profiling.count_rows(10)
+    assert profiling.stop() is None
+
+
+class TestProfileOption(HandlerTest):
+
+    def test_list_report(self):
+        # as in a fresh process, where list creates the engine
+        database.dispose_engines()
+        result = runner.invoke(cli.app, ["--profile", "list"], env={"COLUMNS": "80"})
+        assert result.exit_code == 0
+        for phase in ("config", "engine", "query", "render", "total"):
+            assert phase in result.stderr
+        # the streamed list reads the dummy to-do once
+        assert "rows hydrated: 1" in result.stderr
+        assert "SELECT" in result.stderr
+        assert not profiling.active()
+
+    def test_env_and_json_trace(self, tmp_path):
+        trace = tmp_path / "trace.json"
+        result = runner.invoke(
+            cli.app, ["list"],
+            env={"UDO_PROFILE_OUTPUT": str(trace), "COLUMNS": "80"},
+        )
+        assert result.exit_code == 0
+        data = json.loads(trace.read_text())
+        assert data["sql"]["statements"] >= 2
+        assert data["rows"] == 1
+        assert set(data["phases"]) >= {"query", "render"}
+
+    def test_cprofile_dump(self, tmp_path):
+        import pstats
+
+        dump = tmp_path / "list.prof"
+        result = runner.invoke(cli.app, ["--profile-output", str(dump), "list"], env={"COLUMNS": "80"})
+        assert result.exit_code == 0
+        assert pstats.Stats(str(dump)).total_calls > 0
@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+
+import pytest
+from typer.testing import CliRunner
+
+from udo import cli, query
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+def test_parse_id_spec_merges_ranges():
+    assert query.parse_id_spec("3,7,10-42") == [(3, 3), (7, 7), (10, 42)]
+    assert query.parse_id_spec("5-8,2,6-10,1,2") == [(1, 1), (2, 2), (5, 10)]
+
+
+def test_missing_ranges():
+    ranges = [(1, 2), (5, 10), (20, 5_000_000)]
+    assert query.missing_ranges(ranges, [1, 2, 6, 8, 20]) == [(5, 5), (9, 10), (21, 5_000_000)]
+    assert query.missing_ranges([(3, 3)], []) == [(3, 3)]
+
+
+@pytest.mark.parametrize("spec", ["", "a", "0", "5-3", "1-b"])
+def test_parse_id_spec_errors(spec):
+    with pytest.raises(query.QueryError):
+        query.parse_id_spec(spec)
+
+
+def test_parse():
+    tree = query.parse('priority>=2 and done==0 and description~"weekly report"')
+    assert tree.terms == (
+        query.Comparison("priority", ">=", 2),
+        query.Comparison("done", "=", 0),
+        query.Comparison("description", "~", "weekly report"),
+    )
+
+
+@pytest.mark.parametrize("text", ["colour=red", "priority>=high", "done=", "due<someday", "done~1", "priority=1 or", "(done=0", "done=0)", "not"])
+def test_parse_errors(text):
+    with pytest.raises(query.QueryError):
+        query.parse(text)
+
+
+def test_parse_precedence():
+    tree = query.parse("not done=1 and (priority=1 or due<fri) or id=3")
+    assert tree == query.Or((
+        query.And((
+            query.Not(query.Comparison("done", "=", 1)),
+            query.Or((
+                query.Comparison("priority", "=", 1),
+                query.Comparison("due", "<", "fri"),
+            )),
+        )),
+        query.Comparison("id", "=", 3),
+    ))
+
+
+def test_parse_sort():
+    assert query.parse_sort("priority,-due") == [
+        query.SortKey("priority", False), query.SortKey("due", True)
+    ]
+    with pytest.raises(query.QueryError):
+        query.parse_sort("priority,colour")
+
+
+def test_sort_key():
+    from udo.udo import TodoRow
+
+    rows = [
+        TodoRow(1, "b", 2, 0, 0, datetime(2024, 1, 2)),
+        TodoRow(2, "a", 1, 0, 0, datetime(2024, 1, 1)),
+        TodoRow(3, "c", 2, 0, 0, datetime(2024, 1, 3)),
+    ]
+    key = query.sort_key(query.parse_sort("priority,-description"))
+    assert [row.id for row in sorted(rows, key=key)] == [2, 3, 1]
+    key = query.sort_key(query.parse_sort("-due"))
+    assert [row.id for row in sorted(rows, key=key)] == [3, 1, 2]
+
+
+class TestListQuery(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        now = datetime.now()
+        self.handler.delete_todo(1)
+        self.handler.write_todos([
+            {"description": "urgent", "priority": 1, "progress": 10, "due": now + timedelta(hours=1)},
+            {"description": "later", "priority": 3, "progress": 80, "due": now + timedelta(days=3)},
+            {"description": "closed", "priority": 1, "done": 1, "due": now + timedelta(hours=2)},
+            {"description": "someday", "priority": 2, "progress": 0, "due": now + timedelta(days=40)},
+        ])
+
+    def descriptions(self, **kwargs):
+        response = self.handler.query_todos(False, **kwargs)
+        assert response.error == 0
+        return [todo.description for todo in response.todo_list]
+
+    def test_where_sort_limit_offset(self):
+        assert self.descriptions(where="priority<=2 and progress<50", sort="-priority") == [
+            "someday", "urgent"
+        ]
+        assert self.descriptions(sort="progress,id", limit=2, offset=1) == ["urgent", "later"]
+        assert self.descriptions(where='not description~"day"', sort="-due") == ["later", "urgent"]
+
+    def test_bucketed_where(self):
+        buckets = dict(self.handler.read_and_sort_todos(False, "priority=1").todo_list)
+        assert [todo.description for todo in buckets["today"]] == ["urgent"]
+        assert buckets["this week"] == []
+
+    def test_list_command(self):
+        result = runner.invoke(cli.app, ["list", "-w", "priority>=2", "--sort", "-priority", "-n", "1"])
+        assert result.exit_code == 0, result.output
+        assert "SORTED BY -PRIORITY" in result.stdout
+        assert "later" in result.stdout and "someday" not in result.stdout
+        assert runner.invoke(cli.app, ["list", "-w", "priority>>2"]).exit_code == 2
+        assert runner.invoke(cli.app, ["list", "--sort", "colour"]).exit_code == 2
+
+    def test_filter_runs_in_sqlite(self):
+        from sqlalchemy.dialects import sqlite
+
+        clause = query.compile_where(query.parse("priority>=2 and (progress<50 or due<fri)"))
+        sql = str(clause.compile(dialect=sqlite.dialect()))
+        assert sql == "todo.priority >= ? AND (todo.progress < ? OR todo.due < ?)"
+
+
+class TestBulkCommands(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        now = datetime.now()
+        self.handler.write_todos([
+            {"description": f"task {number}", "priority": number % 3 + 1, "due": now + timedelta(days=number)}
+            for number in range(2, 11)
+        ])
+
+    def invoke(self, *args, input=None):
+        return runner.invoke(cli.app, list(args), input=input)
+
+    def done_ids(self):
+        return {todo.id for todo in self.handler.read_todos().todo_list if todo.done}
+
+    def test_complete_ranges(self):
+        result = self.invoke("complete", "2,4-6")
+        assert result.exit_code == 0, result.output
+        assert result.stdout.count("completed!") == 4
+        assert self.done_ids() == {2, 4, 5, 6}
+
+    def test_complete_reports_missing(self):
+        result = self.invoke("complete", "9-12")
+        assert result.exit_code == 1
+        assert self.done_ids() == {9, 10}
+        assert 'to-do # "11-12" failed' in result.stdout
+
+    def test_complete_reports_each_missing_id(self):
+        self.handler.delete_todos([(4, 4)])
+        result = self.invoke("complete", "3,4,5")
+        assert result.exit_code == 1
+        assert self.done_ids() == {3, 5}
+        assert 'to-do # "4" failed' in result.stdout
+
+    def test_large_sparse_range(self):
+        self.handler.delete_todos([(4, 4)])
+        result = self.invoke("complete", "2-5000000")
+        assert result.exit_code == 1
+        assert self.done_ids() == {2, 3, 5, 6, 7, 8, 9, 10}
+        # the gap left by 4 is not missing
+        assert result.stdout.count("failed") == 1
+        assert 'to-do # "11-5000000" failed' in result.stdout
+        assert self.invoke("update", "1-3,5-7", "--priority", "1").exit_code == 0
+
+    def test_complete_where(self):
+        result = self.invoke("complete", "--where", "priority=3 and id>4")
+        assert result.exit_code == 0, result.output
+        assert self.done_ids() == {5, 8}
+
+    def test_update_ids_and_where(self):
+        result = self.invoke("update", "1-6", "--where", "priority=1", "--progress", "50")
+        assert result.exit_code == 0, result.output
+        progress = {todo.id: todo.progress for todo in self.handler.read_todos().todo_list}
+        assert [todo_id for todo_id, value in progress.items() if value == 50] == [3, 6]
+
+    def test_remove_confirms_once(self):
+        result = self.invoke("remove", "2-4", input="y\n")
+        assert result.exit_code == 0, result.output
+        assert "Delete 3 to-dos?" in result.stdout
+        ids = [todo.id for todo in self.handler.read_todos().todo_list]
+        assert ids == [1, 5, 6, 7, 8, 9, 10]
+
+    def test_remove_canceled(self):
+        result = self.invoke("remove", "2-4", input="n\n")
+        assert "Operation canceled" in result.stdout
+        assert len(self.handler.read_todos().todo_list) == 10
+
+    def test_invalid_selection(self):
+        assert self.invoke("complete").exit_code == 1
+        assert self.invoke("complete", "3-1").exit_code == 2
+        assert self.invoke("remove", "--where", "colour=red").exit_code == 2
@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+
+import pytest
+from typer.testing import CliRunner
+
+from udo import ID_ERROR, SUCCESS, cli, query, recurrence
+from udo.recurrence import Rule
+from udo.udo import TodoRow
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+def test_parse_rule():
+    assert recurrence.parse_rule("day") == Rule("daily")
+    assert recurrence.parse_rule("wk") == Rule("weekly")
+    assert recurrence.parse_rule("Monday,thu") == Rule("weekly", (0, 3))
+    for text in ("tomorrow", "mon,month", "", "fortnight"):
+        with pytest.raises(recurrence.RecurrenceError):
+            recurrence.parse_rule(text)
+
+
+def expand(rule, start, after, before, until=None):
+    return list(recurrence.occurrences(recurrence.parse_rule(rule), start, after, before, until))
+
+
+def test_occurrences_jump_to_the_window():
+    start = datetime(1900, 1, 1, 9)
+    after = datetime(2026, 3, 2)
+    assert expand("day", start, after, after + timedelta(days=3)) == [
+        datetime(2026, 3, 2, 9), datetime(2026, 3, 3, 9), datetime(2026, 3, 4, 9)
+    ]
+    # 1900-01-01 was a Monday
+    assert expand("week", start, after, after + timedelta(days=14)) == [
+        datetime(2026, 3, 2, 9), datetime(2026, 3, 9, 9)
+    ]
+    assert expand("sat,tue", start, after, after + timedelta(days=7)) == [
+        datetime(2026, 3, 3, 9), datetime(2026, 3, 7, 9)
+    ]
+
+
+def test_monthly_and_yearly():
+    start = datetime(2024, 1, 31, 18)
+    assert expand("month", start, datetime(2025, 1, 15), datetime(2025, 4, 15)) == [
+        datetime(2025, 1, 31, 18), datetime(2025, 2, 28, 18), datetime(2025, 3, 31, 18)
+    ]
+    assert expand("year", datetime(2020, 2, 29), datetime(2021, 1, 1), datetime(2024, 12, 31)) == [
+        datetime(2021, 2, 28), datetime(2022, 2, 28), datetime(2023, 2, 28), datetime(2024, 2, 29)
+    ]
+
+
+def test_occurrences_bounds():
+    start = datetime(2026, 5, 10, 12)
+    assert expand("day", start, datetime(2026, 5, 1), datetime(2026, 5, 12)) == [
+        datetime(2026, 5, 10, 12), datetime(2026, 5, 11, 12)
+    ]
+    assert expand("day", start, start, datetime(2026, 6, 1), until=datetime(2026, 5, 11, 12)) == [
+        datetime(2026, 5, 10, 12), datetime(2026, 5, 11, 12)
+    ]
+    assert expand("day", start, datetime(2026, 1, 1), datetime(2026, 2, 1)) == []
+
+
+@pytest.mark.parametrize("rule", ["day", "week", "sun", "month", "year"])
+def test_horizon_holds_the_occurrences(rule):
+    start = datetime(2020, 2, 29, 9)
+    after = datetime(2026, 3, 31, 10)
+    before = recurrence.horizon(recurrence.parse_rule(rule), start, after, 3)
+    assert len(expand(rule, start, after, before)) >= 3
+
+
+def test_compile_predicate():
+    row = TodoRow(None, "Water the Plants", 2, 0, 0, datetime(2026, 5, 10), 3)
+    assert query.compile_predicate(query.parse('description~"plants" and priority>=2'))(row)
+    assert not query.compile_predicate(query.parse("id=3 or done=1"))(row)
+    assert query.compile_predicate(query.parse("not (progress>0)"))(row)
+
+
+class TestSeries(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        self.now = datetime.now()
+        self.start = self.now.replace(hour=23, minute=59, second=59, microsecond=0)
+        response = self.handler.write_series({
+            "description": "Water the plants", "priority": 2, "rule": "day", "start": self.start,
+        })
+        assert response.error == SUCCESS
+        self.series_id = response.todo["id"]
+
+    def occurrences(self, completed=False, **kwargs):
+        return [
+            (label, row) for label, row in self.handler.stream_sorted_todos(completed, **kwargs)
+            if row.series is not None
+        ]
+
+    def test_listed_in_the_buckets(self):
+        rows = self.occurrences()
+        labels = [label for label, _ in rows]
+        assert labels[-2:] == ["tomorrow", "today"]
+        assert labels.count("this week") == 5
+        assert len(rows) == len({row.due for _, row in rows})
+        assert [row.due for _, row in rows][-1] == self.start
+
+        buckets = dict(self.handler.read_and_sort_todos(False).todo_list)
+        assert [row.due for row in buckets["today"]] == [self.start]
+        assert len(self.handler.read_todos().todo_list) == 1
+
+    def test_limit_and_where(self):
+        rows = list(self.handler.stream_sorted_todos(False, where="description~water", limit=3))
+        assert len(rows) == 3
+        assert all(row.series == self.series_id for _, row in rows)
+        assert self.occurrences(where="priority=1") == []
+
+    def test_complete_records_an_exception(self):
+        response = self.handler.complete_occurrence(self.series_id, now=self.now)
+        assert response.error == SUCCESS
+        assert response.todo["due"] == self.start
+        today = [row for label, row in self.occurrences() if label == "today"]
+        assert today == []
+        done = [row for label, row in self.occurrences(completed=True) if label == "today"]
+        assert [(row.done, row.progress) for row in done] == [(1, 100)]
+        # the next call completes tomorrow's
+        response = self.handler.complete_occurrence(self.series_id, now=self.now)
+        assert response.todo["due"] == self.start + timedelta(days=1)
+        assert len(self.handler.read_todos().todo_list) == 1
+
+    def test_complete_the_next_open_occurrences(self):
+        start = datetime(2026, 1, 31, 9)
+        series_id = self.handler.write_series({
+            "description": "Pay rent", "priority": 1, "rule": "month",
+            "start": start, "until": datetime(2026, 3, 31, 9),
+        }).todo["id"]
+        dues = [
+            self.handler.complete_occurrence(series_id, now=datetime(2026, 1, 1)).todo["due"]
+            for _ in range(3)
+        ]
+        assert dues == [start, datetime(2026, 2, 28, 9), datetime(2026, 3, 31, 9)]
+        assert self.handler.complete_occurrence(series_id, now=datetime(2026, 1, 1)).error == ID_ERROR
+
+    def test_complete_at_the_end_of_the_calendar(self):
+        start = datetime(9999, 12, 31, 9)
+        series_id = self.handler.write_series({
+            "description": "Last day", "priority": 2, "rule": "day", "start": start,
+        }).todo["id"]
+        assert self.handler.complete_occurrence(series_id).todo["due"] == start
+        assert self.handler.complete_occurrence(series_id).error == ID_ERROR
+
+    def test_missing_series_or_occurrence(self):
+        assert self.handler.complete_occurrence(99).error == ID_ERROR
+        yesterday = self.now - timedelta(days=1)
+        assert self.handler.complete_occurrence(self.series_id, yesterday).error == ID_ERROR
+        assert self.handler.delete_series(99).error == ID_ERROR
+
+    def test_commands(self):
+        result = runner.invoke(cli.app, ["repeat", "Take", "out", "trash", "--every", "mon,thu"])
+        assert result.exit_code == 0, result.output
+        assert "to-do # R2" in result.stdout
+        assert runner.invoke(cli.app, ["repeat", "x", "--every", "fortnight"]).exit_code == 2
+
+        result = runner.invoke(cli.app, ["list", "--no-pager"])
+        assert "ID: R1" in result.stdout
+
+        result = runner.invoke(cli.app, ["repeat-done", "1", "--on", "tomorrow"])
+        assert result.exit_code == 0, result.output
+        assert "completed!" in result.stdout
+
+        result = runner.invoke(cli.app, ["repeat-remove", "2"])
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(cli.app, ["list", "--no-pager"])
+        assert "Take out trash" not in result.stdout
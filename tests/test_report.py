@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from typer.testing import CliRunner
+
+from udo import cli, report
+from udo.udo import Todoer
+
+from tests.setup import HandlerTest
+
+np = pytest.importorskip("numpy")
+
+runner = CliRunner()
+
+
+class TestReport(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        self.now = datetime(2026, 5, 13, 12)
+        self.handler.delete_todo(1)
+        self.handler.write_todos([
+            {"description": "late", "progress": 50, "due": self.now - timedelta(days=10)},
+            {"description": "very late", "due": self.now - timedelta(days=400)},
+            {"description": "done last week", "done": 1, "progress": 100, "due": self.now - timedelta(days=5)},
+            {"description": "this week", "progress": 20, "due": self.now + timedelta(days=1)},
+            {"description": "next week", "priority": 1, "due": self.now + timedelta(days=8)},
+        ])
+        self.todoer = Todoer(self.db_path)
+
+    def test_to_arrays(self):
+        arrays = self.todoer.to_arrays()
+        assert len(arrays["due"]) == 5
+        assert arrays["due"].dtype == np.dtype("datetime64[s]")
+        assert arrays["due"][0] == np.datetime64(self.now - timedelta(days=10))
+        assert arrays["done"].tolist() == [0, 0, 1, 0, 0]
+        assert arrays["priority"].tolist() == [2, 2, 2, 2, 1]
+        after = self.todoer.to_arrays(False, after=self.now)
+        assert after["progress"].tolist() == [20, 0]
+
+    def test_weekly(self):
+        todos = self.todoer.to_arrays(after=self.now - timedelta(weeks=2))
+        rows = report.weekly(todos, self.todoer.to_arrays(completed=False), self.now, 1)
+        assert [row["week"] for row in rows] == ["2026-05-06", "2026-05-13", "2026-05-20"]
+        assert [(row["due"], row["completed"]) for row in rows] == [(1, 1), (1, 0), (1, 0)]
+        assert [row["completion_rate"] for row in rows] == [1.0, 0.5, 0.333]
+        # the late ones are remaining from the first week on
+        assert [row["remaining"] for row in rows] == [2, 3, 4]
+        assert [row["remaining_work"] for row in rows] == [1.5, 2.3, 3.3]
+
+    def test_overdue_ages(self):
+        rows = report.overdue_ages(self.todoer.to_arrays(completed=False), self.now)
+        assert [row["open"] for row in rows] == [0, 0, 1, 0, 0, 1]
+        assert rows[2] == {"overdue": "7-30 days", "open": 1, "mean_progress": 50.0}
+
+    def test_format_rows(self):
+        rows = [{"week": "2026-05-06", "due": 12, "completion_rate": None}]
+        assert list(report.format_rows(rows, "csv")) == ["week,due,completion_rate", "2026-05-06,12,"]
+        assert list(report.format_rows(rows, "table")) == [
+            "week        due  completion_rate",
+            "2026-05-06   12                -",
+        ]
+
+    def test_command(self):
+        result = runner.invoke(cli.app, ["report", "--weeks", "2", "--format", "csv"])
+        assert result.exit_code == 0, result.output
+        lines = result.stdout.splitlines()
+        assert lines[0] == "week,due,completed,completion_rate,remaining,remaining_work"
+        assert len(lines) == 6
+        result = runner.invoke(cli.app, ["report", "--overdue"])
+        assert result.exit_code == 0, result.output
+        assert "over 365 days" in result.stdout
+        assert runner.invoke(cli.app, ["report", "--format", "xml"]).exit_code == 2
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+import sqlite3
+
+import pytest
+from typer.testing import CliRunner
+
+from udo import DB_READ_ERROR, SUCCESS, cli, migrations, query
+from udo.database import dispose_engines, get_db_uri_by_path, get_engine_by_uri
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+def test_fts_query_quotes_terms():
+    assert query.fts_query('rep* "weekly team" AND') == '"rep"* "weekly team" "AND"'
+    assert query.fts_query('say "hi') == '"say" "hi"'
+    with pytest.raises(query.QueryError):
+        query.fts_query(' "" * ')
+
+
+class TestSearch(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        self.now = datetime.now()
+        self.handler.write_todos([
+            {"description": "Write the weekly report", "due": self.now + timedelta(hours=1)},
+            {"description": "Report the broken printer", "due": self.now + timedelta(days=20)},
+            {"description": "Weekly team meeting notes", "due": self.now + timedelta(hours=1), "done": 1},
+            {"description": "Café reservation", "due": self.now + timedelta(hours=1)},
+        ])
+
+    def descriptions(self, *args, **kwargs):
+        response = self.handler.search_todos(*args, **kwargs)
+        assert response.error == SUCCESS
+        return [todo["description"] for todo in response.todo_list]
+
+    def test_words_prefix_and_phrase(self):
+        assert self.descriptions("report", completed=True) == [
+            "Write the weekly report", "Report the broken printer"
+        ]
+        assert self.descriptions("rep*") == ["Write the weekly report", "Report the broken printer"]
+        assert self.descriptions('"weekly report"') == ["Write the weekly report"]
+        assert self.descriptions("cafe") == ["Café reservation"]
+
+    def test_done_and_bucket_filters(self):
+        assert self.descriptions("weekly") == ["Write the weekly report"]
+        assert self.descriptions("weekly", completed=True) == [
+            "Write the weekly report", "Weekly team meeting notes"
+        ]
+        assert self.descriptions("report", bucket="today") == ["Write the weekly report"]
+
+    def test_bm25_ranking(self):
+        self.handler.write_todos([{"description": "printer printer printer", "due": self.now}])
+        assert self.descriptions("printer")[0] == "printer printer printer"
+
+    def test_index_follows_writes(self):
+        self.handler.update_todo(3, description="Fix the printer")
+        self.handler.delete_todo(2)
+        assert self.descriptions("report") == []
+        assert self.descriptions("fix") == ["Fix the printer"]
+
+    def test_upgrade_indexes_existing_rows(self):
+        dispose_engines()
+        with sqlite3.connect(self.db_path) as connection:
+            for name in ("todo_fts", "todo_fts_insert", "todo_fts_delete", "todo_fts_update"):
+                kind = "TABLE" if name == "todo_fts" else "TRIGGER"
+                connection.execute(f"DROP {kind} {name}")
+            connection.execute("PRAGMA user_version = 1")
+        assert self.descriptions("printer") == ["Report the broken printer"]
+
+    def test_reindex_command(self):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        with engine.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO todo_fts (todo_fts) VALUES ('delete-all')")
+        assert self.descriptions("printer") == []
+        result = runner.invoke(cli.app, ["reindex"])
+        assert result.exit_code == 0, result.output
+        assert "5 to-dos were indexed" in result.stdout
+        assert self.descriptions("printer") == ["Report the broken printer"]
+
+    def test_search_command(self):
+        result = runner.invoke(cli.app, ["search", "rep*", "--due", "today"])
+        assert result.exit_code == 0, result.output
+        assert "Write the weekly report" in result.stdout
+        assert "printer" not in result.stdout
+        assert runner.invoke(cli.app, ["search", "x", "--due", "someday"]).exit_code == 2
+
+    def test_search_plan_uses_fts(self):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        with engine.connect() as connection:
+            plan = " ".join(row[-1] for row in connection.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT rowid FROM todo_fts WHERE todo_fts MATCH 'report'"
+            ))
+        assert "VIRTUAL TABLE INDEX" in plan
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+import json
+
+from typer.testing import CliRunner
+
+from udo import SUCCESS, cli, query, shards
+from udo.database import dispose_engines, get_db_uri_by_path, get_engine_by_uri
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+def test_overlapping():
+    years = [2021, 2022, 2024]
+    assert shards.overlapping(years) == years
+    assert shards.overlapping(years, datetime(2022, 3, 1), datetime(2024, 1, 1)) == [2022]
+    assert shards.overlapping(years, before=datetime(2024, 1, 1, 0, 0, 1)) == years
+    assert shards.overlapping(years, after=datetime(2023, 1, 1)) == [2024]
+
+
+def test_due_range():
+    assert query.due_range(query.parse("done=1")) == (None, None)
+    after, before = query.due_range(query.parse("due>=2022-01-01 and due<2022-06-01"))
+    assert (after.date(), before.date()) == (datetime(2022, 1, 1).date(), datetime(2022, 6, 1).date())
+    after, before = query.due_range(query.parse("due<2021-01-01 or due>2022-01-01"))
+    assert (after, before) == (None, None)
+
+
+class TestShards(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        self.now = datetime.now()
+        self.handler.delete_todo(1)
+        self.handler.write_todos([
+            {"description": "tax return", "done": 1, "due": datetime(2021, 4, 30)},
+            {"description": "tax return", "done": 1, "due": datetime(2022, 4, 30)},
+            {"description": "renew passport", "done": 1, "due": datetime(2024, 2, 1)},
+            {"description": "recent report", "done": 1, "due": self.now - timedelta(days=2)},
+        ])
+        assert self.handler.archive_todos(self.now - timedelta(days=30)) == (3, SUCCESS)
+        assert self.handler.rebalance_archive(batch_size=2) == (3, SUCCESS)
+
+    def attached(self):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql("PRAGMA database_list")
+            return sorted(row[1] for row in rows if row[1].startswith("shard_"))
+
+    def test_rebalance_splits_by_year(self):
+        for year in (2021, 2022, 2024):
+            assert shards.shard_path(self.db_path, year).exists()
+        assert not shards.shard_path(self.db_path, 2023).exists()
+        assert [row.id for row in self.handler.query_todos(True, sort="id").todo_list] == [2, 3, 4, 5]
+        assert [todo["id"] for todo in self.handler.stream_todos()] == [2, 3, 4, 5]
+        assert self.handler.rebalance_archive() == (0, SUCCESS)
+
+    def test_reads_attach_the_overlapping_shards(self):
+        dispose_engines()
+        assert self.attached() == []
+        rows = self.handler.query_todos(True, where="due>=2022-01-01 and due<2023-01-01").todo_list
+        assert [row.id for row in rows] == [3]
+        assert self.attached() == ["shard_2022"]
+        assert self.handler.search_todos("tax", completed=True, bucket="today").todo_list == []
+        assert self.attached() == ["shard_2022"]
+
+    def test_archive_writes_to_the_shards(self):
+        self.handler.write_todos([
+            {"description": "tax return", "done": 1, "due": datetime(2022, 12, 31)},
+            {"description": "tax return", "done": 1, "due": datetime(2023, 4, 30)},
+        ])
+        assert self.handler.archive_todos(self.now - timedelta(days=30)) == (2, SUCCESS)
+        assert shards.shard_path(self.db_path, 2023).exists()
+        assert [row.id for row in self.handler.read_todos().todo_list] == [5]
+        found = self.handler.search_todos("tax", completed=True).todo_list
+        assert sorted(todo["id"] for todo in found) == [2, 3, 6, 7]
+        assert self.handler.rebuild_search_index() == (6, SUCCESS)
+
+    def test_reads_of_more_years_than_attach(self):
+        self.handler.write_todos([
+            {"description": "tax return", "done": 1, "due": datetime(year, 4, 30)}
+            for year in range(2009, 2021)
+        ])
+        assert self.handler.archive_todos(self.now - timedelta(days=30)) == (12, SUCCESS)
+        ids = list(range(2, 18))
+        dispose_engines()
+        assert [todo["id"] for todo in self.handler.stream_todos()] == ids
+        rows = self.handler.query_todos(True, sort="-due", limit=3, offset=4).todo_list
+        assert [row.due.year for row in rows] == [2020, 2019, 2018]
+        assert len(list(self.handler.stream_columns())) == 16
+        found = self.handler.search_todos("tax", completed=True).todo_list
+        assert sorted(todo["id"] for todo in found) == [2, 3, *range(6, 18)]
+        assert self.handler.rebuild_search_index() == (16, SUCCESS)
+
+        result = runner.invoke(cli.app, ["export"])
+        assert result.exit_code == 0, result.output
+        assert [json.loads(line)["id"] for line in result.stdout.splitlines()] == ids
+        result = runner.invoke(cli.app, ["list", "--all", "--sort", "due", "--format", "jsonl"])
+        assert result.exit_code == 0, result.output
+        dues = [json.loads(line)["due"] for line in result.stdout.splitlines()]
+        assert len(dues) == 16 and dues == sorted(dues)
+        result = runner.invoke(cli.app, ["search", "tax", "--all"])
+        assert result.exit_code == 0, result.output
+        assert result.stdout.count("tax return") == 14
+
+        assert self.handler.delete_all().error == SUCCESS
+        assert list(self.handler.stream_todos()) == []
+
+    def test_ids_stay_unique(self):
+        todo_list = self.handler.write_todos([{"description": "new", "due": self.now}]).todo_list
+        assert todo_list[0]["id"] == 6
+
+    def test_commands(self):
+        result = runner.invoke(cli.app, ["rebalance"])
+        assert result.exit_code == 0, result.output
+        assert "0 to-dos were moved" in result.stdout
+        result = runner.invoke(cli.app, ["list", "--all", "--no-pager"])
+        assert "recent report" in result.stdout
+        result = runner.invoke(cli.app, ["search", "passport", "--all"])
+        assert result.exit_code == 0, result.output
+        assert "renew passport" in result.stdout
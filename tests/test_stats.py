@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from typer.testing import CliRunner
+
+from udo import SUCCESS, cli
+from udo.database import get_db_uri_by_path, get_engine_by_uri
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+class TestStats(HandlerTest):
+
+    def setup_method(self):
+        super().setup_method()
+        self.now = datetime(2026, 5, 13, 15)
+        self.handler.delete_todo(1)
+        self.handler.write_todos([
+            {"description": "late", "priority": 1, "progress": 20, "due": self.now - timedelta(days=3)},
+            {"description": "earlier today", "priority": 1, "progress": 40, "due": self.now - timedelta(hours=2)},
+            {"description": "later today", "priority": 2, "progress": 60, "due": self.now + timedelta(hours=2)},
+            {"description": "next week", "priority": 2, "done": 1, "progress": 100, "due": self.now + timedelta(days=9)},
+        ])
+
+    def stats(self):
+        response = self.handler.read_stats(self.now)
+        assert response.error == SUCCESS
+        return [(row.bucket, row.priority, row.done, row.count, row.progress) for row in response.stats]
+
+    def test_counts_per_bucket(self):
+        assert self.stats() == [
+            ("outdated", 1, 0, 2, 60),
+            ("today", 2, 0, 1, 60),
+            ("this month", 2, 1, 1, 100),
+        ]
+
+    def test_triggers_follow_the_writes(self):
+        self.handler.update_todo(3, done=1, priority=1)
+        self.handler.delete_todo(2)
+        self.handler.update_todos([(5, 5)], None, due=self.now - timedelta(days=400))
+        assert self.stats() == [
+            ("outdated", 1, 1, 1, 40),
+            ("outdated", 2, 1, 1, 100),
+            ("today", 2, 0, 1, 60),
+        ]
+        assert self.handler.check_stats() == ([], SUCCESS)
+
+    def test_archived_todos_are_not_counted(self):
+        self.handler.update_todos([(2, 2)], None, done=1)
+        # "late" leaves the live list, "earlier today" is not done
+        assert self.handler.archive_todos(self.now - timedelta(days=1)).error == SUCCESS
+        assert self.stats() == [
+            ("outdated", 1, 0, 1, 40),
+            ("today", 2, 0, 1, 60),
+            ("this month", 2, 1, 1, 100),
+        ]
+        assert self.handler.check_stats() == ([], SUCCESS)
+
+    def test_check_repairs(self):
+        engine = get_engine_by_uri(get_db_uri_by_path(self.db_path))
+        with engine.begin() as connection:
+            connection.exec_driver_sql("UPDATE todo_stats SET count = count + 5")
+            connection.exec_driver_sql("DROP TRIGGER todo_stats_insert")
+        self.handler.write_todos([{"description": "unseen", "due": self.now}])
+        differences = self.handler.check_stats().todo_list
+        assert len(differences) == 4
+        assert (differences[0]["count"], differences[0]["expected_count"]) == (6, 1)
+        assert (differences[2]["count"], differences[2]["expected_count"]) == (6, 2)
+        assert self.handler.check_stats() == ([], SUCCESS)
+
+    def test_command(self):
+        result = runner.invoke(cli.app, ["stats"])
+        assert result.exit_code == 0, result.output
+        assert "3 open, 1 done" in result.stdout
+        result = runner.invoke(cli.app, ["stats", "--check"])
+        assert result.exit_code == 0, result.output
+        assert "match" in result.stdout
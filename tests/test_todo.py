@@ -10,6 +10,8 @@ from udo import (
 )
 
 from datetime import datetime
+import subprocess
+import sys
 
 runner = CliRunner()
 
@@ -47,4 +49,17 @@ class TestToDo(BaseTest):
         assert type(todo_dict["due"]) == datetime
 
 
-
+def test_version_skips_database_imports():
+    code = (
+        "import sys\n"
+        "from udo import cli\n"
+        "try:\n"
+        "    cli.app(['--version'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(sorted(m for m in ('sqlalchemy', 'dateutil', 'udo.database') if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip().endswith("[]")
@@ -0,0 +1,101 @@
+import io
+import json
+import tracemalloc
+from datetime import datetime
+
+from typer.testing import CliRunner
+
+from udo import cli, transfer
+
+from tests.setup import HandlerTest
+
+runner = CliRunner()
+
+
+def test_parse_todo_txt():
+    records = list(transfer.read_records(
+        io.StringIO("x (A) Call mom due:2024-05-03\n\n(C) Paint progress:40\n"),
+        "todo.txt",
+    ))
+    assert records == [
+        {"done": 1, "priority": 1, "due": "2024-05-03", "description": "Call mom"},
+        {"done": 0, "priority": 3, "progress": "40", "description": "Paint"},
+    ]
+
+
+def test_normalize_resolves_due():
+    rows = list(transfer.normalize([
+        {"description": "a", "due": "2024-05-03"},
+        {"description": "b", "due": "2024-05-03T10:00:00", "priority": "1"},
+        {"description": "c", "due": "tomorrow"},
+    ]))
+    assert rows[0]["due"] == datetime(2024, 5, 3, 23, 59, 59)
+    assert rows[1]["due"] == datetime(2024, 5, 3, 10)
+    assert rows[1]["priority"] == 1
+    assert rows[2]["due"] > datetime.now()
+
+
+def test_normalize_memory_is_flat():
+    # an export has a distinct timestamp per row
+    records = (
+        {"description": "a", "due": f"2024-05-03 10:{number // 60 % 60:02}:{number % 60:02}.{number:06}"}
+        for number in range(100_000)
+    )
+    tracemalloc.start()
+    try:
+        for _ in transfer.normalize(records):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # parse_due caches 4096 dues at most, a memo of all of them would take 17 MiB
+    assert peak < 3 * 2**20
+
+
+def test_batched():
+    assert [len(batch) for batch in transfer.batched(range(7), 3)] == [3, 3, 1]
+
+
+class TestImportExport(HandlerTest):
+
+    def test_import_jsonl(self, tmp_path):
+        source = tmp_path / "todos.jsonl"
+        source.write_text("".join(
+            json.dumps({"description": f"todo {i}", "due": "2030-01-01"}) + "\n"
+            for i in range(25)
+        ))
+        result = runner.invoke(cli.app, ["import", str(source), "--batch-size", "10"])
+        assert result.exit_code == 0, result.stdout
+        assert "25 to-dos were imported" in result.stdout
+        # the dummy to-do created by init_database plus the imported ones
+        assert len(self.handler.read_todos().todo_list) == 26
+
+    def test_import_bad_record(self, tmp_path):
+        source = tmp_path / "todos.jsonl"
+        source.write_text('{"due": "today"}\n')
+        result = runner.invoke(cli.app, ["import", str(source)])
+        assert result.exit_code == 1
+
+    def test_round_trip(self, tmp_path):
+        source = tmp_path / "todos.csv"
+        source.write_text(
+            "description,priority,done,progress,due\n"
+            "first,1,0,10,2030-01-01 12:00:00\n"
+            "second,3,1,100,2030-02-01 12:00:00\n"
+        )
+        assert runner.invoke(cli.app, ["import", str(source)]).exit_code == 0
+
+        exported = tmp_path / "out.jsonl"
+        result = runner.invoke(cli.app, ["export", str(exported)])
+        assert result.exit_code == 0
+        records = [json.loads(line) for line in exported.read_text().splitlines()]
+        assert [r["description"] for r in records] == ["Dummy ToDo", "first", "second"]
+        assert records[2] == {
+            "id": 3, "description": "second", "priority": 3, "done": 1,
+            "progress": 100, "due": "2030-02-01 12:00:00",
+        }
+
+    def test_export_to_stdout(self):
+        result = runner.invoke(cli.app, ["export"])
+        assert result.exit_code == 0
+        assert json.loads(result.stdout)["description"] == "Dummy ToDo"
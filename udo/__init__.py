@@ -11,7 +11,8 @@ __version__ = "0.1.0"
     DB_WRITE_ERROR,
     JSON_ERROR,
     ID_ERROR,
-) = range(7)
+    DB_LOCKED_ERROR,
+) = range(8)
 
 ERRORS = {
     DIR_ERROR: "config directory error",
@@ -19,4 +20,5 @@ ERRORS = {
     DB_READ_ERROR: "database read error",
     DB_WRITE_ERROR: "database write error",
     ID_ERROR: "to-do id error",
+    DB_LOCKED_ERROR: "database locked by another writer",
 }
@@ -0,0 +1,155 @@
+"""This module provides the RP UDo asyncio API.
+
+SQLite allows a single writer at a time, so the blocking calls of the
+synchronous API run in order on one dedicated thread. Coroutines hand them
+over through a bounded queue and await the result, and the event loop keeps
+running in the meantime.
+"""
+
+import asyncio
+import concurrent.futures
+from pathlib import Path
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from udo.udo import CurrentTodo, Todoer, TodoRow
+
+DEFAULT_QUEUE_SIZE = 128
+
+
+class DatabaseWorker:
+    """Run callables one after the other on a dedicated thread."""
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        self._queue: "queue.Queue" = queue.Queue(queue_size)
+        # callers wait on the semaphore, not on the queue, so that a full
+        # queue suspends the coroutine instead of blocking the loop
+        self._slots = asyncio.Semaphore(queue_size)
+        self._thread = threading.Thread(target=self._run, name="udo-db", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, function, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args, **kwargs))
+            except BaseException as error:
+                future.set_exception(error)
+
+    async def run(self, function: Callable, *args, **kwargs) -> Any:
+        """Run function on the worker thread and return its result."""
+        if not self._thread.is_alive():
+            raise RuntimeError("the database worker is closed")
+        async with self._slots:
+            future = concurrent.futures.Future()
+            self._queue.put_nowait((future, function, args, kwargs))
+            return await asyncio.wrap_future(future)
+
+    async def aclose(self) -> None:
+        """Finish the queued calls and stop the thread."""
+        if self._thread.is_alive():
+            await asyncio.get_running_loop().run_in_executor(None, self._close)
+
+    def _close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+class AsyncDatabaseHandler:
+    """DatabaseHandler whose methods are coroutines."""
+
+    def __init__(self, db_path: Path, worker: Optional[DatabaseWorker] = None) -> None:
+        from udo.database import DatabaseHandler
+
+        self._db_handler = DatabaseHandler(db_path)
+        self._worker = worker or DatabaseWorker()
+
+    async def __aenter__(self) -> "AsyncDatabaseHandler":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def read_todos(self):
+        return await self._worker.run(self._db_handler.read_todos)
+
+    async def read_and_sort_todos(self, completed: bool):
+        return await self._worker.run(self._db_handler.read_and_sort_todos, completed)
+
+    async def write_todos(self, todo_list: List[Dict[str, Any]]):
+        return await self._worker.run(self._db_handler.write_todos, todo_list)
+
+    async def get_todo(self, todo_id: int):
+        return await self._worker.run(self._db_handler.get_todo, todo_id)
+
+    async def delete_todo(self, todo_id: int):
+        return await self._worker.run(self._db_handler.delete_todo, todo_id)
+
+    async def delete_all(self):
+        return await self._worker.run(self._db_handler.delete_all)
+
+    async def update_todo(self, todo_id: int, **kwargs):
+        return await self._worker.run(self._db_handler.update_todo, todo_id, **kwargs)
+
+    async def aclose(self) -> None:
+        await self._worker.aclose()
+
+
+class AsyncTodoer:
+    """Todoer whose methods are coroutines returning the same results."""
+
+    def __init__(self, db_path: Path, worker: Optional[DatabaseWorker] = None) -> None:
+        self._todoer = Todoer(db_path)
+        self._worker = worker or DatabaseWorker()
+
+    async def __aenter__(self) -> "AsyncTodoer":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def add(
+        self,
+        description: List[str],
+        priority: int = 2,
+        progress: int = 0,
+        due: str = 'today'
+        ) -> CurrentTodo:
+        """Add a new to-do to the database."""
+        return await self._worker.run(
+            self._todoer.add, description, priority, progress, due
+        )
+
+    async def get_todo_list(self) -> List[TodoRow]:
+        """Return the current to-do list."""
+        return await self._worker.run(self._todoer.get_todo_list)
+
+    async def get_sorted_todo_list(self, completed: bool) -> List[tuple[str, List[TodoRow]]]:
+        """Return the current SORTED to-do list."""
+        return await self._worker.run(self._todoer.get_sorted_todo_list, completed)
+
+    async def set_done(self, todo_id: int) -> CurrentTodo:
+        """Set a to-do as done."""
+        return await self._worker.run(self._todoer.set_done, todo_id)
+
+    async def update(self, todo_id: int, description: List[str] = [], **kwargs) -> CurrentTodo:
+        """Update a to-do."""
+        return await self._worker.run(self._todoer.update, todo_id, description, **kwargs)
+
+    async def remove(self, todo_id: int) -> CurrentTodo:
+        """Remove a to-do from the database using its id or index."""
+        return await self._worker.run(self._todoer.remove, todo_id)
+
+    async def remove_all(self) -> CurrentTodo:
+        """Remove all to-dos from the database."""
+        return await self._worker.run(self._todoer.remove_all)
+
+    async def aclose(self) -> None:
+        """Finish the pending calls and stop the database thread."""
+        await self._worker.aclose()
@@ -1,33 +1,73 @@
 """This module provides the UDo CLI."""
 
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional
-import os
-import textwrap
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+import itertools
+import shutil
 
 import typer
 
-from udo import ERRORS, __app_name__, __version__, config, database, udo
-from udo.due_options import due_options
+from udo import DB_READ_ERROR, ERRORS, ID_ERROR, __app_name__, __version__, config, profiling
+from udo.due_options import parse_due
+
+# The database layer pulls in SQLAlchemy, so it is imported inside the
+# commands that need it to keep --help and --version fast.
+if TYPE_CHECKING:
+    from udo import udo
 
 app = typer.Typer()
 
-def due_callback(value: str):
-    if value not in due_options.keys():
-        raise typer.BadParameter("Not in allowed options.")
+def due_callback(value: Optional[str]):
+    if value is None:
+        return None
+    try:
+        parse_due(value)
+    except ValueError:
+        raise typer.BadParameter(
+            "Not a due date, such as today, fri, next fri, in 3 days, +2w, end of month or 2024-05-03."
+        )
+    return value
+
+
+def output_format_callback(value: Optional[str]):
+    if value is None:
+        return None
+    from udo import output
+
+    if value not in output.FORMATS:
+        raise typer.BadParameter(f"Use one of: {', '.join(output.FORMATS)}.")
     return value
 
 
+def output_format_option():
+    return typer.Option(
+        None,
+        "--format",
+        callback=output_format_callback,
+        help="Write the to-dos as json, jsonl or tsv records, without styles.",
+    )
+
+
+def write_records(records, fmt: str) -> None:
+    """Write records in the machine-readable format fmt, one per line."""
+    from udo import output
+
+    output.write(output.chunked(output.format_records(records, fmt)), pager=False)
+
+
 @app.command()
 def init(
     db_path: str = typer.Option(
-        str(database.DEFAULT_DB_FILE_PATH),
+        str(config.DEFAULT_DB_FILE_PATH),
         "--db-path",
         "-db",
         prompt="to-do database location?",
     ),
 ) -> None:
     """Initialize the to-do database."""
+    from udo import database
+
     app_init_error = config.init_app(db_path)
     if app_init_error:
         typer.secho(
@@ -46,9 +86,10 @@ def init(
         typer.secho(f"The to-do database is {db_path}", fg=typer.colors.GREEN)
 
 
-def get_todoer() -> udo.Todoer:
+def get_db_path() -> Path:
     if config.CONFIG_FILE_PATH.exists():
-        db_path = database.get_database_path(config.CONFIG_FILE_PATH)
+        with profiling.phase("config"):
+            db_path = config.get_database_path(config.CONFIG_FILE_PATH)
     else:
         typer.secho(
             'Config file not found. Please, run "rptodo init"',
@@ -56,7 +97,7 @@ def get_todoer() -> udo.Todoer:
         )
         raise typer.Exit(1)
     if db_path.exists():
-        return udo.Todoer(db_path)
+        return db_path
     else:
         typer.secho(
             'Database not found. Please, run "rptodo init"',
@@ -65,25 +106,61 @@ def get_todoer() -> udo.Todoer:
         raise typer.Exit(1)
 
 
+def get_todoer(use_daemon: bool = True) -> "udo.Todoer":
+    """
+    Return the Todoer of the configured database. When a daemon serves
+    that database, calls are forwarded to it instead, unless profiling or
+    the daemon does not answer.
+    """
+    from udo import udo
+
+    db_path = get_db_path()
+    if use_daemon and not profiling.active():
+        from udo.daemon import DaemonError, DaemonTodoer
+
+        try:
+            client = DaemonTodoer.connect(db_path)
+        except (DaemonError, OSError):
+            # a busy or stuck daemon, the database is still there
+            client = None
+        if client is not None:
+            return client
+    return udo.Todoer(db_path)
+
+
+@contextmanager
+def reading(err: bool = False) -> Iterator[None]:
+    """Report a failed streamed read of the to-dos and exit 1."""
+    from udo.udo import ReadError
+
+    try:
+        yield
+    except ReadError:
+        typer.secho(f'Reading to-dos failed with "{ERRORS[DB_READ_ERROR]}"', fg=typer.colors.RED, err=err)
+        raise typer.Exit(1)
+
 
 @app.command()
 def add(
     description: List[str] = typer.Argument(...),
     priority: int = typer.Option(2, "--priority", "-p", min=1, max=3),
     progress: int = typer.Option(0, "--progress", "-prog", min=0, max=100),
-    due: str = typer.Option(2, "--due", "-d", callback=due_callback),
+    due: str = typer.Option("today", "--due", "-d", callback=due_callback),
+    fmt: Optional[str] = output_format_option(),
 ) -> None:
     """Add a new to-do with a DESCRIPTION."""
     todoer = get_todoer()
     todo, error = todoer.add(description, priority, progress, due)
     if error:
         typer.secho(
-            f'Adding to-do failed with "{ERRORS[error]}"', fg=typer.colors.RED
+            f'Adding to-do failed with "{ERRORS[error]}"', fg=typer.colors.RED, err=fmt is not None
         )
         raise typer.Exit(1)
+    elif fmt is not None:
+        write_records([todo], fmt)
     else:
         typer.secho(
-            f"""to-do: "{todo['description']}" was added """
+            f"""to-do # {todo['id']}: "{todo['description']}" was added """
             f"""with priority: {priority}""",
             fg=typer.colors.GREEN,
         )
@@ -97,10 +174,11 @@ def center(columns, text):
     return side + text + side
 
 
-def visual_representation(id: int, todo: str, progress: int, columns: int) -> None:
+def visual_representation(id: int, todo: str, progress: int, columns: int) -> List[str]:
     """
-    Formats the list of tasks and outputs in the terminal.
+    Formats a task of the list into the styled lines of the terminal.
     """
+    import textwrap
 
     half_index = round(columns / 2)
     main_border = "_" * (columns)
@@ -118,7 +196,7 @@ def visual_representation(id: int, todo: str, progress: int, columns: int) -> No
 
     task_length = len(ID + todo)
 
-    typer.secho(main_border)
+    output = [main_border]
 
     # if 1 line is enough to fit the task and id
     if task_length <= half_index:
@@ -126,7 +204,7 @@ def visual_representation(id: int, todo: str, progress: int, columns: int) -> No
         left = columns - len("||" + ID + todo + spaces(half_index-task_length) + percentage)
         # design the output line
         todo_and_bar = bar + ID_styled + todo + spaces(half_index-task_length) + bar + percentage_styled + spaces(left-1) + bar
-        typer.secho(todo_and_bar)
+        output.append(todo_and_bar)
 
     # else split to several lines
     else:
@@ -136,14 +214,58 @@ def visual_representation(id: int, todo: str, progress: int, columns: int) -> No
         left = columns - half_index - len(percentage) - 2
         # design the output line
         todo_and_bar = bar + lines[0].replace(ID, ID_styled) + spaces(half_index-fragment_length) + bar + percentage_styled + spaces(left-1) + bar
-        typer.echo(todo_and_bar)
+        output.append(todo_and_bar)
         # output the rest of the task body line by line
-        for line in lines[1:]:
-            typer.echo(line)
+        output.extend(lines[1:])
+
+    output.append(main_border)
+
+    return output
+
 
-    typer.secho(main_border)
+def render_list(rows: Iterator[Tuple[str, "udo.TodoRow"]], columns: int) -> Iterator[str]:
+    """Yield the styled lines of the list of (bucket, to-do) rows."""
+    current = None
+    for label, todo in rows:
+        with profiling.phase("render"):
+            lines = []
+            if current is None:
+                lines.append(typer.style("\nTO-DO LIST:\n", fg=typer.colors.BLUE, bold=True))
+            if label != current:
+                current = label
+                lines.append(typer.style(center(columns, label.upper()), fg=typer.colors.YELLOW))
+            todo_id = todo.id if todo.series is None else f"R{todo.series}"
+            lines.extend(visual_representation(todo_id, todo.description, todo.progress, columns))
+        yield from lines
 
-    return None
+
+def list_records(rows: Iterator[Tuple[str, "udo.TodoRow"]]) -> Iterator[dict]:
+    for label, todo in rows:
+        yield {**todo._asdict(), "bucket": label}
+
+
+def where_callback(value: Optional[str]):
+    if value is None:
+        return None
+    from udo import query
+
+    try:
+        query.parse(value)
+    except query.QueryError as error:
+        raise typer.BadParameter(str(error))
+    return value
+
+
+def sort_callback(value: Optional[str]):
+    if value is None:
+        return None
+    from udo import query
+
+    try:
+        query.parse_sort(value)
+    except query.QueryError as error:
+        raise typer.BadParameter(str(error))
+    return value
 
 
 @app.command(name="list")
@@ -152,62 +274,366 @@ def list_all(
         False,
         "--all",
         "-a",
-        help="List all tasks (including completed)."
-    )
+        help="List all tasks (including completed and archived)."
+    ),
+    cache: bool = typer.Option(
+        False,
+        "--cache",
+        envvar="UDO_LIST_CACHE",
+        help="Reuse the last output while the database is unchanged.",
+    ),
+    where: Optional[str] = typer.Option(None, "--where", "-w", callback=where_callback, help='Filter, such as "priority>=2 and (progress<50 or due<fri)".'),
+    sort: Optional[str] = typer.Option(None, "--sort", "-s", callback=sort_callback, help="Columns to sort by, such as priority,-due. Lists without the time buckets."),
+    limit: Optional[int] = typer.Option(None, "--limit", "-n", min=1),
+    offset: Optional[int] = typer.Option(None, "--offset", min=0),
+    pager: bool = typer.Option(True, "--pager/--no-pager", help="Page the list with $PAGER when writing to a terminal."),
+    fmt: Optional[str] = output_format_option(),
 ) -> None:
     """List all to-dos."""
+    from udo import output
+
+    if fmt is not None:
+        todoer = get_todoer()
+        with reading(err=True):
+            if sort is not None:
+                records = todoer.stream_todo_list(all, where, sort, limit, offset)
+                write_records((todo._asdict() for todo in records), fmt)
+            else:
+                rows = todoer.stream_sorted_todo_list(all, where, limit, offset)
+                write_records(list_records(rows), fmt)
+        return
+
+    columns = shutil.get_terminal_size().columns
+    if cache:
+        from udo import listcache
+
+        view = "\0".join(str(option) for option in (where, sort, limit, offset))
+        cache_key = listcache.cache_key(get_db_path(), columns, all, view=view)
+        cached = listcache.load(cache_key)
+        if cached is not None:
+            output.write([cached], pager)
+            return
+
     todoer = get_todoer()
-    todo_list = todoer.get_todo_list()
-    if len(todo_list) == 0:
-        typer.secho(
-            "There are no tasks in the to-do list yet", fg=typer.colors.RED
+    # asked before the list is read, so that a change while it is read
+    # expires the cache at once; a sorted list has no buckets
+    expires = None
+    if cache and sort is None:
+        expires = todoer.next_bucket_change(all, where)
+    if sort is not None:
+        heading = f"sorted by {sort}"
+        rows = (
+            (heading, todo)
+            for todo in todoer.stream_todo_list(all, where, sort, limit, offset)
         )
+    else:
+        rows = todoer.stream_sorted_todo_list(all, where, limit, offset)
+
+    chunks = output.chunked(render_list(rows, columns))
+    with reading():
+        first = next(chunks, None)
+    if first is None:
+        if where is None:
+            typer.secho("There are no tasks in the to-do list yet", fg=typer.colors.RED)
+        else:
+            typer.secho("No to-do matches the filter", fg=typer.colors.RED)
         raise typer.Exit()
 
-    columns = os.get_terminal_size(0)[0]
-    todo__sorted_list = todoer.get_sorted_todo_list(completed=all)
+    kept = []
+    chunks = itertools.chain([first], chunks)
+    if cache:
+        chunks = _keep(chunks, kept)
+    with reading():
+        complete = output.write(chunks, pager)
 
-    typer.secho("\nTO-DO LIST:\n", fg=typer.colors.BLUE, bold=True)
-    for elem in todo__sorted_list:
+    if cache and complete:
+        listcache.store(cache_key, "".join(kept), expires)
 
-        if elem[1] != []:
-            time_line = center(columns, elem[0].upper())
-            typer.secho(time_line, fg=typer.colors.YELLOW)
 
-            for todo in elem[1]:
-                id, desc, priority, done, progress = todo.values()
-                visual_representation(id, desc, progress, columns)
+def _keep(chunks: Iterator[str], kept: List[str]) -> Iterator[str]:
+    for chunk in chunks:
+        kept.append(chunk)
+        yield chunk
 
 
-@app.command(name="update")
-def update(
-    todo_id: int = typer.Argument(...),
-    priority: int = typer.Option(None, "--priority", "-p", min=1, max=3),
-    done: int = typer.Option(None, "--done", "-done", min=0, max=1),
-    progress: int = typer.Option(None, "--progress", "-prog", min=0, max=100),
-    due: str = typer.Option(None, "--due", "-d", callback=due_callback),
+def bucket_callback(value: Optional[str]):
+    if value is None:
+        return None
+    from datetime import datetime
+
+    from udo.due_options import time_buckets
+
+    value = value.lower()
+    labels = [label for label in time_buckets(datetime.now())[1] if label is not None]
+    if value not in labels:
+        raise typer.BadParameter(f"use one of: {', '.join(labels)}")
+    return value
+
+
+@app.command()
+def search(
+    text: List[str] = typer.Argument(..., help='Words, "quoted phrases" and prefix* words.'),
+    all: bool = typer.Option(False, "--all", "-a", help="Search completed and archived tasks too."),
+    due: Optional[str] = typer.Option(None, "--due", "-d", callback=bucket_callback, help="Only the tasks of this list bucket, such as today or this week."),
+    limit: int = typer.Option(50, "--limit", "-n", min=1),
 ) -> None:
-    """Complete a to-do by setting it as done using its TODO_ID."""
+    """Search the to-do descriptions for TEXT, best match first."""
+    from udo import query
+
+    text = " ".join(text)
+    try:
+        query.fts_query(text)
+    except query.QueryError as error:
+        raise typer.BadParameter(str(error), param_hint="TEXT")
     todoer = get_todoer()
+    todo_list, error = todoer.search(text, all, due, limit)
+    if error:
+        typer.secho(f'Searching to-dos failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if not todo_list:
+        typer.secho("No to-do matches the search", fg=typer.colors.RED)
+        raise typer.Exit()
 
-    description = []
-    todo, error = todoer.update(todo_id, description, priority, done, progress, due)
+    with profiling.phase("render"):
+        lines = []
+        for todo in todo_list:
+            mark = typer.style("done", fg=typer.colors.GREEN) if todo["done"] else f"{todo['progress']:>3}%"
+            lines.append(
+                typer.style(f"{todo['id']:>6}", fg=typer.colors.RED)
+                + f"  P{todo['priority']}  {mark}  {str(todo['due'])[:10]}  {todo['description']}"
+            )
+        typer.echo("\n".join(lines))
+
+
+@app.command()
+def reindex() -> None:
+    """Rebuild the search index of the to-do descriptions."""
+    todoer = get_todoer()
+    count, error = todoer.reindex()
     if error:
-        typer.secho(
-            f'Updating to-do # "{todo_id}" failed with "{ERRORS[error]}"',
-            fg=typer.colors.RED,
-        )
+        typer.secho(f'Rebuilding the search index failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(f"{count} to-dos were indexed", fg=typer.colors.GREEN)
+
+
+@app.command()
+def stats(
+    check: bool = typer.Option(
+        False,
+        "--check",
+        help="Count the to-dos again, then report and repair the counts that were off.",
+    ),
+) -> None:
+    """
+    Show how many to-dos are open and done per list bucket and priority.
+    Archived to-dos are not counted.
+    """
+    todoer = get_todoer()
+    if check:
+        differences, error = todoer.check_stats()
+        if error:
+            typer.secho(f'Checking the stats failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+            raise typer.Exit(1)
+        for difference in differences:
+            state = "done" if difference["done"] else "open"
+            typer.echo(
+                f"{difference['day']}  P{difference['priority']}  {state}:"
+                f" {difference['count']} to-dos, {difference['expected_count']} expected,"
+                f" progress {difference['progress']}, {difference['expected_progress']} expected"
+            )
+        if differences:
+            typer.secho(f"{len(differences)} counts were off and were repaired", fg=typer.colors.RED)
+            raise typer.Exit(1)
+        typer.secho("The stats match the to-dos", fg=typer.colors.GREEN)
+        return
+
+    rows, error = todoer.stats()
+    if error:
+        typer.secho(f'Reading the stats failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    if not rows:
+        typer.secho("There are no tasks in the to-do list yet", fg=typer.colors.RED)
+        raise typer.Exit()
+
+    buckets: Dict[str, List[int]] = {}
+    priorities: Dict[int, List[int]] = {}
+    for row in rows:
+        state = 1 if row.done else 0
+        buckets.setdefault(row.bucket, [0, 0])[state] += row.count
+        priorities.setdefault(row.priority, [0, 0])[state] += row.count
+    open_count = sum(row.count for row in rows if not row.done)
+    done_count = sum(row.count for row in rows if row.done)
+    progress = sum(row.progress for row in rows if not row.done)
+    average = f"{progress / open_count:.0f}%" if open_count else "-"
+
+    lines = [
+        f"{open_count} open, {done_count} done, {buckets.get('outdated', [0])[0]} overdue,"
+        f" {average} average progress of the open ones",
+        "",
+        f"{'due':<12}{'open':>6}{'done':>6}",
+    ]
+    lines.extend(f"{bucket:<12}{counts[0]:>6}{counts[1]:>6}" for bucket, counts in buckets.items())
+    lines.extend(["", f"{'priority':<12}{'open':>6}{'done':>6}"])
+    lines.extend(
+        f"{priority:<12}{counts[0]:>6}{counts[1]:>6}"
+        for priority, counts in sorted(priorities.items())
+    )
+    typer.echo("\n".join(lines))
+
+
+def report_format_callback(value: str):
+    from udo import report
+
+    if value not in report.FORMATS:
+        raise typer.BadParameter(f"Use one of: {', '.join(report.FORMATS)}.")
+    return value
+
+
+@app.command()
+def report(
+    weeks: int = typer.Option(12, "--weeks", min=1, help="Weeks to report before and after this one."),
+    overdue: bool = typer.Option(False, "--overdue", help="Report how long the open to-dos are overdue instead."),
+    fmt: str = typer.Option("table", "--format", callback=report_format_callback, help="table or csv."),
+) -> None:
+    """Report the to-dos due, completed and remaining per week."""
+    from datetime import datetime, timedelta
+
+    from udo import output, report as reports
+
+    now = datetime.now()
+    todoer = get_todoer(use_daemon=False)
+    try:
+        with reading():
+            open_todos = todoer.to_arrays(completed=False)
+            if overdue:
+                rows = reports.overdue_ages(open_todos, now)
+            else:
+                start = datetime.combine(now.date(), datetime.min.time())
+                todos = todoer.to_arrays(
+                    after=start - timedelta(weeks=weeks), before=start + timedelta(weeks=weeks + 1)
+                )
+                rows = reports.weekly(todos, open_todos, now, weeks)
+    except reports.ReportError as error:
+        typer.secho(str(error), fg=typer.colors.RED)
+        raise typer.Exit(1)
+    output.write(output.chunked(reports.format_rows(rows, fmt)), pager=False)
+
+
+@app.command()
+def archive(
+    older_than: int = typer.Option(
+        30,
+        "--older-than",
+        min=0,
+        help="Archive the completed to-dos due more than this many days ago.",
+    ),
+) -> None:
+    """Move old completed to-dos out of the list, into the archive."""
+    todoer = get_todoer()
+    count, error = todoer.archive(older_than)
+    if error:
+        typer.secho(f'Archiving failed with "{ERRORS[error]}" after {count} to-dos', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(f"{count} to-dos were archived", fg=typer.colors.GREEN)
+
+
+@app.command()
+def rebalance() -> None:
+    """Split the archive into one database file per due year."""
+    todoer = get_todoer()
+    count, error = todoer.rebalance()
+    if error:
+        typer.secho(f'Rebalancing failed with "{ERRORS[error]}" after {count} to-dos', fg=typer.colors.RED)
         raise typer.Exit(1)
+    typer.secho(f"{count} to-dos were moved to the yearly archives", fg=typer.colors.GREEN)
+
+
+def complete_ids(incomplete: str) -> List[Tuple[str, str]]:
+    """Complete the to-do ID being typed, without loading the database layer."""
+    from udo import completion
+
+    if not config.CONFIG_FILE_PATH.exists():
+        return []
+    db_path = config.get_database_path(config.CONFIG_FILE_PATH)
+    if not db_path.exists():
+        return []
+    return completion.complete(db_path, incomplete)
+
+
+def ids_callback(value: Optional[str]):
+    if value is None:
+        return None
+    from udo import query
+
+    try:
+        return query.parse_id_spec(value)
+    except query.QueryError as error:
+        raise typer.BadParameter(str(error))
+
+
+def _check_selection(ranges, where: Optional[str]) -> None:
+    if ranges is None and where is None:
+        typer.secho("Give TODO_IDS, a --where filter or both", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+
+def _report_bulk(
+    result: "udo.BulkResult", action: str, verb: str, fmt: Optional[str] = None
+) -> None:
+    """
+    Print one line per selected to-do and one per range of missing IDs, and
+    exit 1 if any is missing. With a
+    format, the to-dos are written as records and the errors to stderr.
+    """
+    todo_list, missing, error = result
+    err = fmt is not None
+    if error:
+        typer.secho(f'{action} to-dos failed with "{ERRORS[error]}"', fg=typer.colors.RED, err=err)
+        raise typer.Exit(1)
+    if fmt is not None:
+        write_records(todo_list, fmt)
     else:
+        for todo in todo_list:
+            typer.secho(
+                f"""to-do # {todo['id']} "{todo['description']}" {verb}!""",
+                fg=typer.colors.GREEN,
+            )
+    for first, last in missing:
+        ids = str(first) if first == last else f"{first}-{last}"
         typer.secho(
-            f"""to-do # {todo_id} "{todo['description']}" updated!""",
-            fg=typer.colors.GREEN,
+            f'{action} to-do # "{ids}" failed with "{ERRORS[ID_ERROR]}"',
+            fg=typer.colors.RED,
+            err=err,
         )
+    if not todo_list and not missing and fmt is None:
+        typer.echo("No to-do matches the filter")
+    if missing:
+        raise typer.Exit(1)
+
+
+@app.command(name="update")
+def update(
+    todo_ids: Optional[str] = typer.Argument(None, callback=ids_callback, autocompletion=complete_ids, help="IDs and ranges, such as 3,7,10-42."),
+    where: Optional[str] = typer.Option(None, "--where", "-w", callback=where_callback, help='Filter, such as "priority>=2 and done=0".'),
+    priority: int = typer.Option(None, "--priority", "-p", min=1, max=3),
+    done: int = typer.Option(None, "--done", "-done", min=0, max=1),
+    progress: int = typer.Option(None, "--progress", "-prog", min=0, max=100),
+    due: str = typer.Option(None, "--due", "-d", callback=due_callback),
+    fmt: Optional[str] = output_format_option(),
+) -> None:
+    """Update the to-dos selected by TODO_IDS and --where."""
+    _check_selection(todo_ids, where)
+    if priority is None and done is None and progress is None and due is None:
+        typer.secho("Nothing to update", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    todoer = get_todoer()
+    result = todoer.update_many(todo_ids, where, priority, done, progress, due)
+    _report_bulk(result, "Updating", "updated", fmt)
 
 
 @app.command(name="update-desc")
 def update_desc(
-    todo_id: int = typer.Argument(...),
+    todo_id: int = typer.Argument(..., autocompletion=complete_ids),
     description: List[str] = typer.Argument(...)
 ) -> None:
     """Complete a to-do by setting it as done using its TODO_ID."""
@@ -229,66 +655,112 @@ def update_desc(
 
 
 @app.command(name="complete")
-def set_done(todo_id: int = typer.Argument(...)) -> None:
-    """Complete a to-do by setting it as done using its TODO_ID."""
+def set_done(
+    todo_ids: Optional[str] = typer.Argument(None, callback=ids_callback, autocompletion=complete_ids, help="IDs and ranges, such as 3,7,10-42."),
+    where: Optional[str] = typer.Option(None, "--where", "-w", callback=where_callback, help='Filter, such as "due<today".'),
+    fmt: Optional[str] = output_format_option(),
+) -> None:
+    """Complete the to-dos selected by TODO_IDS and --where."""
+    _check_selection(todo_ids, where)
+    todoer = get_todoer()
+    _report_bulk(todoer.set_done_many(todo_ids, where), "Completing", "completed", fmt)
+
+
+def rule_callback(value: str):
+    from udo import recurrence
+
+    try:
+        recurrence.parse_rule(value)
+    except recurrence.RecurrenceError as error:
+        raise typer.BadParameter(str(error))
+    return value
+
+
+@app.command()
+def repeat(
+    description: List[str] = typer.Argument(...),
+    every: str = typer.Option(..., "--every", "-e", callback=rule_callback, help="day, week, month, year or weekdays such as mon,thu."),
+    priority: int = typer.Option(2, "--priority", "-p", min=1, max=3),
+    due: str = typer.Option("today", "--due", "-d", callback=due_callback, help="Due date of the first occurrence."),
+    until: Optional[str] = typer.Option(None, "--until", callback=due_callback, help="Due date of the last occurrence."),
+) -> None:
+    """Add a to-do that repeats. It is listed as R<ID> on every due date."""
     todoer = get_todoer()
-    todo, error = todoer.set_done(todo_id)
+    series, error = todoer.add_series(description, every, priority, due, until)
     if error:
-        typer.secho(
-            f'Completing to-do # "{todo_id}" failed with "{ERRORS[error]}"',
-            fg=typer.colors.RED,
-        )
+        typer.secho(f'Adding the recurring to-do failed with "{ERRORS[error]}"', fg=typer.colors.RED)
         raise typer.Exit(1)
-    else:
-        typer.secho(
-            f"""to-do # {todo_id} "{todo['description']}" completed!""",
-            fg=typer.colors.GREEN,
-        )
+    typer.secho(
+        f"""to-do # R{series['id']}: "{series['description']}" repeats every {every}""",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command(name="repeat-done")
+def complete_occurrence(
+    series_id: int = typer.Argument(..., help="The ID of the recurring to-do, without the R."),
+    on: Optional[str] = typer.Option(None, "--on", callback=due_callback, help="Due date of the occurrence, the next open one by default."),
+) -> None:
+    """Complete one occurrence of a recurring to-do."""
+    todoer = get_todoer()
+    todo, error = todoer.complete_occurrence(series_id, on)
+    if error:
+        typer.secho(f'Completing an occurrence of to-do # R{series_id} failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(
+        f"""to-do # R{series_id}: "{todo['description']}" due {todo['due']} completed!""",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command(name="repeat-remove")
+def remove_series(
+    series_id: int = typer.Argument(..., help="The ID of the recurring to-do, without the R."),
+) -> None:
+    """Remove a recurring to-do and all of its occurrences."""
+    todoer = get_todoer()
+    series, error = todoer.remove_series(series_id)
+    if error:
+        typer.secho(f'Removing to-do # R{series_id} failed with "{ERRORS[error]}"', fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(f"""to-do # R{series_id}: "{series['description']}" was removed""", fg=typer.colors.GREEN)
 
 
 @app.command()
 def remove(
-    todo_id: int = typer.Argument(...),
+    todo_ids: Optional[str] = typer.Argument(None, callback=ids_callback, autocompletion=complete_ids, help="IDs and ranges, such as 3,7,10-42."),
+    where: Optional[str] = typer.Option(None, "--where", "-w", callback=where_callback, help='Filter, such as "done=1".'),
     force: bool = typer.Option(
         False,
         "--force",
         "-f",
         help="Force deletion without confirmation.",
     ),
+    fmt: Optional[str] = output_format_option(),
 ) -> None:
-    """Remove a to-do using its TODO_ID."""
+    """Remove the to-dos selected by TODO_IDS and --where."""
+    _check_selection(todo_ids, where)
     todoer = get_todoer()
 
-    def _remove():
-        todo, error = todoer.remove(todo_id)
+    if not force:
+        # with a format, stdout is kept for the records
+        err = fmt is not None
+        todo_list, missing, error = todoer.find_todos(todo_ids, where)
         if error:
-            typer.secho(
-                f'Removing to-do # {todo_id} failed with "{ERRORS[error]}"',
-                fg=typer.colors.RED,
-            )
+            typer.secho(f'Reading to-dos failed with "{ERRORS[error]}"', fg=typer.colors.RED, err=err)
             raise typer.Exit(1)
-        else:
-            typer.secho(
-                f"""to-do # {todo_id}: '{todo["description"]}' was removed""",
-                fg=typer.colors.GREEN,
-            )
-
-    if force:
-        _remove()
-    else:
-        todo_list = todoer.get_todo_list()
-        try:
-            todo = todo_list[todo_id - 1]
-        except IndexError:
-            typer.secho("Invalid TODO_ID", fg=typer.colors.RED)
+        if not todo_list:
+            typer.secho("Invalid TODO_ID", fg=typer.colors.RED, err=err)
             raise typer.Exit(1)
-        delete = typer.confirm(
-            f"Delete to-do # {todo_id}: {todo['description']}?"
-        )
-        if delete:
-            _remove()
+        if len(todo_list) == 1:
+            question = f"Delete to-do # {todo_list[0]['id']}: {todo_list[0]['description']}?"
         else:
-            typer.echo("Operation canceled")
+            question = f"Delete {len(todo_list)} to-dos?"
+        if not typer.confirm(question, err=err):
+            typer.echo("Operation canceled", err=err)
+            return
+
+    _report_bulk(todoer.remove_many(todo_ids, where), "Removing", "was removed", fmt)
 
 
 @app.command(name="clear")
@@ -315,14 +787,133 @@ def remove_all(
         typer.echo("Operation canceled")
 
 
+def format_callback(value: Optional[str]):
+    from udo import transfer
+
+    if value is not None and value not in transfer.FORMATS:
+        raise typer.BadParameter(
+            f"Use one of: {', '.join(transfer.FORMATS)}."
+        )
+    return value
+
+
+def _file_format(file, fmt: Optional[str]) -> str:
+    from udo import transfer
+
+    fmt = fmt or transfer.guess_format(file.name)
+    if fmt is None:
+        typer.secho(
+            "Cannot tell the file format, please pass --format",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    return fmt
+
+
+@app.command(name="import")
+def import_todos(
+    file: typer.FileText = typer.Argument(..., help="File to read, - for stdin."),
+    fmt: Optional[str] = typer.Option(
+        None,
+        "--format",
+        callback=format_callback,
+        help="jsonl, csv or todo.txt. Guessed from the file name by default.",
+    ),
+    batch_size: int = typer.Option(1000, "--batch-size", min=1),
+) -> None:
+    """Import to-dos from a JSONL, CSV or todo.txt FILE."""
+    from udo import transfer
+
+    fmt = _file_format(file, fmt)
+    todoer = get_todoer(use_daemon=False)
+    try:
+        result = todoer.import_todos(
+            transfer.read_records(file, fmt), batch_size
+        )
+    except (KeyError, ValueError) as error:
+        typer.secho(
+            f'Importing to-dos failed on a bad record: "{error}"',
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    if result.error:
+        typer.secho(
+            f'Importing to-dos failed with "{ERRORS[result.error]}" '
+            f"after {result.count} to-dos",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    else:
+        typer.secho(f"{result.count} to-dos were imported", fg=typer.colors.GREEN)
+
+
+@app.command(name="export")
+def export_todos(
+    file: typer.FileTextWrite = typer.Argument("-", help="File to write, - for stdout."),
+    fmt: Optional[str] = typer.Option(
+        None,
+        "--format",
+        callback=format_callback,
+        help="jsonl, csv or todo.txt. Guessed from the file name by default.",
+    ),
+) -> None:
+    """Export all to-dos to a JSONL, CSV or todo.txt FILE."""
+    from udo import transfer
+
+    fmt = "jsonl" if fmt is None and file.name == "<stdout>" else fmt
+    fmt = _file_format(file, fmt)
+    todoer = get_todoer(use_daemon=False)
+    with reading(err=file.name == "<stdout>"):
+        count = transfer.write_records(file, fmt, todoer.export_todos())
+    if file.name != "<stdout>":
+        typer.secho(f"{count} to-dos were exported", fg=typer.colors.GREEN)
+
+
+@app.command(name="daemon")
+def run_daemon(
+    stop: bool = typer.Option(
+        False,
+        "--stop",
+        help="Stop the running daemon.",
+    ),
+) -> None:
+    """Serve the to-do database from a resident process."""
+    from udo import daemon
+
+    if stop:
+        if daemon.stop():
+            typer.secho("The daemon was stopped", fg=typer.colors.GREEN)
+        else:
+            typer.secho("No daemon is running", fg=typer.colors.RED)
+            raise typer.Exit(1)
+        return
+
+    db_path = get_db_path()
+    typer.secho(
+        f"Serving {db_path} on {daemon.SOCKET_PATH}", fg=typer.colors.GREEN
+    )
+    try:
+        daemon.serve(db_path)
+    except daemon.DaemonError as error:
+        typer.secho(f"Starting the daemon failed: {error}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+
 def _version_callback(value: bool) -> None:
     if value:
         typer.echo(f"{__app_name__} v{__version__}")
         raise typer.Exit()
 
 
+def _stop_profiling(output: Optional[Path]) -> None:
+    profile = profiling.stop(output)
+    if profile is not None:
+        typer.echo(profile.report(), err=True)
+
+
 @app.callback()
 def main(
+    ctx: typer.Context,
     version: Optional[bool] = typer.Option(
         None,
         "--version",
@@ -330,6 +921,21 @@ def main(
         help="Show the application's version and exit.",
         callback=_version_callback,
         is_eager=True,
-    )
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        envvar="UDO_PROFILE",
+        help="Report where the time of the command goes, on stderr.",
+    ),
+    profile_output: Optional[Path] = typer.Option(
+        None,
+        "--profile-output",
+        envvar="UDO_PROFILE_OUTPUT",
+        help="Write a JSON trace (.json) or a cProfile dump (other names).",
+    ),
 ) -> None:
-    return
+    if profile or profile_output:
+        cprofile = profile_output is not None and profile_output.suffix != ".json"
+        profiling.start(cprofile=cprofile)
+        ctx.call_on_close(lambda: _stop_profiling(profile_output))
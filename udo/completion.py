@@ -0,0 +1,99 @@
+"""This module provides the RP UDo shell completion of to-do IDs.
+
+Completing an ID must not wait for SQLAlchemy to load, so the IDs and the
+start of their descriptions are kept in a text file next to the database,
+such as _todo.sqlite-ids, which the database handler rewrites after every
+write that adds, removes or renames to-dos. The file is only kept once a
+completion has asked for it: the first completion writes it from the
+database with the sqlite3 module. Writes by other programs are not seen
+until the next write of rptodo, completions are only suggestions.
+"""
+
+import os
+from pathlib import Path
+import sqlite3
+import tempfile
+from typing import List, Optional, Tuple
+
+INDEX_SUFFIX = "-ids"
+# characters of the description shown next to an ID
+DESCRIPTION_WIDTH = 40
+# completions offered at most, the shells page longer lists anyway
+MAX_COMPLETIONS = 100
+# what separates the IDs of a spec such as 3,7,10-42
+SEPARATORS = ",-"
+
+
+def index_path(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + INDEX_SUFFIX)
+
+
+# The whole index is read as one value, the IDs and descriptions joined
+# by the ASCII unit and record separators: building a row object for each
+# to-do would take most of the time.
+UNIT_SEPARATOR = "\x1f"
+RECORD_SEPARATOR = "\x1e"
+INDEX_QUERY = f"""SELECT group_concat(id || char(31) || substr(description, 1, {DESCRIPTION_WIDTH}), char(30))
+    FROM (SELECT id, description FROM todo ORDER BY id)"""
+
+
+def write_index(db_path: Path, records: Optional[str]) -> None:
+    """
+    Replace the index of db_path with the records read by INDEX_QUERY, at
+    once, so that a completion never reads half of it.
+    """
+    text = records or ""
+    for whitespace in "\t\n\r":
+        text = text.replace(whitespace, " ")
+    text = text.replace(UNIT_SEPARATOR, "\t").replace(RECORD_SEPARATOR, "\n")
+    path = index_path(db_path)
+    fd, scratch = tempfile.mkstemp(prefix=path.name, dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(text + "\n" if text else "")
+        os.replace(scratch, path)
+    except BaseException:
+        os.unlink(scratch)
+        raise
+
+
+def _rebuild(db_path: Path) -> None:
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        write_index(db_path, connection.execute(INDEX_QUERY).fetchone()[0])
+    finally:
+        connection.close()
+
+
+def complete(db_path: Path, incomplete: str) -> List[Tuple[str, str]]:
+    """
+    Return the completions of the last ID of the spec being typed, as
+    (spec, description) pairs.
+    """
+    cut = max(incomplete.rfind(separator) for separator in SEPARATORS) + 1
+    head, start = incomplete[:cut], incomplete[cut:]
+    path = index_path(db_path)
+    if not path.exists():
+        try:
+            _rebuild(db_path)
+        except (OSError, sqlite3.Error):
+            return []
+    try:
+        lines = path.read_text(encoding="utf-8")
+    except OSError:
+        return []
+
+    completions = []
+    # every line starts with an ID, so a prefix match is a match right
+    # after a newline
+    text = "\n" + lines
+    needle = "\n" + start
+    position = text.find(needle)
+    while position != -1 and len(completions) < MAX_COMPLETIONS:
+        end = text.find("\n", position + 1)
+        if end == -1:
+            break
+        todo_id, _, description = text[position + 1:end].partition("\t")
+        completions.append((head + todo_id, description))
+        position = text.find(needle, end)
+    return completions
@@ -0,0 +1,83 @@
+"""This module provides the RP UDo concurrency model for SQLite.
+
+Several processes may read and write the same database file. WAL lets the
+readers run next to the one writer. Writers open their transaction with
+BEGIN IMMEDIATE, so that they take the write lock before reading instead of
+failing to upgrade a read lock halfway through. SQLite itself waits up to
+busy_timeout for the lock, and a write that still finds the database busy
+is run again a few times, after a jittered exponential backoff.
+"""
+
+import random
+import time
+from typing import Callable, TypeVar
+
+from udo import DB_LOCKED_ERROR, DB_WRITE_ERROR
+
+# execution option of the connections whose transactions write
+WRITE_OPTION = "udo_write"
+
+ATTEMPTS = 5
+FIRST_DELAY = 0.05
+MAX_DELAY = 1.0
+
+# primary result codes, the extended ones keep them in their low byte
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+BUSY_MESSAGES = ("database is locked", "database table is locked", "database is busy")
+
+T = TypeVar("T")
+
+
+def _disable_driver_transactions(dbapi_connection, connection_record) -> None:
+    # pysqlite would otherwise send its own deferred BEGIN before writes
+    dbapi_connection.isolation_level = None
+
+
+def _begin(connection) -> None:
+    if connection.get_execution_options().get(WRITE_OPTION):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        connection.exec_driver_sql("BEGIN")
+
+
+def install(engine) -> None:
+    """Make the transactions of engine follow the model above."""
+    from sqlalchemy import event
+
+    event.listen(engine, "connect", _disable_driver_transactions)
+    event.listen(engine, "begin", _begin)
+
+
+def is_busy(error: Exception) -> bool:
+    """Tell whether error is SQLite giving up on a lock."""
+    original = getattr(error, "orig", error)
+    code = getattr(original, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED)
+    return any(message in str(original) for message in BUSY_MESSAGES)
+
+
+def write_error(error: Exception) -> int:
+    """Return the error code of a failed write."""
+    return DB_LOCKED_ERROR if is_busy(error) else DB_WRITE_ERROR
+
+
+def retry(
+    call: Callable[[], T],
+    attempts: int = ATTEMPTS,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """
+    Return the result of call, running it again while the database is
+    busy, up to attempts times in all. The last error is raised.
+    """
+    delay = FIRST_DELAY
+    for attempt in range(1, attempts + 1):
+        try:
+            return call()
+        except Exception as error:
+            if attempt == attempts or not is_busy(error):
+                raise
+        sleep(random.uniform(0, delay))
+        delay = min(delay * 2, MAX_DELAY)
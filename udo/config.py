@@ -12,6 +12,10 @@ from udo import DB_WRITE_ERROR, DIR_ERROR, FILE_ERROR, SUCCESS, __app_name__
 CONFIG_DIR_PATH = Path(typer.get_app_dir(__app_name__))
 CONFIG_FILE_PATH = CONFIG_DIR_PATH / "config.ini"
 
+DEFAULT_DB_FILE_PATH = Path.home().joinpath(
+    "Desktop/codes/todo_project/_todo.sqlite"
+)
+
 
 def init_app(db_path: str) -> int:
     """Initialize the application."""
@@ -24,6 +28,19 @@ def init_app(db_path: str) -> int:
     return SUCCESS
 
 
+def get_database_path(config_file: Path) -> Path:
+    """Return the current path to the to-do database."""
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    return Path(config_parser["General"]["database"])
+
+
+def get_db_uri(config_file: Path) -> str:
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    return config_parser["General"]["uri"]
+
+
 def _init_config_file() -> int:
     try:
         CONFIG_DIR_PATH.mkdir(exist_ok=True)
@@ -0,0 +1,321 @@
+"""This module provides the RP UDo daemon and its client.
+
+The daemon keeps a warm Todoer, and with it the engine and the ORM mappers,
+and serves it over a Unix domain socket. Every message is a JSON document
+preceded by its length as a 4-byte big-endian integer. A request is
+{"op", "db", "args", "kwargs"} and the reply is {"result"} or {"error"}.
+"""
+
+from datetime import date, datetime
+import itertools
+import json
+import os
+from pathlib import Path
+import signal
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from udo import config
+from udo.udo import (
+    BulkResult,
+    CurrentTodo,
+    ImportResult,
+    SearchResult,
+    StatsCheck,
+    StatsResult,
+    StatsRow,
+    TodoRow,
+)
+
+SOCKET_PATH = config.CONFIG_DIR_PATH / "daemon.sock"
+
+HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+CLIENT_TIMEOUT = 30
+
+
+def _rows(result: List[list]) -> List[TodoRow]:
+    return [TodoRow._make(row) for row in result]
+
+
+def _buckets(result: List[list]) -> List[Tuple[str, List[TodoRow]]]:
+    return [(label, _rows(rows)) for label, rows in result]
+
+
+def _datetime(result: Optional[str]) -> Optional[datetime]:
+    return None if result is None else datetime.fromisoformat(result)
+
+
+def _stats(result: list) -> StatsResult:
+    stats, error = result
+    return StatsResult([StatsRow._make(row) for row in stats], error)
+
+
+# Todoer methods served by the daemon, with the function that rebuilds
+# their result on the client side from its JSON form
+OPERATIONS: Dict[str, Callable[[Any], Any]] = {
+    "add": CurrentTodo._make,
+    "get_todo_list": _rows,
+    "get_sorted_todo_list": _buckets,
+    "query_todo_list": _rows,
+    "next_bucket_change": _datetime,
+    "set_done": CurrentTodo._make,
+    "update": CurrentTodo._make,
+    "remove": CurrentTodo._make,
+    "remove_all": CurrentTodo._make,
+    "find_todos": BulkResult._make,
+    "set_done_many": BulkResult._make,
+    "update_many": BulkResult._make,
+    "remove_many": BulkResult._make,
+    "search": SearchResult._make,
+    "reindex": ImportResult._make,
+    "archive": ImportResult._make,
+    "rebalance": ImportResult._make,
+    "stats": _stats,
+    "check_stats": StatsCheck._make,
+    "add_series": CurrentTodo._make,
+    "complete_occurrence": CurrentTodo._make,
+    "remove_series": CurrentTodo._make,
+}
+
+
+class DaemonError(Exception):
+    pass
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def write_frame(stream: BinaryIO, message: Dict[str, Any]) -> None:
+    payload = json.dumps(message, default=_default, separators=(",", ":")).encode()
+    stream.write(HEADER.pack(len(payload)) + payload)
+
+
+def read_frame(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Return the next message of stream, or None once it is closed."""
+    header = stream.read(HEADER.size)
+    if not header:
+        return None
+    if len(header) < HEADER.size:
+        raise DaemonError("truncated frame header")
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise DaemonError(f"frame of {size} bytes is too large")
+    payload = stream.read(size)
+    if len(payload) < size:
+        raise DaemonError("truncated frame")
+    return json.loads(payload)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self) -> None:
+        while True:
+            try:
+                request = read_frame(self.rfile)
+            except (DaemonError, ValueError) as error:
+                write_frame(self.wfile, {"error": str(error)})
+                return
+            if request is None:
+                return
+            write_frame(self.wfile, self.server.dispatch(request))
+
+
+class TodoDaemon(socketserver.ThreadingUnixStreamServer):
+    """
+    Serve a Todoer over socket_path. Every connection has its own thread,
+    so that a client waiting for its user does not hold the others up,
+    and the requests run one at a time.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, db_path: Path, socket_path: Path) -> None:
+        from udo.udo import Todoer
+
+        self.db_path = db_path
+        self.socket_path = socket_path
+        self.todoer = Todoer(db_path)
+        self._lock = threading.Lock()
+        super().__init__(str(socket_path), _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "ping":
+            return {"result": str(self.db_path)}
+        if op == "shutdown":
+            self.stop()
+            return {"result": None}
+        if op not in OPERATIONS:
+            return {"error": f"unknown operation {op!r}"}
+        if request.get("db") != str(self.db_path):
+            return {"error": "the daemon serves another database"}
+        try:
+            method = getattr(self.todoer, op)
+            with self._lock:
+                return {"result": method(*request.get("args", []), **request.get("kwargs", {}))}
+        except Exception as error:
+            return {"error": f"{type(error).__name__}: {error}"}
+
+    def stop(self) -> None:
+        # shutdown() waits for serve_forever(), which may be our caller
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _socket_path(socket_path: Optional[Path]) -> Path:
+    return socket_path if socket_path is not None else SOCKET_PATH
+
+
+def _open_socket(socket_path: Path) -> Optional[socket.socket]:
+    """Connect to socket_path, or return None when nobody is listening."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CLIENT_TIMEOUT)
+    try:
+        sock.connect(str(socket_path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+def is_running(socket_path: Optional[Path] = None) -> bool:
+    sock = _open_socket(_socket_path(socket_path))
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+
+def serve(db_path: Path, socket_path: Optional[Path] = None) -> None:
+    """Run the daemon in the foreground until it is stopped."""
+    socket_path = _socket_path(socket_path)
+    if socket_path.exists():
+        if is_running(socket_path):
+            raise DaemonError(f"a daemon is already listening on {socket_path}")
+        # left behind by a daemon that did not exit cleanly
+        socket_path.unlink()
+
+    server = TodoDaemon(db_path, socket_path)
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        previous = {
+            signum: signal.signal(signum, lambda *args: server.stop())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+    try:
+        server.serve_forever()
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        server.server_close()
+        from udo.database import dispose_engines
+
+        dispose_engines()
+
+
+def stop(socket_path: Optional[Path] = None) -> bool:
+    """Ask the daemon to exit. Return False if none was running."""
+    client = DaemonTodoer.connect(None, socket_path)
+    if client is None:
+        return False
+    client.call("shutdown")
+    client.close()
+    return True
+
+
+class DaemonTodoer:
+    """Client with the Todoer interface that forwards calls to the daemon."""
+
+    def __init__(self, db_path: Optional[Path], sock: socket.socket) -> None:
+        self._db = str(db_path)
+        self._socket = sock
+        self._stream = sock.makefile("rwb")
+
+    @classmethod
+    def connect(
+        cls,
+        db_path: Optional[Path],
+        socket_path: Optional[Path] = None
+    ) -> Optional["DaemonTodoer"]:
+        """
+        Return a client, or None if no daemon is listening or if it serves
+        another database than db_path. Raises DaemonError if the daemon
+        does not answer.
+        """
+        sock = _open_socket(_socket_path(socket_path))
+        if sock is None:
+            return None
+        client = cls(db_path, sock)
+        try:
+            served = client.call("ping") if db_path is not None else None
+        except DaemonError:
+            client.close()
+            raise
+        if db_path is not None and served != str(db_path):
+            client.close()
+            return None
+        return client
+
+    def call(self, op: str, *args, **kwargs) -> Any:
+        try:
+            write_frame(
+                self._stream,
+                {"op": op, "db": self._db, "args": args, "kwargs": kwargs}
+            )
+            self._stream.flush()
+            reply = read_frame(self._stream)
+        except OSError as error:
+            raise DaemonError(str(error)) from error
+        if reply is None:
+            raise DaemonError("the daemon closed the connection")
+        if "error" in reply:
+            raise DaemonError(reply["error"])
+        return reply["result"]
+
+    def close(self) -> None:
+        self._stream.close()
+        self._socket.close()
+
+    # the streaming reads cannot cross the socket, so they read the whole
+    # list, which the daemon serves quickly anyway
+
+    def stream_sorted_todo_list(
+        self,
+        completed: bool,
+        where: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> Iterator[Tuple[str, TodoRow]]:
+        # limit and offset count in the list order, as Todoer does
+        buckets = self.get_sorted_todo_list(completed, where)
+        rows = ((label, row) for label, rows in buckets for row in rows)
+        start = offset or 0
+        yield from itertools.islice(rows, start, None if limit is None else start + limit)
+
+    def stream_todo_list(self, *args, **kwargs) -> Iterator[TodoRow]:
+        yield from self.query_todo_list(*args, **kwargs)
+
+    def __getattr__(self, op: str):
+        if op not in OPERATIONS:
+            raise AttributeError(op)
+        rebuild = OPERATIONS[op]
+
+        def method(*args, **kwargs):
+            result = self.call(op, *args, **kwargs)
+            return rebuild(result)
+
+        return method
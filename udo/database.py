@@ -1,17 +1,23 @@
 """This module provides the RP UDo database functionality."""
 
-import configparser
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+from bisect import bisect_right
+import contextlib
+from datetime import date, datetime, time, timedelta
+import functools
+import heapq
+import itertools
+from operator import attrgetter
 from pathlib import Path
-from typing import Any, Dict, List, NamedTuple, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
 import os
+import threading
 
 import logging
 
 import sqlalchemy as sqla
-from sqlalchemy import String, Engine, DateTime
+from sqlalchemy import Connection, String, Engine, Date, DateTime, Index
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.util import ClauseAdapter
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -19,21 +25,50 @@ from sqlalchemy.orm import (
     Session
 )
 
-from udo import DB_READ_ERROR, DB_WRITE_ERROR, JSON_ERROR, SUCCESS
-
-from udo.due_options import ToDoDate
+from udo import (
+    DB_READ_ERROR,
+    DB_WRITE_ERROR,
+    ID_ERROR,
+    JSON_ERROR,
+    SUCCESS,
+    completion,
+    concurrency,
+    migrations,
+    profiling,
+    recurrence,
+    shards,
+)
+from udo.config import DEFAULT_DB_FILE_PATH, get_database_path, get_db_uri
 
-DEFAULT_DB_FILE_PATH = Path.home().joinpath(
-    "Desktop/codes/todo_project/_todo.sqlite"
+from udo.due_options import bucket_offsets, time_buckets
+from udo.query import (
+    compile_order_by,
+    compile_predicate,
+    compile_where,
+    due_range,
+    fts_query,
+    ids_clause,
+    missing_ranges,
+    parse as parse_filter,
+    parse_sort,
+    sort_key,
 )
+from udo.udo import ReadError, StatsRow, TodoRow
 
-#SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.abspath(DEFAULT_DB_FILE_PATH)
+T = TypeVar("T")
 
 class Base(DeclarativeBase):
     pass
 
 class ToDo(Base):
     __tablename__ = "todo"
+    __table_args__ = (
+        Index("ix_todo_done_due", "done", "due"),
+        Index("ix_todo_priority_due", "priority", "due"),
+        Index("ix_todo_due", "due"),
+        # archived to-dos keep their IDs, which must not be handed out again
+        {"sqlite_autoincrement": True},
+    )
     extend_existing = True
     id: Mapped[int] = mapped_column(primary_key=True)
     description: Mapped[str] = mapped_column(String(240))
@@ -56,41 +91,176 @@ class ToDo(Base):
             "progress": self.progress,
         }
 
-def get_database_path(config_file: Path) -> Path:
-    """Return the current path to the to-do database."""
-    config_parser = configparser.ConfigParser()
-    config_parser.read(config_file)
-    return Path(config_parser["General"]["database"])
+class ArchivedToDo(Base):
+    """A completed to-do moved out of todo by archive_todos, with its ID."""
+    __tablename__ = "todo_archive"
+    __table_args__ = (Index("ix_todo_archive_due", "due"),)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    description: Mapped[str] = mapped_column(String(240))
+    priority: Mapped[int] = mapped_column()
+    done: Mapped[int] = mapped_column()
+    progress: Mapped[int] = mapped_column()
+    due: Mapped[datetime] = mapped_column(DateTime(timezone=False))
+    archived: Mapped[datetime] = mapped_column(DateTime(timezone=False))
+
+class Shard(Base):
+    """A year of archived to-dos kept in a file of its own, see udo.shards."""
+    __tablename__ = "todo_shard"
+    year: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+
+class Series(Base):
+    """A recurring to-do, whose occurrences are expanded by udo.recurrence."""
+    __tablename__ = "todo_series"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    description: Mapped[str] = mapped_column(String(240))
+    priority: Mapped[int] = mapped_column(default=2)
+    rule: Mapped[str] = mapped_column(String(60))
+    start: Mapped[datetime] = mapped_column(DateTime(timezone=False))
+    until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=False))
+
+class SeriesException(Base):
+    """An occurrence of a series that differs from the rule: a completed one."""
+    __tablename__ = "todo_series_exception"
+    __table_args__ = (Index("ix_todo_series_exception_occurrence", "occurrence"),)
+    series_id: Mapped[int] = mapped_column(sqla.ForeignKey("todo_series.id"), primary_key=True)
+    occurrence: Mapped[datetime] = mapped_column(DateTime(timezone=False), primary_key=True)
+    done: Mapped[int] = mapped_column(default=1)
+
+class Stat(Base):
+    """The to-dos of a due day with the same priority and done, see migrations.STATS_SCHEMA."""
+    __tablename__ = "todo_stats"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    priority: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    done: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    count: Mapped[int] = mapped_column()
+    progress: Mapped[int] = mapped_column()
+
+# the columns of ToDo.as_dict, returned by the single-row writes
+RETURNED_COLUMNS = (ToDo.id, ToDo.description, ToDo.priority, ToDo.done, ToDo.progress)
+# the columns of TodoRow, selected by the list reads
+ROW_COLUMNS = (*RETURNED_COLUMNS, ToDo.due)
+ROW_KEYS = [column.key for column in ROW_COLUMNS]
+ARCHIVED_KEYS = [*ROW_KEYS, "archived"]
+
+# rows archived per transaction, so that other writers only wait for one
+ARCHIVE_BATCH_SIZE = 500
+
+_shard_tables: Dict[int, sqla.Table] = {}
+
+
+def shard_table(year: int) -> sqla.Table:
+    """Return todo_archive in the attached shard of year."""
+    table = _shard_tables.get(year)
+    if table is None:
+        table = ArchivedToDo.__table__.to_metadata(sqla.MetaData(), schema=shards.schema_name(year))
+        _shard_tables[year] = table
+    return table
+
+
+def with_archive(
+    statement, archives: Iterable[sqla.Table] = (ArchivedToDo.__table__,), live: bool = True
+):
+    """
+    Return statement reading todo and the archive tables as one table
+    wherever it reads todo, for the reads that include completed to-dos.
+    todo itself is left out unless live.
+    """
+    selects = [sqla.select(*(table.c[key] for key in ROW_KEYS)) for table in archives]
+    if live:
+        selects.insert(0, sqla.select(*ROW_COLUMNS))
+    todos = sqla.union_all(*selects).subquery("todo_all")
+    # without todo in the union, its columns are matched to todo_all by name
+    return ClauseAdapter(todos, adapt_on_names=not live).traverse(statement)
+
+
+def stream_read(stream: Callable[..., Iterator[T]]) -> Callable[..., Iterator[T]]:
+    """Raise the SQLAlchemy errors of a streamed read as ReadError."""
 
+    @functools.wraps(stream)
+    def read(*args, **kwargs) -> Iterator[T]:
+        try:
+            yield from stream(*args, **kwargs)
+        except sqla.exc.SQLAlchemyError as error:
+            raise ReadError(str(error)) from error
+
+    return read
+
+
+# rows fetched per query by the streaming reads
+PAGE_SIZE = 1000
+
+
+def get_db_uri_by_path(db_path: Path) -> str:
+    return "sqlite:///" + os.path.abspath(db_path)
+
+
+# PRAGMAs applied to every new SQLite connection. WAL lets readers run next
+# to a writer, and NORMAL sync is safe with WAL. cache_size is negative so
+# it is read as KiB instead of pages.
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "busy_timeout=5000",
+    "cache_size=-16000",
+    "mmap_size=268435456",
+)
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
 
-def get_db_uri(config_file: Path) -> str:
-    config_parser = configparser.ConfigParser()
-    config_parser.read(config_file)
-    return config_parser["General"]["uri"]
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
+def get_engine_by_uri(db_uri: str) -> Engine:
+    """
+    Return the engine of db_uri, created once and reused by the process.
+    The schema is created or upgraded when the engine is first made.
+    """
+    with _engines_lock:
+        engine = _engines.get(db_uri)
+        if engine is None:
+            with profiling.phase("engine"):
+                engine = sqla.create_engine(db_uri)
+                if engine.dialect.name == "sqlite":
+                    sqla.event.listen(engine, "connect", _set_sqlite_pragmas)
+                    concurrency.install(engine)
+                profiling.instrument(engine)
+                migrations.migrate(engine, Base.metadata)
+            _engines[db_uri] = engine
+        else:
+            profiling.instrument(engine)
+        return engine
+
+
+def dispose_engines() -> None:
+    """Close the pooled connections of every cached engine and forget them."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
 
 
 def get_engine(config_file: Path) -> Engine:
-    db_uri = get_db_uri(config_file)
-    return sqla.create_engine(db_uri)
+    return get_engine_by_uri(get_db_uri(config_file))
 
 
 def get_session(config_file: Path) -> Session:
-    #db_uri = get_db_uri(config_file)
-    db_uri = "sqlite:///" + os.path.abspath(DEFAULT_DB_FILE_PATH)
-    engine = sqla.create_engine(db_uri)
-    return Session(engine)
+    return Session(get_engine(config_file))
 
 
 def get_session_by_uri(db_uri: str) -> Session:
-    engine = sqla.create_engine(db_uri)
-    return Session(engine)
+    return Session(get_engine_by_uri(db_uri))
+
 
 def init_database(db_path: Path) -> int:
     """Create the to-do database."""
     try:
-        SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.abspath(db_path)
-        engine = sqla.create_engine(SQLALCHEMY_DATABASE_URI)
-        Base.metadata.create_all(bind=engine)
+        engine = get_engine_by_uri(get_db_uri_by_path(db_path))
         with Session(engine) as session:
             dummy_todo = ToDo({
                 "description": "Dummy ToDo",
@@ -107,161 +277,1039 @@ class DBResponse(NamedTuple):
     todo_list: List[Dict[str, Any]]
     error: int
 
+class DBRowsResponse(NamedTuple):
+    todo_list: List[TodoRow]
+    error: int
+
 class DBObjectResponse(NamedTuple):
     todo: ToDo
     error: int
 
+class DBCountResponse(NamedTuple):
+    count: int
+    error: int
+
+class DBStatsResponse(NamedTuple):
+    stats: List[StatsRow]
+    error: int
+
+class DBBulkResponse(NamedTuple):
+    todo_list: List[Dict[str, Any]]
+    missing: List[Tuple[int, int]]
+    error: int
+
 class DBFiteredResponse():
-    def __init__(self, query, error):
+    """
+    The to-dos of query sorted into the list buckets. Only the columns of
+    TodoRow are selected, so no ORM object is built.
+    """
+    def __init__(
+        self,
+        query,
+        error,
+        now: Optional[datetime] = None,
+        archives: Optional[List[sqla.Table]] = None,
+        occurrences: Iterable[TodoRow] = (),
+    ):
         if query != None:
+            bounds, labels = time_buckets(now or datetime.now())
+            with profiling.phase("query"):
+                query = (
+                    query.with_entities(*ROW_COLUMNS)
+                    .where((ToDo.due >= bounds[0]) & (ToDo.due < bounds[-1]))
+                    .order_by(ToDo.due)
+                )
+                if archives is not None:
+                    rows = query.session.execute(with_archive(query.statement, archives)).all()
+                else:
+                    rows = query.all()
+            profiling.count_rows(len(rows))
+
+            with profiling.phase("bucketing"):
+                buckets = [[] for _ in labels]
+                rows = (TodoRow(*row) for row in rows)
+                for row in heapq.merge(rows, occurrences, key=attrgetter("due")):
+                    buckets[bisect_right(bounds, row.due)].append(row)
+
+            # latest first, so that today and outdated end up next to the prompt
             filtered = [
-                
-                ("this year", todos_listed(query, relativedelta(years=1), relativedelta(months=1))),
-                ("january", todos_listed_month(query, ToDoDate().due_month(1), ToDoDate().due_month(12))),
-                ("february", todos_listed_month(query, ToDoDate().due_month(2), ToDoDate().due_month(1))),
-                ("march", todos_listed_month(query, ToDoDate().due_month(3), ToDoDate().due_month(2))),
-                ("april", todos_listed_month(query, ToDoDate().due_month(4), ToDoDate().due_month(3))),
-                ("may", todos_listed_month(query, ToDoDate().due_month(5), ToDoDate().due_month(4))),
-                ("june", todos_listed_month(query, ToDoDate().due_month(6), ToDoDate().due_month(5))),
-                ("july", todos_listed_month(query, ToDoDate().due_month(7), ToDoDate().due_month(6))),
-                ("august", todos_listed_month(query, ToDoDate().due_month(8), ToDoDate().due_month(7))),
-                ("september", todos_listed_month(query, ToDoDate().due_month(9), ToDoDate().due_month(8))),
-                ("october", todos_listed_month(query, ToDoDate().due_month(10), ToDoDate().due_month(9))),
-                ("november", todos_listed_month(query, ToDoDate().due_month(11), ToDoDate().due_month(10))),
-                ("december", todos_listed_month(query, ToDoDate().due_month(12), ToDoDate().due_month(11))),
-
-                ("this month", todos_listed(query, relativedelta(months=1), relativedelta(days=7))),
-                ("this week", todos_listed(query, relativedelta(days=7), relativedelta(days=2))),
-                ("tomorrow", todos_listed(query, relativedelta(days=2), relativedelta(days=1))),
-                ("today", todos_listed(query, relativedelta(days=1), relativedelta(days=0))),
-                ("outdated", todos_listed(query, relativedelta(days=0), -relativedelta(years=5))),
+                (label, buckets[index])
+                for index, label in reversed(list(enumerate(labels)))
+                if label is not None
             ]
 
-            self.todo_list: List[tuple[str, List[Dict[str, Any]]]] = filtered
+            self.todo_list: List[tuple[str, List[TodoRow]]] = filtered
         else:
             self.todo_list = []
         self.error: int = error
 
 
-def todos_listed(query: Session, delta_up: relativedelta, delta_down: relativedelta) -> List[dict]:
-    filtered = query.where((ToDo.due < datetime.now() + delta_up) & (ToDo.due > datetime.now() + delta_down)).all()
-    array = []
-    for todo in filtered:
-        if todo != None:
-            array.append(todo.as_dict())
-        else:
-            array.append(None)
-    return array
-
-def todos_listed_month(query: Session, month_up: datetime, month_down: datetime) -> List[dict]:
-    filtered = query.where((ToDo.due <= month_up) & (ToDo.due > month_down)).all()
-    array = []
-    for todo in filtered:
-        if todo != None:
-            array.append(todo.as_dict())
-        else:
-            array.append(None)
-    return array
-
-
 class DatabaseHandler:
     def __init__(self, db_path: Path) -> None:
         self._db_path = db_path
+        self._db_uri = get_db_uri_by_path(db_path)
+
+    def _session(self) -> Session:
+        return get_session_by_uri(self._db_uri)
+
+    def _write(self, work: Callable[[Connection], T], index: bool = False) -> T:
+        """
+        Return work(connection) run in a write transaction, which is
+        retried while other processes hold the database. index tells that
+        work may add, remove or rename to-dos, see _index_ids.
+        """
+        engine = get_engine_by_uri(self._db_uri)
 
-    def read_todos(self) -> DBResponse:
-        with self._db_path as path:
-            session = get_session(path)
+        def attempt():
+            with engine.connect() as connection:
+                shards.detach_all(connection)
+                connection.execution_options(**{concurrency.WRITE_OPTION: True})
+                with connection.begin():
+                    return work(connection)
+
+        result = concurrency.retry(attempt)
+        if index:
+            self._index_ids()
+        return result
+
+    def _index_ids(self) -> None:
+        """Rewrite the completion index of the IDs, once a completion has made one."""
+        if not completion.index_path(self._db_path).exists():
+            return
+        engine = get_engine_by_uri(self._db_uri)
+        try:
+            with engine.connect() as connection:
+                records = connection.exec_driver_sql(completion.INDEX_QUERY).scalar()
+                completion.write_index(self._db_path, records)
+        except (OSError, sqla.exc.SQLAlchemyError):
+            logging.exception("Rewriting the completion index failed")
+
+    def read_todos(self) -> DBRowsResponse:
+        with self._session() as session:
             try:
-                return DBResponse(
-                    [todo.as_dict() for todo in session.query(ToDo).all()],
-                    SUCCESS
+                with profiling.phase("query"):
+                    rows = session.execute(sqla.select(*ROW_COLUMNS).order_by(ToDo.id))
+                    todo_list = [TodoRow(*row) for row in rows]
+                profiling.count_rows(len(todo_list))
+                return DBRowsResponse(todo_list, SUCCESS)
+            except sqla.exc.SQLAlchemyError:
+                return DBRowsResponse([], DB_READ_ERROR)
+
+    def _list_filter(self, completed: bool, where: Optional[str]) -> list:
+        clauses = [] if completed else [ToDo.done == 0]
+        if where is not None:
+            clauses.append(compile_where(parse_filter(where)))
+        return clauses
+
+    def _series(self, session: Session, after: datetime, before: datetime) -> List[Series]:
+        """Return the series with occurrences that may fall in after <= due < before."""
+        return session.execute(
+            sqla.select(Series).where(
+                Series.start < before, sqla.or_(Series.until.is_(None), Series.until >= after)
+            )
+        ).scalars().all()
+
+    def _occurrences(
+        self,
+        session: Session,
+        series_list: List[Series],
+        after: datetime,
+        before: datetime,
+        completed: bool,
+        where: Optional[str],
+    ) -> List[TodoRow]:
+        """
+        Return the occurrences of series_list due in after <= due < before,
+        by due date, the completed ones only if completed.
+        """
+        if not series_list:
+            return []
+        done = {
+            (series_id, occurrence)
+            for series_id, occurrence in session.execute(
+                sqla.select(SeriesException.series_id, SeriesException.occurrence)
+                .where(SeriesException.occurrence >= after, SeriesException.occurrence < before)
+            )
+        }
+        matches = compile_predicate(parse_filter(where)) if where is not None else None
+
+        rows = []
+        for series in series_list:
+            rule = recurrence.parse_rule(series.rule)
+            for due in recurrence.occurrences(rule, series.start, after, before, series.until):
+                completed_occurrence = (series.id, due) in done
+                if completed_occurrence and not completed:
+                    continue
+                row = TodoRow(
+                    None, series.description, series.priority, int(completed_occurrence),
+                    100 if completed_occurrence else 0, due, series.id,
                 )
-            except:
-                return DBResponse([], DB_READ_ERROR)
+                if matches is None or matches(row):
+                    rows.append(row)
+        rows.sort(key=attrgetter("due", "series"))
+        return rows
 
-    def read_and_sort_todos(self, completed: bool) -> List[tuple[str, List[Dict[str, Any]]]]:
-        with self._db_path as path:
-            session = get_session(path)
-            if completed:
-                query = session.query(ToDo)
-            else:
-                query = session.query(ToDo).where(ToDo.done==0)
+    def read_and_sort_todos(self, completed: bool, where: Optional[str] = None) -> DBFiteredResponse:
+        now = datetime.now()
+        bounds, _ = time_buckets(now)
+        with self._session() as session:
+            query = session.query(ToDo).where(*self._list_filter(completed, where))
             try:
-                return DBFiteredResponse(query, SUCCESS)
-            except:
+                # missed occurrences are not listed as outdated
+                series_list = self._series(session, now, bounds[-1])
+                occurrences = self._occurrences(
+                    session, series_list, now, bounds[-1], completed, where
+                )
+                archives = None
+                if completed:
+                    archives = self._archives(session.connection(), bounds[0], bounds[-1])
+                return DBFiteredResponse(query, SUCCESS, now, archives, occurrences)
+            except sqla.exc.SQLAlchemyError:
                 return DBFiteredResponse(None, DB_READ_ERROR)
 
+    def _archives(
+        self,
+        connection: Connection,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        years: Optional[List[int]] = None,
+    ) -> List[sqla.Table]:
+        """
+        Return the archive tables that may hold due dates in after <= due <
+        before: todo_archive and the shards of the overlapping years, which
+        get attached. years are the shards to choose from, all by default.
+        """
+        if years is None:
+            years = connection.scalars(sqla.select(Shard.year)).all()
+        years = shards.overlapping(years, after, before)
+        shards.attach(connection, self._db_path, years)
+        return [ArchivedToDo.__table__, *(shard_table(year) for year in years)]
+
+    def _read_archived(
+        self,
+        read: Callable[[List[sqla.Table], bool], Any],
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        key: Optional[Callable[[Any], Any]] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """
+        Yield the rows of the statements read(archives, live) over the
+        archive tables that may hold due dates in after <= due < before,
+        and over todo if live. SQLite attaches only MAX_ATTACHED shards to a
+        connection, so more years are read in groups, on a connection each,
+        and the rows of the groups are merged on key, the order of read, or
+        else chained.
+        """
+        engine = get_engine_by_uri(self._db_uri)
+        with contextlib.ExitStack() as stack:
+            connection = stack.enter_context(engine.connect())
+            years = connection.scalars(sqla.select(Shard.year)).all()
+            results = []
+            for index, group in enumerate(shards.groups(shards.overlapping(years, after, before))):
+                if index:
+                    connection = stack.enter_context(engine.connect())
+                archives = self._archives(connection, years=group)
+                # todo and todo_archive are in the main file, read with the first group
+                statement = read(archives if index == 0 else archives[1:], index == 0)
+                if page_size is not None:
+                    statement = statement.execution_options(yield_per=page_size)
+                results.append(connection.execute(statement))
+            if len(results) == 1:
+                yield from results[0]
+            elif key is not None:
+                yield from heapq.merge(*results, key=key)
+            else:
+                yield from itertools.chain(*results)
+
+    def _archive_groups(self) -> List[List[int]]:
+        """Return the shard years in the groups that are attached together."""
+        with self._session() as session:
+            return shards.groups(session.scalars(sqla.select(Shard.year).order_by(Shard.year)).all())
+
+    def _query_rows(self, completed, where, sort, limit, offset, page_size=None) -> Iterator[Any]:
+        """
+        Yield the rows of query_todos. With the archive, every group of
+        shards is read up to offset + limit rows, and offset is skipped
+        once they are merged.
+        """
+        keys = parse_sort(sort or "due")
+        statement = (
+            sqla.select(*ROW_COLUMNS)
+            .where(*self._list_filter(completed, where))
+            .order_by(*compile_order_by(keys))
+        )
+        if not completed:
+            statement = statement.limit(limit).offset(offset)
+            if page_size is not None:
+                statement = statement.execution_options(yield_per=page_size)
+            with self._session() as session:
+                yield from session.execute(statement)
+            return
+        end = None if limit is None else (offset or 0) + limit
+        after, before = due_range(parse_filter(where)) if where is not None else (None, None)
+        rows = self._read_archived(
+            lambda archives, live: with_archive(statement.limit(end), archives, live),
+            after,
+            before,
+            sort_key(keys),
+            page_size,
+        )
+        yield from itertools.islice(rows, offset or 0, end)
+
+    def query_todos(
+        self,
+        completed: bool,
+        where: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> DBRowsResponse:
+        """Return the to-dos matching where in the order of sort, as one list."""
+        try:
+            with profiling.phase("query"):
+                todo_list = [
+                    TodoRow(*row) for row in self._query_rows(completed, where, sort, limit, offset)
+                ]
+            profiling.count_rows(len(todo_list))
+            return DBRowsResponse(todo_list, SUCCESS)
+        except sqla.exc.SQLAlchemyError:
+            return DBRowsResponse([], DB_READ_ERROR)
+
+    @stream_read
+    def stream_query_todos(
+        self,
+        completed: bool,
+        where: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        page_size: int = PAGE_SIZE,
+    ) -> Iterator[TodoRow]:
+        """Yield the rows of query_todos, fetching page_size at a time."""
+        for row in self._query_rows(completed, where, sort, limit, offset, page_size):
+            profiling.count_rows(1)
+            yield TodoRow(*row)
+
+    @stream_read
+    def stream_sorted_todos(
+        self,
+        completed: bool,
+        where: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        now: Optional[datetime] = None,
+        page_size: int = PAGE_SIZE,
+    ) -> Iterator[Tuple[str, TodoRow]]:
+        """
+        Yield (bucket label, row) in the order of the list, latest bucket
+        first. Every bucket is read in keyset pages of page_size rows on
+        the (due, id) order of the due indexes, so that the first rows come
+        without reading the others and memory does not grow with the list.
+        The occurrences of the series are merged into each bucket as it is
+        reached. limit and offset count rows in that order.
+        """
+        bounds, labels = time_buckets(now or datetime.now())
+        filters = self._list_filter(completed, where)
+        skip = offset or 0
+        left = limit
+        with self._session() as session:
+            series_list = self._series(session, bounds[1], bounds[-1])
+            if completed:
+                connection = session.connection()
+                years = connection.scalars(sqla.select(Shard.year)).all()
+                # attached once for the whole listing, each bucket reads its own
+                self._archives(connection, bounds[0], bounds[-1], years)
+            for index in range(len(labels) - 1, 0, -1):
+                if left == 0:
+                    return
+                archives = None
+                if completed:
+                    archives = self._archives(
+                        connection, bounds[index - 1], bounds[index], years
+                    )
+                rows = self._bucket_rows(
+                    session, bounds[index - 1], bounds[index], filters, archives, page_size
+                )
+                # missed occurrences are not listed as outdated
+                if index > 1 and series_list:
+                    occurrences = self._occurrences(
+                        session, series_list, bounds[index - 1], bounds[index], completed, where
+                    )
+                    rows = heapq.merge(rows, occurrences, key=attrgetter("due"))
+                for row in rows:
+                    if skip:
+                        skip -= 1
+                        continue
+                    if left is not None:
+                        if left == 0:
+                            return
+                        left -= 1
+                    yield labels[index], row
+
+    def next_bucket_change(
+        self,
+        completed: bool,
+        where: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[datetime]:
+        """
+        Return when the first to-do of the list moves to another time bucket
+        before the end of the day of now, None if none does. Each bound of
+        the buckets that moves with now sweeps a window until midnight, and
+        the first row in it moves when the bound reaches it.
+        """
+        now = now or datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), time())
+        offsets = bucket_offsets()
+        filters = self._list_filter(completed, where)
+        changes = []
+        with self._session() as session:
+            series_list = self._series(session, now + offsets[0], midnight + offsets[-1])
+            for offset in offsets:
+                after, before = now + offset, midnight + offset
+                archives = None
+                if completed:
+                    archives = self._archives(session.connection(), after, before)
+                rows = self._bucket_rows(session, after, before, filters, archives, 1)
+                occurrences = self._occurrences(session, series_list, after, before, completed, where)
+                # both come by due date, so their first rows are enough
+                for row in itertools.chain(itertools.islice(rows, 1), occurrences[:1]):
+                    changes.append(row.due - offset)
+        return min(changes, default=None)
+
+    def _bucket_rows(self, session, after, before, filters, archives, page_size) -> Iterator[TodoRow]:
+        """Yield the rows due in after <= due < before in keyset pages."""
+        window = (ToDo.due >= after, ToDo.due < before)
+        cursor = None
+        while True:
+            statement = sqla.select(*ROW_COLUMNS).where(*filters, *window)
+            if cursor is not None:
+                statement = statement.where(sqla.tuple_(ToDo.due, ToDo.id) > cursor)
+            statement = statement.order_by(ToDo.due, ToDo.id).limit(page_size)
+            if archives is not None:
+                statement = with_archive(statement, archives)
+            with profiling.phase("query"):
+                rows = session.execute(statement).all()
+            profiling.count_rows(len(rows))
+            for row in rows:
+                yield TodoRow(*row)
+            if len(rows) < page_size:
+                break
+            cursor = (rows[-1].due, rows[-1].id)
+
     def write_todos(self, todo_list: List[Dict[str, Any]]) -> DBResponse:
+        """Insert todo_list with one statement and return it with the new IDs."""
+        engine = get_engine_by_uri(self._db_uri)
+        insert = sqla.insert(ToDo)
+        # an executemany takes its columns from the first row, so every row
+        # gets the same keys, with the column defaults filling the gaps
+        keys = {key for todo in todo_list for key in todo}
+        defaults = {
+            key: column.default.arg if column.default is not None else None
+            for key, column in ToDo.__table__.c.items() if key in keys
+        }
+        rows = [{**defaults, **todo} for todo in todo_list]
+
+        def insert_rows(connection: Connection) -> List[int]:
+            if engine.dialect.insert_returning:
+                # the rows of one INSERT get ascending IDs in the order of
+                # its VALUES, so sorting maps them back without making
+                # SQLAlchemy split the batch into a statement per row
+                return sorted(connection.execute(insert.returning(ToDo.id), rows).scalars())
+            return [
+                connection.execute(insert, row).inserted_primary_key[0]
+                for row in rows
+            ]
+
+        try:
+            ids = self._write(insert_rows, index=True)
+        except sqla.exc.SQLAlchemyError as error:
+            logging.exception("Writing to-dos failed")
+            return DBResponse(todo_list, concurrency.write_error(error))
+        return DBResponse(
+            [{**todo, "id": todo_id} for todo, todo_id in zip(todo_list, ids)], SUCCESS
+        )
+
+    def write_todo_batches(self, batches: Iterable[List[Dict[str, Any]]]) -> DBCountResponse:
+        """
+        Insert each batch of rows with one executemany in its own
+        transaction. Batches already written stay if a later one fails.
+        """
+        count = 0
+        insert = sqla.insert(ToDo)
+        try:
+            for batch in batches:
+                self._write(lambda connection: connection.execute(insert, batch))
+                count += len(batch)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBCountResponse(count, concurrency.write_error(error))
+        finally:
+            # once for all the batches
+            self._index_ids()
+        return DBCountResponse(count, SUCCESS)
+
+    @stream_read
+    def stream_todos(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield every to-do, archived ones included, batch_size rows at a time."""
+        rows = self._read_archived(
+            lambda archives, live: with_archive(
+                sqla.select(*ROW_COLUMNS).order_by(ToDo.id), archives, live
+            ),
+            key=attrgetter("id"),
+            page_size=batch_size,
+        )
+        for row in rows:
+            yield row._asdict()
+
+    @stream_read
+    def stream_columns(
+        self,
+        completed: bool = True,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        batch_size: int = 10000,
+    ) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        Yield (due as Unix seconds, priority, done, progress) of the to-dos
+        due in after <= due < before, archived ones included if completed.
+        """
+        window = []
+        if after is not None:
+            window.append(ToDo.due >= after)
+        if before is not None:
+            window.append(ToDo.due < before)
+        statement = sqla.select(
+            sqla.cast(sqla.func.strftime("%s", ToDo.due), sqla.Integer),
+            ToDo.priority,
+            ToDo.done,
+            ToDo.progress,
+        ).where(*self._list_filter(completed, None), *window)
+        if completed:
+            rows = self._read_archived(
+                lambda archives, live: with_archive(statement, archives, live),
+                after,
+                before,
+                page_size=batch_size,
+            )
+            for row in rows:
+                yield tuple(row)
+            return
+        with self._session() as session:
+            for row in session.execute(statement.execution_options(yield_per=batch_size)):
+                yield tuple(row)
+
+    def _selection(self, ranges: Optional[List[Tuple[int, int]]], where: Optional[str]):
+        clauses = []
+        if ranges:
+            clauses.append(ids_clause(ranges))
+        if where is not None:
+            clauses.append(compile_where(parse_filter(where)))
+        return sqla.and_(*clauses)
+
+    def _matched(self, connection, condition) -> List[Dict[str, Any]]:
+        rows = connection.execute(
+            sqla.select(*RETURNED_COLUMNS).where(condition).order_by(ToDo.id)
+        )
+        return [row._asdict() for row in rows]
+
+    def _missing(
+        self, connection, ranges, where, todo_list: List[Dict[str, Any]]
+    ) -> List[Tuple[int, int]]:
+        """Return the ranges of IDs at the ends of ranges that are not in the database."""
+        if not ranges:
+            return []
+        if where is None:
+            found = {todo["id"] for todo in todo_list}
+        else:
+            # the filter may have dropped IDs that do exist
+            found = set(connection.scalars(sqla.select(ToDo.id).where(ids_clause(ranges))))
+        return missing_ranges(ranges, found)
+
+    def select_todos(self, ranges=None, where: Optional[str] = None) -> DBBulkResponse:
+        """Return the to-dos with an ID in ranges that match where."""
+        try:
+            with self._session() as session:
+                todo_list = self._matched(session, self._selection(ranges, where))
+                missing = self._missing(session, ranges, where, todo_list)
+            return DBBulkResponse(todo_list, missing, SUCCESS)
+        except sqla.exc.SQLAlchemyError:
+            return DBBulkResponse([], [], DB_READ_ERROR)
+
+    def update_todos(self, ranges=None, where: Optional[str] = None, **kwargs) -> DBBulkResponse:
+        """Apply kwargs to every selected to-do with one UPDATE."""
+        condition = self._selection(ranges, where)
+
+        def update(connection: Connection):
+            todo_list = self._matched(connection, condition)
+            missing = self._missing(connection, ranges, where, todo_list)
+            connection.execute(sqla.update(ToDo).where(condition).values(**kwargs))
+            return todo_list, missing
+
+        try:
+            todo_list, missing = self._write(update, index="description" in kwargs)
+            # due is not part of the matched columns, nor JSON serializable
+            todo_list = [
+                {**todo, **{key: value for key, value in kwargs.items() if key in todo}}
+                for todo in todo_list
+            ]
+            return DBBulkResponse(todo_list, missing, SUCCESS)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBBulkResponse([], [], concurrency.write_error(error))
+
+    def delete_todos(self, ranges=None, where: Optional[str] = None) -> DBBulkResponse:
+        """Delete every selected to-do with one DELETE."""
+        condition = self._selection(ranges, where)
+
+        def delete(connection: Connection):
+            todo_list = self._matched(connection, condition)
+            missing = self._missing(connection, ranges, where, todo_list)
+            connection.execute(sqla.delete(ToDo).where(condition))
+            return todo_list, missing
+
         try:
-            with self._db_path as path:
-                session = get_session(path)
-                session.add_all(
-                    [ToDo(d) for d in todo_list]
+            todo_list, missing = self._write(delete, index=True)
+            return DBBulkResponse(todo_list, missing, SUCCESS)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBBulkResponse([], [], concurrency.write_error(error))
+
+    def search_todos(
+        self,
+        text: str,
+        completed: bool = False,
+        bucket: Optional[str] = None,
+        limit: int = 50,
+        now: Optional[datetime] = None,
+    ) -> DBResponse:
+        """
+        Return the to-dos whose description matches the search text, best
+        match first. Open to-dos only unless completed, archived ones
+        included then, and only the ones due in the list bucket if one is
+        given.
+        """
+        match = fts_query(text)
+        after = before = None
+        if bucket is not None:
+            bounds, labels = time_buckets(now or datetime.now())
+            index = labels.index(bucket)
+            after, before = bounds[index - 1], bounds[index]
+
+        def matching(table: sqla.Table):
+            index_name = f"{table.name}_fts"
+            fts = sqla.table(index_name, sqla.column("rowid"), schema=table.schema)
+            statement = (
+                sqla.select(
+                    *(table.c[key] for key in ROW_KEYS),
+                    sqla.literal_column(f"bm25({index_name})").label("rank"),
                 )
-                try:
-                    session.commit()
-                except:
-                    logging.exception("An exception below:")
+                .join_from(fts, table, table.c.id == fts.c.rowid)
+                .where(sqla.literal_column(index_name).op("MATCH")(match))
+            )
+            if bucket is not None:
+                statement = statement.where(table.c.due >= after, table.c.due < before)
+            return statement
 
+        def ranked(statements) -> sqla.Select:
+            found = sqla.union_all(*statements).subquery()
+            return (
+                sqla.select(*(found.c[key] for key in ROW_KEYS), found.c.rank)
+                .order_by(found.c.rank, found.c.id)
+                .limit(limit)
+            )
+
+        try:
+            with profiling.phase("query"):
+                if completed:
+                    rows = self._read_archived(
+                        lambda archives, live: ranked(
+                            matching(table)
+                            for table in ([ToDo.__table__] if live else []) + archives
+                        ),
+                        after,
+                        before,
+                        key=attrgetter("rank", "id"),
+                    )
+                    rows = list(itertools.islice(rows, limit))
+                else:
+                    with self._session() as session:
+                        rows = session.execute(
+                            ranked([matching(ToDo.__table__).where(ToDo.done == 0)])
+                        ).all()
+                todo_list = [{key: row._mapping[key] for key in ROW_KEYS} for row in rows]
+            profiling.count_rows(len(todo_list))
             return DBResponse(todo_list, SUCCESS)
-        except: 
-            return DBResponse(todo_list, DB_WRITE_ERROR)
+        except sqla.exc.SQLAlchemyError:
+            return DBResponse([], DB_READ_ERROR)
+
+    def rebuild_search_index(self) -> DBCountResponse:
+        """Index every description again and return how many there are."""
+
+        def rebuild(connection: Connection, years: List[int], live: bool) -> int:
+            count = 0
+            archives = self._archives(connection, years=years)
+            # todo and todo_archive are in the main file, rebuilt with the first group
+            tables = [ToDo.__table__, *archives] if live else archives[1:]
+            for table in tables:
+                migrations.rebuild_search_index(connection, table.name, table.schema)
+                count += connection.execute(
+                    sqla.select(sqla.func.count()).select_from(table)
+                ).scalar()
+            return count
+
+        try:
+            count = sum(
+                self._write(lambda connection: rebuild(connection, years, index == 0))
+                for index, years in enumerate(self._archive_groups())
+            )
+        except sqla.exc.SQLAlchemyError as error:
+            return DBCountResponse(0, concurrency.write_error(error))
+        return DBCountResponse(count, SUCCESS)
+
+    def archive_todos(
+        self, before: datetime, batch_size: int = ARCHIVE_BATCH_SIZE
+    ) -> DBCountResponse:
+        """
+        Move the completed to-dos due before before into todo_archive, in
+        transactions of batch_size rows, and return how many were moved.
+        Batches already moved stay if a later one fails.
+        """
+        chosen = (
+            sqla.select(ToDo.id)
+            .where(ToDo.done == 1, ToDo.due < before)
+            .order_by(ToDo.id)
+            .limit(batch_size)
+        )
+
+        def move(connection: Connection) -> int:
+            ids = connection.scalars(chosen).all()
+            if ids:
+                rows = (
+                    sqla.select(*ROW_COLUMNS, sqla.literal(datetime.now(), DateTime()))
+                    .where(ToDo.id.in_(ids))
+                )
+                moved = ToDo.id.in_(ids)
+                if connection.scalar(sqla.select(sqla.func.count()).select_from(Shard)):
+                    moved = sqla.and_(moved, self._copy_to_shards(connection, rows, ToDo.due))
+                else:
+                    connection.execute(sqla.insert(ArchivedToDo).from_select(ARCHIVED_KEYS, rows))
+                return connection.execute(sqla.delete(ToDo).where(moved)).rowcount
+            return 0
+
+        response = self._move_batches(move)
+        if response.count:
+            self._index_ids()
+        return response
+
+    def rebalance_archive(self, batch_size: int = ARCHIVE_BATCH_SIZE) -> DBCountResponse:
+        """
+        Move todo_archive into one shard per due year, in transactions of
+        batch_size rows, and return how many were moved. archive_todos
+        writes to the shards from then on.
+        """
+        # in due order, so that a batch spans as few years as it can
+        chosen = (
+            sqla.select(ArchivedToDo.id)
+            .order_by(ArchivedToDo.due, ArchivedToDo.id)
+            .limit(batch_size)
+        )
+
+        def move(connection: Connection) -> int:
+            ids = connection.scalars(chosen).all()
+            if ids:
+                rows = (
+                    sqla.select(*(getattr(ArchivedToDo, key) for key in ARCHIVED_KEYS))
+                    .where(ArchivedToDo.id.in_(ids))
+                )
+                copied = self._copy_to_shards(connection, rows, ArchivedToDo.due)
+                return connection.execute(
+                    sqla.delete(ArchivedToDo).where(ArchivedToDo.id.in_(ids), copied)
+                ).rowcount
+            return 0
+
+        return self._move_batches(move)
+
+    def _move_batches(self, move: Callable[[Connection], int]) -> DBCountResponse:
+        count = 0
+        try:
+            while True:
+                moved = self._write(move)
+                count += moved
+                if not moved:
+                    break
+        except sqla.exc.SQLAlchemyError as error:
+            return DBCountResponse(count, concurrency.write_error(error))
+        return DBCountResponse(count, SUCCESS)
+
+    def _copy_to_shards(self, connection: Connection, rows, due):
+        """
+        Copy rows, selected with the ARCHIVED_KEYS columns, into the shards
+        of their due years, which are created and registered if new, and
+        return the condition on due of the rows copied. Only as many years
+        as SQLite attaches are copied at once, the earliest. A row copied by
+        a move cut short is replaced.
+        """
+        years = sorted({
+            value.year for value in connection.scalars(sqla.select(rows.subquery().c.due))
+        })[:shards.MAX_ATTACHED]
+        known = set(connection.scalars(sqla.select(Shard.year)).all())
+        for year in years:
+            if year not in known:
+                shards.create(shards.shard_path(self._db_path, year), ArchivedToDo.__table__)
+                connection.execute(sqla.insert(Shard).values(year=year))
+        shards.attach(connection, self._db_path, years)
+        for year in years:
+            connection.execute(
+                sqla.insert(shard_table(year)).prefix_with("OR REPLACE").from_select(
+                    ARCHIVED_KEYS,
+                    rows.where(due >= datetime(year, 1, 1), due < datetime(year + 1, 1, 1)),
+                )
+            )
+        return due < datetime(years[-1] + 1, 1, 1)
+
+    def write_series(self, series: Dict[str, Any]) -> DBObjectResponse:
+        """Add a recurring to-do and return it with its ID."""
+
+        def insert(connection: Connection) -> int:
+            return connection.execute(sqla.insert(Series).values(**series)).inserted_primary_key[0]
+
+        try:
+            series_id = self._write(insert)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBObjectResponse(series, concurrency.write_error(error))
+        return DBObjectResponse({**series, "id": series_id}, SUCCESS)
+
+    def complete_occurrence(
+        self, series_id: int, day: Optional[datetime] = None, now: Optional[datetime] = None
+    ) -> DBObjectResponse:
+        """
+        Record the occurrence of a series due on day, or else its first open
+        one from now on, as done, and return it. The series is not copied.
+        """
+        now = now or datetime.now()
+
+        def complete(connection: Connection) -> Optional[TodoRow]:
+            series = connection.execute(
+                sqla.select(*Series.__table__.c).where(Series.id == series_id)
+            ).first()
+            if series is None:
+                return None
+            rule = recurrence.parse_rule(series.rule)
+            after = now if day is None else day.replace(hour=0, minute=0, second=0, microsecond=0)
+            done = set(connection.scalars(
+                sqla.select(SeriesException.occurrence).where(
+                    SeriesException.series_id == series_id, SeriesException.occurrence >= after
+                )
+            ))
+            if day is not None:
+                before = after + timedelta(days=1)
+            else:
+                # one more occurrence than the completed ones holds an open one
+                before = recurrence.horizon(rule, series.start, after, len(done) + 1)
+            try:
+                for due in recurrence.occurrences(rule, series.start, after, before, series.until):
+                    if due not in done:
+                        connection.execute(
+                            sqla.insert(SeriesException).values(series_id=series_id, occurrence=due, done=1)
+                        )
+                        return TodoRow(None, series.description, series.priority, 1, 100, due, series_id)
+            except OverflowError:
+                # the series runs into the end of the calendar, in year 9999
+                pass
+            return None
+
+        try:
+            row = self._write(complete)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBObjectResponse(None, concurrency.write_error(error))
+        if row is None:
+            return DBObjectResponse(None, ID_ERROR)
+        return DBObjectResponse(row._asdict(), SUCCESS)
+
+    def delete_series(self, series_id: int) -> DBObjectResponse:
+        """Delete a recurring to-do with its exceptions and return it."""
+
+        def delete(connection: Connection) -> Optional[Dict[str, Any]]:
+            series = connection.execute(
+                sqla.select(Series.id, Series.description, Series.priority, Series.rule)
+                .where(Series.id == series_id)
+            ).first()
+            if series is not None:
+                connection.execute(
+                    sqla.delete(SeriesException).where(SeriesException.series_id == series_id)
+                )
+                connection.execute(sqla.delete(Series).where(Series.id == series_id))
+            return None if series is None else series._asdict()
+
+        try:
+            series = self._write(delete)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBObjectResponse(None, concurrency.write_error(error))
+        if series is None:
+            return DBObjectResponse(None, ID_ERROR)
+        return DBObjectResponse(series, SUCCESS)
 
     def get_todo(self, todo_id):
         try:
-            with self._db_path as path:
-                session = get_session(path)
+            with self._session() as session:
                 todo = session.query(ToDo).where(ToDo.id == todo_id).scalar() 
                 return DBObjectResponse(todo, SUCCESS)
         except:
             return DBObjectResponse(None, DB_READ_ERROR)
 
-    def delete_todo(self, todo_id):
+    def delete_todo(self, todo_id: int) -> DBObjectResponse:
+        """Delete a to-do and return it, with DELETE ... RETURNING if possible."""
+        engine = get_engine_by_uri(self._db_uri)
+        condition = ToDo.id == todo_id
+
+        def delete(connection: Connection):
+            if engine.dialect.delete_returning:
+                return connection.execute(
+                    sqla.delete(ToDo).where(condition).returning(*RETURNED_COLUMNS)
+                ).first()
+            row = connection.execute(sqla.select(*RETURNED_COLUMNS).where(condition)).first()
+            connection.execute(sqla.delete(ToDo).where(condition))
+            return row
+
         try:
-            with self._db_path as path:
-                session = get_session(path)
-                todo = session.query(ToDo).where(ToDo.id == todo_id).scalar() 
-                todo_dict = todo.as_dict()
-                session.delete(todo)
-                try:
-                    session.commit()
-                    return DBObjectResponse(todo_dict, SUCCESS)
-                except:
-                    session.rollback()
-                    return DBObjectResponse(todo_dict, DB_WRITE_ERROR)
-            
-        except:
-            return DBObjectResponse(None, DB_WRITE_ERROR)
+            row = self._write(delete, index=True)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBObjectResponse(None, concurrency.write_error(error))
+        if row is None:
+            return DBObjectResponse(None, ID_ERROR)
+        return DBObjectResponse(row._asdict(), SUCCESS)
+
+    def read_stats(self, now: Optional[datetime] = None) -> DBStatsResponse:
+        """
+        Return the count and total progress of the to-dos of each list
+        bucket, priority and done, from todo_stats. Only the days that a
+        bucket bound falls in are counted from the to-dos themselves. The
+        triggers only follow todo, so archived to-dos are not counted.
+        """
+        now = now or datetime.now()
+        bounds, labels = time_buckets(now)
+        order = ["outdated", *labels[2:], "later"]
+
+        def label(due: datetime) -> str:
+            index = bisect_right(bounds, due)
+            if index <= 1:
+                return "outdated"
+            return labels[index] if index < len(labels) else "later"
+
+        cut_days = sorted({bound.date() for bound in bounds})
+        cut = sqla.or_(*(
+            sqla.and_(
+                ToDo.due >= datetime.combine(day, time()),
+                ToDo.due < datetime.combine(day, time()) + timedelta(days=1),
+            )
+            for day in cut_days
+        ))
+        totals: Dict[Tuple[str, int, int], List[int]] = {}
+
+        def add(bucket: str, priority: int, done: int, count: int, progress: int) -> None:
+            total = totals.setdefault((bucket, priority, done), [0, 0])
+            total[0] += count
+            total[1] += progress
+
+        try:
+            with self._session() as session:
+                with profiling.phase("query"):
+                    days = session.execute(
+                        sqla.select(Stat.day, Stat.priority, Stat.done, Stat.count, Stat.progress)
+                        .where(Stat.day.not_in(cut_days))
+                    ).all()
+                    todos = session.execute(
+                        sqla.select(ToDo.due, ToDo.priority, ToDo.done, ToDo.progress).where(cut)
+                    ).all()
+            profiling.count_rows(len(days) + len(todos))
+        except sqla.exc.SQLAlchemyError:
+            return DBStatsResponse([], DB_READ_ERROR)
+        # a day without a bound in it is all in one bucket
+        for day, priority, done, count, progress in days:
+            add(label(datetime.combine(day, time())), priority, done, count, progress)
+        for due, priority, done, progress in todos:
+            add(label(due), priority, done, 1, progress)
+        stats = [
+            StatsRow(bucket, priority, done, *total)
+            for (bucket, priority, done), total in totals.items()
+        ]
+        stats.sort(key=lambda row: (order.index(row.bucket), row.priority, row.done))
+        return DBStatsResponse(stats, SUCCESS)
+
+    def check_stats(self, repair: bool = True) -> DBResponse:
+        """
+        Count the to-dos again and return the rows of todo_stats that differ
+        from the counts, as dicts with both, then refill it if repair.
+        """
+
+        def check(connection: Connection) -> List[Dict[str, Any]]:
+            live = {
+                (row.day, row.priority, row.done): (row.count, row.progress)
+                for row in connection.execute(sqla.select(Stat))
+            }
+            expected = {
+                (date.fromisoformat(row.day), row.priority, row.done): (row.count, row.progress)
+                for row in connection.exec_driver_sql(migrations.STATS_QUERY)
+            }
+            differences = [
+                {
+                    "day": key[0], "priority": key[1], "done": key[2],
+                    "count": live.get(key, (0, 0))[0],
+                    "progress": live.get(key, (0, 0))[1],
+                    "expected_count": expected.get(key, (0, 0))[0],
+                    "expected_progress": expected.get(key, (0, 0))[1],
+                }
+                for key in sorted(live.keys() | expected.keys())
+                if live.get(key) != expected.get(key)
+            ]
+            if differences and repair:
+                migrations.rebuild_stats(connection)
+            return differences
+
+        try:
+            differences = self._write(check)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBResponse([], concurrency.write_error(error))
+        return DBResponse(differences, SUCCESS)
 
     def delete_all(self):
+        def delete(connection: Connection, years: List[int], live: bool) -> None:
+            archives = self._archives(connection, years=years)
+            for table in archives if live else archives[1:]:
+                connection.execute(sqla.delete(table))
+            if live:
+                for entity in (ToDo, SeriesException, Series):
+                    connection.execute(sqla.delete(entity))
+
         try:
-            with self._db_path as path:
-                session = get_session(path)
-                session.query(ToDo).delete()
-                try:
-                    session.commit()
-                    return DBObjectResponse({}, SUCCESS)
-                except:
-                    session.rollback()
-                    return DBObjectResponse({}, DB_WRITE_ERROR)
-        except:
-            return DBObjectResponse(None, DB_WRITE_ERROR)
+            # the main file last, a group of shards at a time before it
+            groups = list(enumerate(self._archive_groups()))
+            for index, years in reversed(groups):
+                self._write(lambda connection: delete(connection, years, index == 0), index=index == 0)
+            return DBObjectResponse({}, SUCCESS)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBObjectResponse({}, concurrency.write_error(error))
+
+    def update_todo(self, todo_id: int, **kwargs) -> DBObjectResponse:
+        """Update a to-do and return it, with UPDATE ... RETURNING if possible."""
+        engine = get_engine_by_uri(self._db_uri)
+        condition = ToDo.id == todo_id
+        select = sqla.select(*RETURNED_COLUMNS).where(condition)
+
+        def update(connection: Connection):
+            if not kwargs:
+                return connection.execute(select).first()
+            if engine.dialect.update_returning:
+                return connection.execute(
+                    sqla.update(ToDo).where(condition).values(**kwargs)
+                    .returning(*RETURNED_COLUMNS)
+                ).first()
+            connection.execute(sqla.update(ToDo).where(condition).values(**kwargs))
+            return connection.execute(select).first()
 
-    def update_todo(self, todo_id, **kwargs):
         try:
-            with self._db_path as path:
-                session = get_session(path)
-                todo = session.query(ToDo).where(ToDo.id == todo_id)
-                print(kwargs)
-
-                todo.update(kwargs)
-                
-                try:
-                    session.commit()
-                    return DBObjectResponse(todo.scalar().as_dict(), SUCCESS)
-                except:
-                    session.rollback()
-                    return DBObjectResponse({}, DB_WRITE_ERROR)
-            
-        except:
-            return DBObjectResponse(None, DB_WRITE_ERROR)
\ No newline at end of file
+            row = self._write(update, index="description" in kwargs)
+        except sqla.exc.SQLAlchemyError as error:
+            return DBObjectResponse(None, concurrency.write_error(error))
+        if row is None:
+            return DBObjectResponse(None, ID_ERROR)
+        return DBObjectResponse(row._asdict(), SUCCESS)
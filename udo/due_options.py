@@ -1,5 +1,7 @@
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 due_options = {
         None: None,
@@ -122,82 +124,6 @@ due_options = {
         "31": "31"
 }
 
-map_options = {
-    "today": "today",
-    "tomorrow": "tomorrow",
-    "mon": "day",
-    "tue": "day",
-    "wed": "day",
-    "thu": "day",
-    "fri": "day",
-    "sat": "day",
-    "sun": "day",
-    "week": "this_week",
-    "month": "this_month",
-    "jan": "month",
-    "feb": "month",
-    "mar": "month",
-    "apr": "month",
-    "may": "month",
-    "jun": "month",
-    "jul": "month",
-    "aug": "month",
-    "sep": "month",
-    "oct": "month",
-    "nov": "month",
-    "dec": "month",
-    "year": "this_year",
-    "2023": "year",
-    "2024": "year",
-    "2025": "year",
-    "2026": "year",
-    "2027": "year",
-    "2028": "year",
-    "2029": "year",
-    "2030": "year",
-    "2031": "year",
-    "2032": "year",
-    "2033": "year",
-    "2034": "year",
-    "2035": "year",
-    "2036": "year",
-    "2037": "year",
-    "2038": "year",
-    "2039": "year",
-    "2040": "year",
-    "01": "date",
-    "02": "date",
-    "03": "date",
-    "04": "date",
-    "05": "date",
-    "06": "date",
-    "07": "date",
-    "08": "date",
-    "09": "date",
-    "10": "date",
-    "11": "date",
-    "12": "date",
-    "13": "date",
-    "14": "date",
-    "15": "date",
-    "16": "date",
-    "17": "date",
-    "18": "date",
-    "19": "date",
-    "20": "date",
-    "21": "date",
-    "22": "date",
-    "23": "date",
-    "24": "date",
-    "25": "date",
-    "26": "date",
-    "27": "date",
-    "28": "date",
-    "29": "date",
-    "30": "date",
-    "31": "date"
-}
-
 def map_weekday(weekday: str) -> int:
     table = {
     "mon": 1,
@@ -210,52 +136,233 @@ def map_weekday(weekday: str) -> int:
     }
     return table[weekday]
 
-def map_month(month: str) -> int:
-    table = {
-    "jan": 1,
-    "feb": 2,
-    "mar": 3,
-    "apr": 4,
-    "may": 5,
-    "jun": 6,
-    "jul": 7,
-    "aug": 8,
-    "sep": 9,
-    "oct": 10,
-    "nov": 11,
-    "dec": 12
-    }
-    return table[month]
+# The due strings are read by one compiled regular expression. Its words
+# are factored by prefix into a trie, such as t(?:hu(?:rsday)?|...), so that
+# matching a word does not try each of them in turn.
+WORDS = {
+    **{key.lower(): value for key, value in due_options.items() if key and not key.isdigit()},
+    "june": "jun",
+    "eow": "week",
+    "eom": "month",
+    "eoy": "year",
+}
+UNITS = {
+    "d": "days", "day": "days", "days": "days",
+    "w": "weeks", "wk": "weeks", "wks": "weeks", "week": "weeks", "weeks": "weeks",
+    "m": "months", "mo": "months", "mos": "months", "month": "months", "months": "months",
+    "y": "years", "yr": "years", "yrs": "years", "year": "years", "years": "years",
+}
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+END_OF_DAY = time(23, 59, 59)
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Return a regular expression matching any of words, factored by prefix."""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node: Dict[str, Any]) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            return f"(?:{body})?"
+        return body
+
+    return pattern(trie)
+
+
+@lru_cache(maxsize=None)
+def due_pattern() -> "re.Pattern[str]":
+    """Return the compiled due string pattern, compiled on first use to keep startup fast."""
+    return re.compile(rf"""
+    (?P<iso>\d{{4}}-\d{{2}}-\d{{2}})
+    | (?P<year>\d{{4}})
+    | (?P<date>\d{{1,2}})
+    | (?:in\s+|\+)(?P<count>\d+)\s*(?P<unit>{_trie_pattern(UNITS)})
+    | end\s+of\s+(?:the\s+)?(?P<end>week|month|year)
+    | (?P<next>next\s+)?(?P<word>{_trie_pattern(WORDS)})
+    """, re.VERBOSE)
+
+
+def _days_in_month(year: int, month: int) -> int:
+    return (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+
+
+def _add_months(day: date, months: int) -> date:
+    """Return day moved by months, on the last day of shorter months."""
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, _days_in_month(year, month)))
+
+
+def _month_end(day: date) -> date:
+    return day.replace(day=_days_in_month(day.year, day.month))
+
+
+def _word_day(word: str, today: date, following: bool) -> date:
+    """Return the day of a due_options word, in the next week, month or year if following."""
+    if word == "today":
+        if following:
+            raise ValueError("next takes a weekday, week, month or year")
+        return today
+    if word == "tomorrow":
+        if following:
+            raise ValueError("next takes a weekday, week, month or year")
+        return today + timedelta(days=1)
+    if word in WEEKDAYS:
+        weekday = WEEKDAYS.index(word)
+        if following:
+            # that day of the week after this one, which starts on Monday
+            return today + timedelta(days=7 - today.weekday() + weekday)
+        return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+    if word == "week":
+        # on a Sunday, this week is the one starting tomorrow
+        sunday = today + timedelta(days=(6 - today.weekday()) % 7 or 7)
+        return sunday + timedelta(days=7) if following else sunday
+    if word == "month":
+        return _month_end(_add_months(today, 1) if following else today)
+    if word == "year":
+        return date(today.year + following, 12, 31)
+    if following:
+        raise ValueError("next takes a weekday, week, month or year")
+    month = MONTHS.index(word) + 1
+    year = today.year if month >= today.month else today.year + 1
+    return _month_end(date(year, month, 1))
+
+
+def _date_day(number: int, today: date) -> date:
+    """Return the next day numbered number, from today on."""
+    if not 1 <= number <= 31:
+        raise ValueError(f"there is no day {number} in a month")
+    month = today.replace(day=1)
+    if number < today.day:
+        month = _add_months(month, 1)
+    while number > _days_in_month(month.year, month.month):
+        month = _add_months(month, 1)
+    return month.replace(day=number)
 
-def sort_due(due: str) -> datetime:
+
+@lru_cache(maxsize=4096)
+def _resolve(due: str, today: date) -> Optional[datetime]:
+    match = due_pattern().fullmatch(due)
+    if match is None:
+        return None
+    if match["iso"] is not None:
+        return datetime.combine(date.fromisoformat(due), END_OF_DAY)
+    if match["year"] is not None:
+        day = date(int(match["year"]), 12, 31)
+    elif match["date"] is not None:
+        day = _date_day(int(match["date"]), today)
+    elif match["count"] is not None:
+        count, unit = int(match["count"]), UNITS[match["unit"]]
+        if unit == "days":
+            day = today + timedelta(days=count)
+        elif unit == "weeks":
+            day = today + timedelta(weeks=count)
+        else:
+            day = _add_months(today, count * (12 if unit == "years" else 1))
+    elif match["end"] is not None:
+        day = _word_day(match["end"], today, False)
+    else:
+        day = _word_day(WORDS[match["word"]], today, match["next"] is not None)
+    return datetime.combine(day, END_OF_DAY)
+
+
+def parse_due(due: str, now: Optional[datetime] = None) -> datetime:
     """
-    Maps a string representation of the due date to its
-    analogue in datetime format according to developer defifined
-    options. 
+    Maps a due string to a datetime, at the end of its day unless it is an
+    ISO date and time: the words of due_options, a day of the month, a
+    year, an ISO date, "next fri", "next month", "in 3 days", "+2w" or
+    "end of month". Any other string is read as an ISO date and time.
+    now is the current time, datetime.now() by default. Results are
+    memoized per string and day. Raises ValueError for what is not a due
+    date.
     """
+    today = (now or datetime.now()).date()
+    resolved = _resolve(" ".join(due.lower().split()), today)
+    if resolved is None:
+        try:
+            return datetime.fromisoformat(due.strip())
+        except ValueError:
+            raise ValueError(f"{due!r} is not a due date") from None
+    return resolved
 
-    val = due_options[due]
-    mapped = map_options[val]
-    if mapped == "today":
-        return ToDoDate().due_today()
-    elif mapped == "tomorrow":
-        return ToDoDate().due_tomorrow()
-    elif mapped == "day":
-        return ToDoDate().due_weekday(map_weekday(val))
-    elif mapped == "this_week":
-        return ToDoDate().due_weekday(7)
-    elif mapped == "month":
-        return ToDoDate().due_month(map_month(val))
-    elif mapped == "date":
-        return ToDoDate().due_date(int(val))
-    elif mapped == "this_month":
-        return ToDoDate().due_this_month()
-    elif mapped == "year":
-        return ToDoDate().due_year(int(val))
-    elif mapped == "this_year":
-        return ToDoDate().due_this_year()
-    
-    
+
+def sort_due(due: str, now: Optional[datetime] = None) -> datetime:
+    """
+    Maps a string representation of the due date to its analogue in
+    datetime format, see parse_due.
+    """
+    return parse_due(due, now)
+
+
+month_names = (
+    "january",
+    "february",
+    "march",
+    "april",
+    "may",
+    "june",
+    "july",
+    "august",
+    "september",
+    "october",
+    "november",
+    "december"
+)
+
+def bucket_offsets() -> list:
+    """
+    Returns the offsets from now of the bounds of the time buckets that
+    move with it, as relativedelta, the month bounds between the last two
+    excepted.
+    """
+    from dateutil.relativedelta import relativedelta
+
+    return [
+        relativedelta(years=-5),
+        relativedelta(),
+        relativedelta(days=1),
+        relativedelta(days=2),
+        relativedelta(days=7),
+        relativedelta(months=1),
+        relativedelta(years=1),
+    ]
+
+
+def time_buckets(now: datetime) -> Tuple[List[datetime], List[Optional[str]]]:
+    """
+    Returns the sorted bounds of the list time buckets and their labels.
+    A due date d belongs to labels[i] when bounds[i-1] <= d < bounds[i],
+    i.e. labels[bisect_right(bounds, d)]. labels[0] stands for dates before
+    the first bound and is None, the same as dates past the last bound.
+    """
+    from dateutil.relativedelta import relativedelta
+
+    *offsets, year_offset = bucket_offsets()
+    bounds = [now + offset for offset in offsets]
+    labels = [None, "outdated", "today", "tomorrow", "this week", "this month"]
+
+    year_end = now + year_offset
+    month = bounds[-1].replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_end = month + relativedelta(months=1)
+    while month_end < year_end:
+        bounds.append(month_end)
+        labels.append(month_names[month.month - 1])
+        month, month_end = month_end, month_end + relativedelta(months=1)
+
+    bounds.append(year_end)
+    labels.append("this year")
+    return bounds, labels
 
 
 class ToDoDate():
@@ -263,7 +370,9 @@ class ToDoDate():
     weekday: int = None
     month: int = None
     year: int = None
-    def __init__(self, d: datetime = datetime.now()) -> None:
+    def __init__(self, d: Optional[datetime] = None) -> None:
+        # a default of datetime.now() would be the time of the first import
+        d = d or datetime.now()
         self.date = int(d.strftime("%d"))
         self.weekday = int(d.strftime("%w"))
         self.month = int(d.strftime("%m"))
@@ -310,6 +419,7 @@ class ToDoDate():
             return new_obj.due_date(date+1)         
 
     def due_month(self, month: int):
+        from dateutil.relativedelta import relativedelta
         if month >= self.month:
             diff = month - self.month + 1
         else: 
@@ -323,6 +433,7 @@ class ToDoDate():
         return self.due_month(month=self.month)
 
     def due_year(self, year: int):
+        from dateutil.relativedelta import relativedelta
         diff = year - self.year + 1
         return self.due(
             relativedelta(months=diff),
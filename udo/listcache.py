@@ -0,0 +1,104 @@
+"""This module provides the RP UDo rendered list cache.
+
+The output of `rptodo list` is kept in the app directory together with the
+key it was rendered for. The key has to be computed without opening the
+database, so it is built from the files themselves: the change counter in
+the database header, plus the size and mtime of the database and of its
+write-ahead log. In WAL mode SQLite does not bump the header counter on
+commit, and PRAGMA data_version only reports changes made by other
+connections, so the log is part of the key too.
+
+The time buckets move with the current time, so a listing is stored with
+the time its first to-do changes bucket, and is not reused past it.
+"""
+
+from datetime import date, datetime
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from udo import __version__, config
+
+CACHE_FILE_NAME = "list-cache"
+
+# offsets in the SQLite database and WAL headers
+DB_CHANGE_COUNTER = slice(24, 28)
+WAL_CHECKPOINT_AND_SALTS = slice(12, 24)
+
+
+def cache_path() -> Path:
+    return config.CONFIG_FILE_PATH.parent / CACHE_FILE_NAME
+
+
+def _file_state(path: Path, header: slice) -> str:
+    try:
+        with path.open("rb") as file:
+            head = file.read(header.stop)[header]
+            stat = os.fstat(file.fileno())
+    except FileNotFoundError:
+        return "-"
+    return f"{head.hex()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def db_version(db_path: Path) -> str:
+    """Return a string that changes whenever the database content does."""
+    wal_path = db_path.with_name(db_path.name + "-wal")
+    return "|".join((
+        _file_state(db_path, DB_CHANGE_COUNTER),
+        _file_state(wal_path, WAL_CHECKPOINT_AND_SALTS),
+    ))
+
+
+def cache_key(
+    db_path: Path,
+    columns: int,
+    completed: bool,
+    today: Optional[date] = None,
+    view: str = "",
+) -> str:
+    """
+    Key of the list of db_path as rendered for these options and day. view
+    stands for the options that select and order the rows.
+    """
+    today = today or date.today()
+    parts = (
+        __version__,
+        str(db_path.resolve()),
+        db_version(db_path),
+        str(columns),
+        str(int(completed)),
+        today.isoformat(),
+        view,
+    )
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def load(key: str, now: Optional[datetime] = None) -> Optional[str]:
+    """Return the cached output if it was stored under key and has not expired."""
+    try:
+        with cache_path().open(encoding="utf-8") as file:
+            stored, _, expires = file.readline().rstrip("\n").partition(" ")
+            if stored != key:
+                return None
+            if expires and datetime.fromisoformat(expires) <= (now or datetime.now()):
+                return None
+            return file.read()
+    except (FileNotFoundError, UnicodeDecodeError, ValueError):
+        return None
+
+
+def store(key: str, output: str, expires: Optional[datetime] = None) -> None:
+    """Store output under key, until expires if given."""
+    path = cache_path()
+    scratch = path.with_name(f"{path.name}.{os.getpid()}")
+    head = key if expires is None else f"{key} {expires.isoformat()}"
+    try:
+        scratch.write_text(f"{head}\n{output}", encoding="utf-8")
+        os.replace(scratch, path)
+    except OSError:
+        # a missing cache only costs the next run its speed
+        try:
+            scratch.unlink()
+        except OSError:
+            pass
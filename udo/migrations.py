@@ -0,0 +1,222 @@
+"""This module provides the RP UDo database schema migrations."""
+
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Connection, Engine, MetaData
+
+from udo import concurrency
+
+# Each migration upgrades the schema from the previous version to its own
+# one. They also run right after create_all on new databases, so they must
+# be written to be no-ops on a schema that already has their changes.
+
+
+def _add_todo_indexes(connection: Connection) -> None:
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_todo_done_due ON todo (done, due)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_todo_priority_due ON todo (priority, due)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_todo_due ON todo (due)"
+    )
+
+
+def has_fts5(connection: Connection) -> bool:
+    options = connection.exec_driver_sql("PRAGMA compile_options").scalars().all()
+    return "ENABLE_FTS5" in options
+
+
+def search_schema(table: str) -> Tuple[str, ...]:
+    """
+    Return the statements that create the search index {table}_fts. It
+    indexes the descriptions of table without a copy of them, and the
+    triggers keep it in step with every write, including bulk ones.
+    """
+    return (
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+            description,
+            content='{table}',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {table}_fts (rowid, description) VALUES (new.id, new.description);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, description)
+            VALUES ('delete', old.id, old.description);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF description ON {table} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, description)
+            VALUES ('delete', old.id, old.description);
+            INSERT INTO {table}_fts (rowid, description) VALUES (new.id, new.description);
+        END""",
+    )
+
+
+SEARCH_SCHEMA = search_schema("todo")
+ARCHIVE_SEARCH_SCHEMA = search_schema("todo_archive")
+
+# todo_stats holds the count and the total progress of the to-dos of each
+# due day, priority and done, so that rptodo stats reads one row per day
+# instead of every to-do. The triggers keep it in step with every write.
+_STATS_KEY = "day = date({row}.due) AND priority = {row}.priority AND done = {row}.done"
+_STATS_ADD = """INSERT INTO todo_stats (day, priority, done, count, progress)
+            VALUES (date(new.due), new.priority, new.done, 1, new.progress)
+            ON CONFLICT (day, priority, done) DO UPDATE
+            SET count = count + 1, progress = progress + excluded.progress;"""
+_STATS_REMOVE = f"""UPDATE todo_stats SET count = count - 1, progress = progress - old.progress
+            WHERE {_STATS_KEY.format(row="old")};
+            DELETE FROM todo_stats WHERE {_STATS_KEY.format(row="old")} AND count = 0;"""
+
+STATS_SCHEMA = (
+    f"""CREATE TRIGGER IF NOT EXISTS todo_stats_insert AFTER INSERT ON todo BEGIN
+            {_STATS_ADD}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS todo_stats_delete AFTER DELETE ON todo BEGIN
+            {_STATS_REMOVE}
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS todo_stats_update
+        AFTER UPDATE OF priority, done, progress, due ON todo BEGIN
+            {_STATS_REMOVE}
+            {_STATS_ADD}
+        END""",
+)
+
+# todo_stats as it should be, from the to-dos themselves
+STATS_QUERY = """SELECT date(due) AS day, priority, done, count(*) AS count,
+    sum(progress) AS progress
+    FROM todo GROUP BY date(due), priority, done"""
+
+
+def rebuild_search_index(
+    connection: Connection, table: str = "todo", schema: Optional[str] = None
+) -> None:
+    """Index every description of table, in the attached schema if given, again."""
+    index = f"{schema}.{table}_fts" if schema else f"{table}_fts"
+    connection.exec_driver_sql(f"INSERT INTO {index} ({table}_fts) VALUES ('rebuild')")
+
+
+def rebuild_stats(connection: Connection) -> None:
+    """Fill todo_stats again from the to-dos."""
+    connection.exec_driver_sql("DELETE FROM todo_stats")
+    connection.exec_driver_sql(
+        f"INSERT INTO todo_stats (day, priority, done, count, progress) {STATS_QUERY}"
+    )
+
+
+def _add_todo_search(connection: Connection) -> None:
+    # without FTS5 the database stays usable, only search is not
+    if not has_fts5(connection):
+        return
+    for statement in SEARCH_SCHEMA:
+        connection.exec_driver_sql(statement)
+    rebuild_search_index(connection)
+
+
+def _uses_autoincrement(connection: Connection, table: str) -> bool:
+    sql = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).scalar()
+    return "AUTOINCREMENT" in sql.upper()
+
+
+TODO_COLUMNS = "id, description, priority, done, progress, due"
+
+
+def _add_todo_archive(connection: Connection) -> None:
+    # create_all makes todo_archive itself. Archived to-dos keep their IDs,
+    # so todo must never hand them out again, which takes AUTOINCREMENT, and
+    # SQLite can only add it by copying the table
+    if not _uses_autoincrement(connection, "todo"):
+        connection.exec_driver_sql(
+            """CREATE TABLE todo_autoincrement (
+                id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+                description VARCHAR(240) NOT NULL,
+                priority INTEGER NOT NULL,
+                done INTEGER NOT NULL,
+                progress INTEGER NOT NULL,
+                due DATETIME NOT NULL
+            )"""
+        )
+        connection.exec_driver_sql(
+            f"INSERT INTO todo_autoincrement ({TODO_COLUMNS}) SELECT {TODO_COLUMNS} FROM todo"
+        )
+        # this drops the indexes and the triggers of todo as well, while
+        # todo_fts still matches the copy, which has the same IDs
+        connection.exec_driver_sql("DROP TABLE todo")
+        connection.exec_driver_sql("ALTER TABLE todo_autoincrement RENAME TO todo")
+        _add_todo_indexes(connection)
+        if has_fts5(connection):
+            for statement in SEARCH_SCHEMA[1:]:
+                connection.exec_driver_sql(statement)
+
+    if has_fts5(connection):
+        for statement in ARCHIVE_SEARCH_SCHEMA:
+            connection.exec_driver_sql(statement)
+        rebuild_search_index(connection, "todo_archive")
+
+
+def _add_todo_series(connection: Connection) -> None:
+    # create_all makes todo_series and todo_series_exception, there is
+    # nothing to change in the existing tables
+    pass
+
+
+def _add_todo_shards(connection: Connection) -> None:
+    # create_all makes todo_shard, empty until the archive is rebalanced
+    pass
+
+
+def _add_todo_stats(connection: Connection) -> None:
+    # create_all makes todo_stats, which is filled from the existing to-dos
+    for statement in STATS_SCHEMA:
+        connection.exec_driver_sql(statement)
+    rebuild_stats(connection)
+
+
+MIGRATIONS: List[Tuple[int, Callable[[Connection], None]]] = [
+    (1, _add_todo_indexes),
+    (2, _add_todo_search),
+    (3, _add_todo_archive),
+    (4, _add_todo_series),
+    (5, _add_todo_shards),
+    (6, _add_todo_stats),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(connection: Connection) -> int:
+    """Return the schema version recorded in the database file."""
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(engine: Engine, metadata: MetaData) -> int:
+    """
+    Bring the database behind engine up to SCHEMA_VERSION in place.
+    Missing tables are created from metadata, then every pending migration
+    runs in one write transaction and PRAGMA user_version is bumped.
+    Returns the version the database was at before.
+    """
+
+    with engine.connect() as connection:
+        version = get_version(connection)
+        connection.rollback()
+        if version >= SCHEMA_VERSION:
+            return version
+
+        # take the write lock before reading the version again, so that two
+        # processes upgrading the same file do not both run the migrations
+        connection.execution_options(**{concurrency.WRITE_OPTION: True})
+        version = get_version(connection)
+        metadata.create_all(connection)
+        for target, upgrade in MIGRATIONS:
+            if target > version:
+                upgrade(connection)
+        connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        connection.commit()
+    return version
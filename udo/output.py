@@ -0,0 +1,135 @@
+"""This module provides the RP UDo output streams.
+
+Long output is written as it is produced, in chunks, and through $PAGER
+(less by default) when standard output is a terminal. For scripts, records
+are written as JSON, JSON Lines or TSV, one record per line and without
+styles.
+"""
+
+from datetime import date, datetime
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import typer
+
+DEFAULT_PAGER = "less"
+# quit if the output fits the screen, keep the colors, leave the screen as is
+DEFAULT_LESS = "FRX"
+
+# characters per write, the first chunk small so that it shows up at once
+FIRST_CHUNK_SIZE = 4 * 1024
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = ("json", "jsonl", "tsv")
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def chunked(lines: Iterable[str]) -> Iterator[str]:
+    """Join lines into chunks of text, each line ending with a newline."""
+    chunk: List[str] = []
+    size = 0
+    threshold = FIRST_CHUNK_SIZE
+    for line in lines:
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= threshold:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+            size = 0
+            threshold = CHUNK_SIZE
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _tsv_field(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(_value(value)).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def format_records(records: Iterable[Dict[str, Any]], fmt: str) -> Iterator[str]:
+    """
+    Yield the lines of records in fmt. json is an array with one record per
+    line, and tsv starts with a header of the keys of the first record.
+    """
+    encode = _encoder.encode
+    if fmt == "jsonl":
+        for record in records:
+            yield encode({key: _value(value) for key, value in record.items()})
+    elif fmt == "json":
+        line = None
+        for record in records:
+            if line is None:
+                yield "["
+            else:
+                yield line + ","
+            line = encode({key: _value(value) for key, value in record.items()})
+        yield "[]" if line is None else line + "\n]"
+    elif fmt == "tsv":
+        keys = None
+        for record in records:
+            if keys is None:
+                keys = list(record)
+                yield "\t".join(keys)
+            yield "\t".join(_tsv_field(record.get(key)) for key in keys)
+    else:
+        raise ValueError(f"unknown format {fmt!r}")
+
+
+def pager_command() -> Optional[List[str]]:
+    """Return the pager to run, or None when there is none."""
+    command = shlex.split(os.environ.get("PAGER", DEFAULT_PAGER))
+    if not command or shutil.which(command[0]) is None:
+        return None
+    return command
+
+
+def write(chunks: Iterable[str], pager: bool = True) -> bool:
+    """
+    Write chunks to standard output, through the pager when it is a
+    terminal. Returns False if the pager was quit before the end.
+    """
+    command = pager_command() if pager and sys.stdout.isatty() else None
+    if command is None:
+        for chunk in chunks:
+            typer.echo(chunk, nl=False)
+        return True
+
+    env = dict(os.environ)
+    env.setdefault("LESS", DEFAULT_LESS)
+    process = subprocess.Popen(
+        command, stdin=subprocess.PIPE, env=env, encoding="utf-8", errors="replace"
+    )
+    complete = True
+    try:
+        for chunk in chunks:
+            process.stdin.write(chunk)
+        process.stdin.close()
+    except BrokenPipeError:
+        complete = False
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+    # the pager handles ^C itself, so wait for it to exit
+    while True:
+        try:
+            process.wait()
+            break
+        except KeyboardInterrupt:
+            pass
+    return complete
@@ -0,0 +1,150 @@
+"""This module provides the RP UDo profiling instrumentation.
+
+Profiling is off unless start() was called, and then the helpers below
+record where a command spends its time: the self time of named phases, the
+SQL statements run by the engines created afterwards, and the number of rows
+hydrated from them.
+"""
+
+import contextlib
+import json
+from pathlib import Path
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+SLOWEST_STATEMENT_LENGTH = 200
+
+
+class Profile:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.statements = 0
+        self.sql_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = ""
+        self.rows = 0
+        # [name, start, time spent in nested phases]
+        self._stack: List[list] = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        entry = [name, time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - entry[1]
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - entry[2]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def add_statement(self, statement: str, elapsed: float) -> None:
+        self.statements += 1
+        self.sql_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = " ".join(statement.split())
+
+    def as_dict(self) -> Dict[str, Any]:
+        end = self.finished or time.perf_counter()
+        return {
+            "total": end - self.started,
+            "phases": dict(self.phases),
+            "sql": {
+                "statements": self.statements,
+                "total": self.sql_time,
+                "slowest": self.slowest_time,
+                "slowest_statement": self.slowest_statement,
+            },
+            "rows": self.rows,
+        }
+
+    def report(self) -> str:
+        data = self.as_dict()
+        lines = [f"{name:<12} {seconds * 1000:9.1f} ms" for name, seconds in data["phases"].items()]
+        lines.append(f"{'total':<12} {data['total'] * 1000:9.1f} ms")
+        sql = data["sql"]
+        lines.append(
+            f"sql: {sql['statements']} statements, {sql['total'] * 1000:.1f} ms total, "
+            f"slowest {sql['slowest'] * 1000:.1f} ms"
+        )
+        if sql["slowest_statement"]:
+            lines.append(f"  {sql['slowest_statement'][:SLOWEST_STATEMENT_LENGTH]}")
+        lines.append(f"rows hydrated: {data['rows']}")
+        return "\n".join(lines)
+
+
+_current: Optional[Profile] = None
+_cprofile = None
+
+
+def start(cprofile: bool = False) -> Profile:
+    """Start profiling the process, with cProfile too if asked."""
+    global _current, _cprofile
+    _current = Profile()
+    if cprofile:
+        import cProfile
+
+        _cprofile = cProfile.Profile()
+        _cprofile.enable()
+    return _current
+
+
+def stop(output: Optional[Path] = None) -> Optional[Profile]:
+    """
+    Stop profiling and return the profile. A JSON trace is written to an
+    output ending in .json, the cProfile statistics to any other output.
+    """
+    global _current, _cprofile
+    profile, _current = _current, None
+    if profile is None:
+        return None
+    profile.finished = time.perf_counter()
+    if _cprofile is not None:
+        _cprofile.disable()
+        if output is not None and output.suffix != ".json":
+            _cprofile.dump_stats(output)
+        _cprofile = None
+    if output is not None and output.suffix == ".json":
+        output.write_text(json.dumps(profile.as_dict(), indent=2) + "\n")
+    return profile
+
+
+def active() -> bool:
+    return _current is not None
+
+
+def phase(name: str):
+    """Time the enclosed block as the phase name, when profiling."""
+    if _current is None:
+        return contextlib.nullcontext()
+    return _current.phase(name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("udo_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["udo_query_start"].pop()
+    if _current is not None:
+        _current.add_statement(statement, elapsed)
+
+
+def instrument(engine) -> None:
+    """Collect the statements of engine, when profiling."""
+    if _current is None:
+        return
+    from sqlalchemy import event
+
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def count_rows(count: int) -> None:
+    if _current is not None:
+        _current.rows += count
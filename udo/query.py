@@ -0,0 +1,422 @@
+"""This module provides the RP UDo to-do selection: ID lists and filters.
+
+An ID list is a comma separated list of IDs and ranges, such as 3,7,10-42.
+A filter combines comparisons on the columns of the todo table with and, or,
+not and parentheses, such as "priority>=2 and (progress<50 or due<fri)". Due
+values take the due_options vocabulary or ISO dates. A sort is a comma
+separated list of columns, descending when prefixed with -. Parsing is plain
+Python, and only compiling into SQLAlchemy clauses needs it. A search is a
+list of words, "quoted phrases" and prefix* words that must all occur in
+the description.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+import re
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+FIELDS = ("id", "description", "priority", "done", "progress", "due")
+OPERATORS = ("<=", ">=", "!=", "==", "=", "<", ">", "~")
+
+TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<op><=|>=|!=|==|=|<|>|~)
+      | (?P<paren>[()])
+      | "(?P<string>[^"]*)"
+      | (?P<word>[^\s<>=!~"()]+)
+    )""",
+    re.VERBOSE,
+)
+
+
+SEARCH_TERM = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+class QueryError(ValueError):
+    pass
+
+
+class Comparison(NamedTuple):
+    field: str
+    op: str
+    value: Union[int, str]
+
+
+class And(NamedTuple):
+    terms: Tuple
+
+
+class Or(NamedTuple):
+    terms: Tuple
+
+
+class Not(NamedTuple):
+    term: Any
+
+
+class SortKey(NamedTuple):
+    field: str
+    descending: bool
+
+
+def parse_id_spec(spec: str) -> List[Tuple[int, int]]:
+    """
+    Return the sorted (first, last) ranges of an ID list. The ranges typed
+    as first-last are merged where they overlap or touch, and each ID typed
+    on its own stays a range of its own, so that it is reported if missing.
+    """
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        try:
+            first = int(first)
+            last = int(last) if sep else first
+        except ValueError:
+            raise QueryError(f"{part!r} is not an ID or a range of IDs") from None
+        if first < 1 or last < first:
+            raise QueryError(f"{part!r} is not a valid range of IDs")
+        ranges.append((first, last))
+    if not ranges:
+        raise QueryError("no ID given")
+
+    merged = []
+    for first, last in sorted(ranges):
+        if first == last:
+            continue
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    singles = {(first, last) for first, last in ranges if first == last}
+    return sorted(merged + list(singles))
+
+
+def missing_ranges(ranges: List[Tuple[int, int]], found: Iterable[int]) -> List[Tuple[int, int]]:
+    """
+    Return the (first, last) ranges of IDs that no to-do was found for at
+    the ends of ranges, or the whole range if none was. Gaps between found
+    IDs, such as a deleted to-do, are not missing.
+    """
+    found = sorted(found)
+    missing = []
+    for first, last in ranges:
+        start = bisect_left(found, first)
+        end = bisect_right(found, last)
+        if start == end:
+            missing.append((first, last))
+            continue
+        if found[start] > first:
+            missing.append((first, found[start] - 1))
+        if found[end - 1] < last:
+            missing.append((found[end - 1] + 1, last))
+    return missing
+
+
+def _tokens(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise QueryError(f"cannot read the filter from {text[position:]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the tokens of a filter, lowest precedence first."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens = _tokens(text)
+        self.position = 0
+
+    def peek(self) -> Tuple[str, str]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return ("end", "")
+
+    def next(self) -> Tuple[str, str]:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def keyword(self, word: str) -> bool:
+        kind, value = self.peek()
+        if kind == "word" and value.lower() == word:
+            self.position += 1
+            return True
+        return False
+
+    def parse(self):
+        tree = self.disjunction()
+        if self.peek()[0] != "end":
+            raise QueryError(f"expected 'and' or 'or' instead of {self.peek()[1]!r}")
+        return tree
+
+    def disjunction(self):
+        terms = [self.conjunction()]
+        while self.keyword("or"):
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else Or(tuple(terms))
+
+    def conjunction(self):
+        terms = [self.negation()]
+        while self.keyword("and"):
+            terms.append(self.negation())
+        return terms[0] if len(terms) == 1 else And(tuple(terms))
+
+    def negation(self):
+        if self.keyword("not"):
+            return Not(self.negation())
+        if self.peek() == ("paren", "("):
+            self.position += 1
+            tree = self.disjunction()
+            if self.next() != ("paren", ")"):
+                raise QueryError(f"missing ) in {self.text!r}")
+            return tree
+        return self.comparison()
+
+    def comparison(self) -> Comparison:
+        (field_kind, field), (op_kind, op), (value_kind, value) = (
+            self.next(), self.next(), self.next()
+        )
+        if field_kind == "end":
+            raise QueryError(f"incomplete comparison in {self.text!r}")
+        if field_kind != "word" or field.lower() not in FIELDS:
+            raise QueryError(f"unknown field {field!r}, use one of: {', '.join(FIELDS)}")
+        if op_kind != "op":
+            raise QueryError(f"expected an operator after {field!r}")
+        if value_kind not in ("word", "string"):
+            raise QueryError(f"expected a value after {field}{op}")
+        return _comparison(field.lower(), op, value)
+
+
+def parse(text: str):
+    """Parse a filter expression into its syntax tree."""
+    return _Parser(text).parse()
+
+
+def _comparison(field: str, op: str, value: str) -> Comparison:
+    op = "=" if op == "==" else op
+    if op == "~" and field != "description":
+        raise QueryError("~ only applies to the description")
+    if field in ("id", "priority", "done", "progress"):
+        try:
+            return Comparison(field, op, int(value))
+        except ValueError:
+            raise QueryError(f"{field} takes a number, not {value!r}") from None
+    if field == "due":
+        from udo.due_options import parse_due
+
+        try:
+            parse_due(value)
+        except (KeyError, ValueError):
+            raise QueryError(f"{value!r} is not a due date") from None
+    return Comparison(field, op, value)
+
+
+def compile_where(tree):
+    """Return the SQLAlchemy where clause of a parsed filter."""
+    import sqlalchemy as sqla
+
+    from udo.database import ToDo
+    from udo.due_options import parse_due
+
+    if isinstance(tree, And):
+        return sqla.and_(*(compile_where(term) for term in tree.terms))
+    if isinstance(tree, Or):
+        return sqla.or_(*(compile_where(term) for term in tree.terms))
+    if isinstance(tree, Not):
+        return sqla.not_(compile_where(tree.term))
+
+    field, op, value = tree
+    column = getattr(ToDo, field)
+    if field == "due":
+        value = parse_due(value)
+    if op == "~":
+        return column.contains(value, autoescape=True)
+    if op == "=":
+        return column == value
+    if op == "!=":
+        return column != value
+    if op == "<":
+        return column < value
+    if op == "<=":
+        return column <= value
+    if op == ">":
+        return column > value
+    return column >= value
+
+
+def compile_predicate(tree) -> Callable[[Any], bool]:
+    """
+    Return a function telling whether a row passes a parsed filter, as the
+    where clause of compile_where would, for rows that are not in the
+    database. A field that is None fails every comparison, like NULL.
+    """
+    if isinstance(tree, (And, Or)):
+        predicates = [compile_predicate(term) for term in tree.terms]
+        combine = all if isinstance(tree, And) else any
+        return lambda row: combine(predicate(row) for predicate in predicates)
+    if isinstance(tree, Not):
+        predicate = compile_predicate(tree.term)
+        return lambda row: not predicate(row)
+
+    field, op, value = tree
+    if field == "due":
+        from udo.due_options import parse_due
+
+        value = parse_due(value)
+    if op == "~":
+        # LIKE ignores the case of ASCII letters
+        value = value.lower()
+        compare = lambda actual: value in actual.lower()
+    else:
+        compare = {
+            "=": lambda actual: actual == value,
+            "!=": lambda actual: actual != value,
+            "<": lambda actual: actual < value,
+            "<=": lambda actual: actual <= value,
+            ">": lambda actual: actual > value,
+            ">=": lambda actual: actual >= value,
+        }[op]
+
+    def predicate(row) -> bool:
+        actual = getattr(row, field)
+        return actual is not None and compare(actual)
+
+    return predicate
+
+
+def due_range(tree) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Return the window after <= due < before outside which no row passes a
+    parsed filter, with None for an open end. It is read from the due
+    comparisons the filter requires, and is wider than needed otherwise.
+    """
+    if isinstance(tree, And):
+        after, before = None, None
+        for term in tree.terms:
+            term_after, term_before = due_range(term)
+            if term_after is not None:
+                after = term_after if after is None else max(after, term_after)
+            if term_before is not None:
+                before = term_before if before is None else min(before, term_before)
+        return after, before
+    if isinstance(tree, Or):
+        ranges = [due_range(term) for term in tree.terms]
+        afters = [after for after, _ in ranges]
+        befores = [before for _, before in ranges]
+        return (
+            None if None in afters else min(afters),
+            None if None in befores else max(befores),
+        )
+    if isinstance(tree, Comparison) and tree.field == "due" and tree.op != "!=":
+        from udo.due_options import parse_due
+
+        value = parse_due(tree.value)
+        just_after = value + timedelta(microseconds=1)
+        if tree.op == "<":
+            return None, value
+        if tree.op == "<=":
+            return None, just_after
+        if tree.op == "=":
+            return value, just_after
+        return value, None
+    return None, None
+
+
+def parse_sort(spec: str) -> List[SortKey]:
+    """Parse a sort such as "priority,-due" into its keys."""
+    keys = []
+    for part in spec.split(","):
+        part = part.strip()
+        descending = part.startswith("-")
+        field = part.lstrip("+-").lower()
+        if field not in FIELDS:
+            raise QueryError(f"cannot sort by {part!r}, use one of: {', '.join(FIELDS)}")
+        keys.append(SortKey(field, descending))
+    return keys
+
+
+def compile_order_by(keys: List[SortKey]) -> list:
+    """Return the order_by clauses of a parsed sort, with the ID last."""
+    from udo.database import ToDo
+
+    clauses = [
+        getattr(ToDo, field).desc() if descending else getattr(ToDo, field)
+        for field, descending in keys
+    ]
+    if "id" not in [field for field, _ in keys]:
+        clauses.append(ToDo.id)
+    return clauses
+
+
+class _Descending:
+    """A sort value in reverse order."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other) -> bool:
+        return other.value < self.value
+
+
+def sort_key(keys: List[SortKey]) -> Callable[[Any], tuple]:
+    """
+    Return the key that orders rows as the clauses of compile_order_by do,
+    for merging rows read in that order by several queries.
+    """
+    if "id" not in [field for field, _ in keys]:
+        keys = [*keys, SortKey("id", False)]
+
+    def key(row) -> tuple:
+        return tuple(
+            _Descending(getattr(row, field)) if descending else getattr(row, field)
+            for field, descending in keys
+        )
+
+    return key
+
+
+def ids_clause(ranges: List[Tuple[int, int]]):
+    """Return the where clause selecting the IDs of ranges."""
+    import sqlalchemy as sqla
+
+    from udo.database import ToDo
+
+    singles = [first for first, last in ranges if first == last]
+    clauses = [ToDo.id.between(first, last) for first, last in ranges if first != last]
+    if singles:
+        clauses.append(ToDo.id.in_(singles))
+    return sqla.or_(*clauses)
+
+
+def fts_query(text: str) -> str:
+    """
+    Return the FTS5 query of a search. Every term is quoted, so that
+    punctuation and the FTS5 keywords are matched as plain text.
+    """
+    terms = []
+    for phrase, word in SEARCH_TERM.findall(text):
+        prefix = word.endswith("*")
+        term = (phrase or word.rstrip("*")).strip()
+        if not term:
+            continue
+        term = '"' + term.replace('"', '""') + '"'
+        terms.append(term + "*" if prefix else term)
+    if not terms:
+        raise QueryError("nothing to search for")
+    return " ".join(terms)
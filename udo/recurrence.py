@@ -0,0 +1,111 @@
+"""This module provides the RP UDo recurring to-dos.
+
+A series is stored once, with the due date of its first occurrence and a
+rule in the words of due_options: day, week, month, year, or weekdays such
+as mon,thu. Its occurrences are never stored. They are computed for the
+window being listed by jumping straight to the first one in the window, so
+the work follows the size of the window and not the age of the series.
+Completing an occurrence stores it as an exception of its series.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from udo.due_options import due_options, map_weekday
+
+FREQUENCIES = {"today": "daily", "week": "weekly", "month": "monthly", "year": "yearly"}
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+class RecurrenceError(ValueError):
+    pass
+
+
+class Rule(NamedTuple):
+    frequency: str
+    # datetime.weekday() numbers, only for weekly rules on given days
+    weekdays: Tuple[int, ...] = ()
+
+
+def parse_rule(text: str) -> Rule:
+    """Parse a rule such as "week", "day" or "mon,thu"."""
+    words = [word.strip() for word in text.split(",") if word.strip()]
+    options = [due_options.get(word, due_options.get(word.lower())) for word in words]
+    if len(options) == 1 and options[0] in FREQUENCIES:
+        return Rule(FREQUENCIES[options[0]])
+    if options and all(option in WEEKDAYS for option in options):
+        weekdays = sorted({map_weekday(option) - 1 for option in options})
+        return Rule("weekly", tuple(weekdays))
+    raise RecurrenceError(
+        f"cannot repeat every {text!r}, use day, week, month, year or weekdays such as mon,thu"
+    )
+
+
+def _add_months(start: datetime, months: int) -> datetime:
+    from dateutil.relativedelta import relativedelta
+
+    # counted from the start every time, so that a series due on the 31st
+    # is due on the last day of the shorter months and on the 31st again
+    return start + relativedelta(months=months)
+
+
+def horizon(rule: Rule, start: datetime, after: datetime, count: int) -> datetime:
+    """
+    Return a time before which the series from start has at least count
+    occurrences from after on, to end a window that must hold them, or
+    datetime.max if the calendar ends first.
+    """
+    base = max(after, start)
+    try:
+        if rule.frequency == "daily":
+            return base + timedelta(days=count)
+        if rule.frequency == "weekly":
+            return base + timedelta(weeks=count)
+        per_step = 1 if rule.frequency == "monthly" else 12
+        return _add_months(base, (count + 1) * per_step)
+    except (OverflowError, ValueError):
+        return datetime.max
+
+
+def occurrences(
+    rule: Rule,
+    start: datetime,
+    after: datetime,
+    before: datetime,
+    until: Optional[datetime] = None,
+) -> Iterator[datetime]:
+    """
+    Yield the due dates of the series from start that fall in the window
+    after <= due < before, and not past until.
+    """
+    if until is not None and until < before:
+        before = until + timedelta(microseconds=1)
+    after = max(after, start)
+    if after >= before:
+        return
+
+    if rule.frequency in ("daily", "weekly") and not rule.weekdays:
+        step = timedelta(days=1 if rule.frequency == "daily" else 7)
+        # the first occurrence at or after the window, without the ones before
+        due = start + step * -((start - after) // step)
+        while due < before:
+            yield due
+            due += step
+    elif rule.weekdays:
+        day = timedelta(days=1)
+        due = start + day * -((start - after) // day)
+        while due < before:
+            if due.weekday() in rule.weekdays:
+                yield due
+            due += day
+    else:
+        per_step = 1 if rule.frequency == "monthly" else 12
+        months = (after.year - start.year) * 12 + after.month - start.month
+        count = max(months // per_step - 1, 0)
+        while True:
+            due = _add_months(start, count * per_step)
+            if due >= before:
+                break
+            if due >= after:
+                yield due
+            count += 1
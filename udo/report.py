@@ -0,0 +1,160 @@
+"""This module provides the RP UDo planning reports.
+
+The to-dos are read as NumPy arrays of their due, priority, done and
+progress columns, in one pass over the rows, and the reports are computed
+from the arrays without a Python loop over the to-dos. NumPy is optional:
+only rptodo report and Todoer.to_arrays need it.
+
+The database records no dates of completion, so the weekly report counts
+the to-dos by due week. Completed are the done ones of the week, and
+remaining are the open ones due by the end of the week.
+"""
+
+import csv
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import numpy
+
+FORMATS = ("table", "csv")
+
+# weeks of the rolling completion rate
+ROLLING_WEEKS = 4
+# upper bounds of the overdue ages, in days
+AGE_BOUNDS = (1, 7, 30, 90, 365)
+
+
+class ReportError(Exception):
+    pass
+
+
+def _numpy():
+    try:
+        import numpy
+    except ModuleNotFoundError as error:
+        raise ReportError("Reports need NumPy, install it with: pip install numpy") from error
+    return numpy
+
+
+def to_arrays(rows: Iterable[Tuple[int, int, int, int]]) -> Dict[str, "numpy.ndarray"]:
+    """
+    Return the columns of rows of (due as Unix seconds, priority, done,
+    progress) as arrays, due as datetime64[s].
+    """
+    np = _numpy()
+    table = np.fromiter(
+        rows, dtype=[("due", "i8"), ("priority", "i1"), ("done", "i1"), ("progress", "i1")]
+    )
+    return {
+        "due": table["due"].astype("datetime64[s]"),
+        "priority": table["priority"],
+        "done": table["done"],
+        "progress": table["progress"],
+    }
+
+
+def weekly(
+    todos: Dict[str, "numpy.ndarray"],
+    open_todos: Dict[str, "numpy.ndarray"],
+    now: datetime,
+    weeks: int,
+) -> List[Dict[str, Any]]:
+    """
+    Return a row for each week from weeks before the week of now to weeks
+    after it: the to-dos due that week and the completed ones among them,
+    the completion rate over the last ROLLING_WEEKS weeks, and the open
+    to-dos due by the end of the week with the work left on them, in
+    to-dos. todos are the to-dos due in those weeks, open_todos all the
+    open ones.
+    """
+    np = _numpy()
+    week = np.timedelta64(7, "D")
+    start = np.datetime64(now.date()) - weeks * week
+    edges = (start + np.arange(2 * weeks + 2) * week).astype("datetime64[s]")
+
+    index = np.searchsorted(edges, todos["due"], side="right") - 1
+    inside = (index >= 0) & (index < len(edges) - 1)
+    index = index[inside]
+    due = np.bincount(index, minlength=len(edges) - 1)
+    done = np.bincount(index, weights=todos["done"][inside] != 0, minlength=len(edges) - 1)
+
+    # sums over the last ROLLING_WEEKS weeks, from the running totals
+    due_sum = np.cumsum(due)
+    done_sum = np.cumsum(done)
+    due_sum[ROLLING_WEEKS:] = due_sum[ROLLING_WEEKS:] - due_sum[:-ROLLING_WEEKS]
+    done_sum[ROLLING_WEEKS:] = done_sum[ROLLING_WEEKS:] - done_sum[:-ROLLING_WEEKS]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(due_sum > 0, done_sum / due_sum, np.nan)
+
+    order = np.argsort(open_todos["due"], kind="stable")
+    open_due = open_todos["due"][order]
+    left = np.concatenate(([0.0], np.cumsum((100 - open_todos["progress"][order]) / 100)))
+    remaining = np.searchsorted(open_due, edges[1:], side="left")
+
+    return [
+        {
+            "week": str(edges[i].astype("datetime64[D]")),
+            "due": int(due[i]),
+            "completed": int(done[i]),
+            "completion_rate": None if np.isnan(rate[i]) else round(float(rate[i]), 3),
+            "remaining": int(remaining[i]),
+            "remaining_work": round(float(left[remaining[i]]), 2),
+        }
+        for i in range(len(edges) - 1)
+    ]
+
+
+def overdue_ages(open_todos: Dict[str, "numpy.ndarray"], now: datetime) -> List[Dict[str, Any]]:
+    """
+    Return the open to-dos past their due date by how long they are
+    overdue, with the mean progress of each age.
+    """
+    np = _numpy()
+    now = np.datetime64(now, "s")
+    overdue = open_todos["due"] < now
+    ages = (now - open_todos["due"][overdue]) / np.timedelta64(1, "D")
+    bounds = np.array([0, *AGE_BOUNDS, np.inf])
+    index = np.searchsorted(bounds, ages, side="right") - 1
+    counts = np.bincount(index, minlength=len(bounds) - 1)
+    progress = np.bincount(
+        index, weights=open_todos["progress"][overdue], minlength=len(bounds) - 1
+    )
+    labels = [f"{low:g}-{high:g} days" for low, high in zip(bounds[:-2], bounds[1:-1])]
+    labels.append(f"over {AGE_BOUNDS[-1]} days")
+    return [
+        {
+            "overdue": label,
+            "open": int(count),
+            "mean_progress": round(float(total / count), 1) if count else None,
+        }
+        for label, count, total in zip(labels, counts, progress)
+    ]
+
+
+def format_rows(rows: List[Dict[str, Any]], fmt: str) -> Iterator[str]:
+    """Yield the lines of rows as an aligned table or as CSV with a header."""
+    if not rows:
+        return
+    if fmt == "csv":
+        writer = csv.writer(_Lines())
+        yield writer.writerow(rows[0].keys())
+        for row in rows:
+            yield writer.writerow(["" if value is None else value for value in row.values()])
+        return
+    cells = [list(rows[0].keys())] + [
+        ["-" if value is None else str(value) for value in row.values()] for row in rows
+    ]
+    widths = [max(len(line[column]) for line in cells) for column in range(len(cells[0]))]
+    for line in cells:
+        yield "  ".join(
+            cell.ljust(width) if column == 0 else cell.rjust(width)
+            for column, (cell, width) in enumerate(zip(line, widths))
+        ).rstrip()
+
+
+class _Lines:
+    """A file for csv.writer whose write returns the line instead."""
+
+    def write(self, line: str) -> str:
+        return line.rstrip("\r\n")
@@ -0,0 +1,107 @@
+"""This module provides the RP UDo per-year shards of the archive.
+
+`rptodo rebalance` splits the archive of a database into one SQLite file per
+due year, next to it, such as _todo.2023.sqlite, and archive_todos writes
+into those files from then on. The main file lists them in todo_shard and
+keeps the open to-dos. A shard is attached to a connection, as shard_2023,
+only when the due window of a query overlaps its year. IDs are still handed
+out by todo in the main file only, so they stay unique across the files.
+SQLite attaches at most MAX_ATTACHED databases to a connection, so the
+years that a read or a rebuild spans are split into groups, each read on
+a connection or written in a transaction of its own, see groups.
+
+Moving rows between files is atomic in each file but not across them in
+WAL mode. Rows are copied before they are deleted, and copied over any
+earlier copy, so a move cut short is completed by the next one.
+"""
+
+from datetime import datetime
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Connection, Table, create_engine
+from sqlalchemy.pool import NullPool
+
+from udo import migrations
+
+# SQLite attaches at most 10 databases to a connection unless built otherwise
+MAX_ATTACHED = 10
+
+
+def schema_name(year: int) -> str:
+    return f"shard_{year}"
+
+
+def shard_path(db_path: Path, year: int) -> Path:
+    """Return the file of the shard of year, next to the database file."""
+    return db_path.with_name(f"{db_path.stem}.{year}{db_path.suffix}")
+
+
+def overlapping(
+    years: Iterable[int], after: Optional[datetime] = None, before: Optional[datetime] = None
+) -> List[int]:
+    """Return the years whose shard may hold a due date in after <= due < before."""
+    return sorted(
+        year for year in years
+        if (after is None or year >= after.year)
+        and (before is None or datetime(year, 1, 1) < before)
+    )
+
+
+def groups(years: List[int]) -> List[List[int]]:
+    """
+    Split the sorted years into the groups of at most MAX_ATTACHED that are
+    attached together, earliest first. There is one group, maybe empty, at least.
+    """
+    return [years[start:start + MAX_ATTACHED] for start in range(0, len(years), MAX_ATTACHED)] or [[]]
+
+
+def create(path: Path, archive: Table) -> None:
+    """Create the shard file at path, with an empty archive and its search index."""
+    engine = create_engine("sqlite:///" + os.path.abspath(path), poolclass=NullPool)
+    try:
+        with engine.begin() as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+            archive.create(connection, checkfirst=True)
+            if migrations.has_fts5(connection):
+                for statement in migrations.search_schema(archive.name):
+                    connection.exec_driver_sql(statement)
+    finally:
+        engine.dispose()
+
+
+def attach(connection: Connection, db_path: Path, years: Iterable[int]) -> None:
+    """
+    Attach the shards of years to connection, which keeps them for its next
+    uses. The shards it holds for other years are detached first if SQLite
+    would not take more.
+    """
+    years = list(years)
+    attached = connection.info.setdefault("udo_shards", set())
+    missing = [year for year in years if year not in attached]
+    if not missing:
+        return
+    if len(attached) + len(missing) > MAX_ATTACHED:
+        for year in attached - set(years):
+            connection.exec_driver_sql(f"DETACH DATABASE {schema_name(year)}")
+            attached.discard(year)
+    for year in missing:
+        connection.exec_driver_sql(
+            f"ATTACH DATABASE ? AS {schema_name(year)}", (str(shard_path(db_path, year)),)
+        )
+        attached.add(year)
+
+
+def detach_all(connection: Connection) -> None:
+    """
+    Detach every shard of connection, before it begins a write transaction,
+    which holds the attached databases from its start and could not detach
+    them for other years.
+    """
+    attached = connection.info.get("udo_shards")
+    if attached:
+        for year in sorted(attached):
+            connection.exec_driver_sql(f"DETACH DATABASE {schema_name(year)}")
+        attached.clear()
+        connection.commit()
@@ -0,0 +1,134 @@
+"""This module provides the RP UDo import and export formats."""
+
+import csv
+from datetime import datetime
+from itertools import islice
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from udo.due_options import parse_due
+
+FORMATS = ("jsonl", "csv", "todo.txt")
+FIELDS = ("id", "description", "priority", "done", "progress", "due")
+
+# todo.txt has letter priorities, (A) being the first one
+PRIORITY_LETTERS = {1: "A", 2: "B", 3: "C"}
+LETTER_PRIORITIES = {letter: priority for priority, letter in PRIORITY_LETTERS.items()}
+
+TODO_TXT_LINE = re.compile(
+    r"^(?P<done>x )?"
+    r"(?:\d{4}-\d{2}-\d{2} )?"
+    r"(?:\((?P<priority>[A-Z])\) )?"
+    r"(?:\d{4}-\d{2}-\d{2} )?"
+    r"(?P<text>.*)$"
+)
+TODO_TXT_TAG = re.compile(r"(?:^|\s)(?P<key>due|progress):(?P<value>\S+)")
+
+
+def guess_format(file_name: str) -> Optional[str]:
+    """Return the format matching the extension of file_name, if any."""
+    if file_name.endswith(".jsonl") or file_name.endswith(".ndjson"):
+        return "jsonl"
+    if file_name.endswith(".csv"):
+        return "csv"
+    if file_name.endswith(".txt"):
+        return "todo.txt"
+    return None
+
+
+def read_records(file: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield the raw records of file, one at a time."""
+    if fmt == "jsonl":
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == "csv":
+        yield from csv.DictReader(file)
+    elif fmt == "todo.txt":
+        for line in file:
+            if line.strip():
+                yield _parse_todo_txt(line.strip())
+    else:
+        raise ValueError(f"Unknown format {fmt!r}")
+
+
+def _parse_todo_txt(line: str) -> Dict[str, Any]:
+    match = TODO_TXT_LINE.match(line)
+    record = {"done": 1 if match["done"] else 0}
+    if match["priority"] in LETTER_PRIORITIES:
+        record["priority"] = LETTER_PRIORITIES[match["priority"]]
+    for tag in TODO_TXT_TAG.finditer(match["text"]):
+        record[tag["key"]] = tag["value"]
+    record["description"] = TODO_TXT_TAG.sub("", match["text"]).strip()
+    return record
+
+
+def normalize(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Turn raw records into rows of the todo table. Due strings are resolved
+    through parse_due, whose bounded cache keeps the memory of a run flat
+    however many distinct dues it has.
+    """
+    # one day for the whole run, even if it goes past midnight
+    now = datetime.now()
+
+    def resolve_due(due: Any) -> datetime:
+        if isinstance(due, datetime):
+            return due
+        if due in (None, ""):
+            due = "today"
+        return parse_due(due, now)
+
+    for record in records:
+        yield {
+            "description": str(record["description"]),
+            "priority": int(record.get("priority") or 2),
+            "done": int(record.get("done") or 0),
+            "progress": int(record.get("progress") or 0),
+            "due": resolve_due(record.get("due")),
+        }
+
+
+def batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group rows into lists of at most size rows."""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_records(file: TextIO, fmt: str, todos: Iterable[Dict[str, Any]]) -> int:
+    """Write todos to file as they come and return how many were written."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+    for todo in todos:
+        due = todo["due"].isoformat(sep=" ") if todo["due"] is not None else ""
+        if fmt == "jsonl":
+            file.write(json.dumps({**todo, "due": due}) + "\n")
+        elif fmt == "csv":
+            writer.writerow({**todo, "due": due})
+        elif fmt == "todo.txt":
+            file.write(_format_todo_txt(todo) + "\n")
+        else:
+            raise ValueError(f"Unknown format {fmt!r}")
+        count += 1
+    return count
+
+
+def _format_todo_txt(todo: Dict[str, Any]) -> str:
+    parts = []
+    if todo["done"]:
+        parts.append("x")
+    if todo["priority"] in PRIORITY_LETTERS:
+        parts.append(f"({PRIORITY_LETTERS[todo['priority']]})")
+    parts.append(todo["description"])
+    if todo["due"] is not None:
+        parts.append(f"due:{todo['due'].date().isoformat()}")
+    if todo["progress"]:
+        parts.append(f"progress:{todo['progress']}")
+    return " ".join(parts)
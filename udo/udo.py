@@ -1,12 +1,29 @@
 """This module provides the RP UDo model-controller."""
 
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, NamedTuple
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 from udo import DB_READ_ERROR, ID_ERROR
-from udo.database import DatabaseHandler
+from udo import transfer
 
-from udo.due_options import sort_due
+from udo.due_options import parse_due, sort_due
+
+
+class ReadError(Exception):
+    """A streamed read failed, where the other reads return DB_READ_ERROR."""
+
+
+class TodoRow(NamedTuple):
+    """A listed to-do, as read from the database without the ORM."""
+    id: int
+    description: str
+    priority: int
+    done: int
+    progress: int
+    due: Optional[datetime] = None
+    # occurrences of a recurring series have no ID of their own
+    series: Optional[int] = None
 
 
 class CurrentTodo(NamedTuple):
@@ -14,8 +31,48 @@ class CurrentTodo(NamedTuple):
     error: int
 
 
+class BulkResult(NamedTuple):
+    todo_list: List[Dict[str, Any]]
+    missing: List[Tuple[int, int]]
+    error: int
+
+
+class SearchResult(NamedTuple):
+    todo_list: List[Dict[str, Any]]
+    error: int
+
+
+class ImportResult(NamedTuple):
+    count: int
+    error: int
+
+
+class StatsRow(NamedTuple):
+    """The to-dos of a list bucket with the same priority and done."""
+    bucket: str
+    priority: int
+    done: int
+    count: int
+    # the total, to be divided by count
+    progress: int
+
+
+class StatsResult(NamedTuple):
+    stats: List[StatsRow]
+    error: int
+
+
+class StatsCheck(NamedTuple):
+    differences: List[Dict[str, Any]]
+    error: int
+
+
 class Todoer:
     def __init__(self, db_path: Path) -> None:
+        # imported here so that the daemon client can use this module
+        # without loading SQLAlchemy
+        from udo.database import DatabaseHandler
+
         self._db_handler = DatabaseHandler(db_path)
 
     def add(
@@ -40,18 +97,167 @@ class Todoer:
             "due": sorted_due
         }
         write = self._db_handler.write_todos([todo])
-        return CurrentTodo(todo, write.error)
+        return CurrentTodo(write.todo_list[0], write.error)
+
+    def add_series(
+        self,
+        description: List[str],
+        every: str,
+        priority: int = 2,
+        due: str = "today",
+        until: Optional[str] = None,
+        ) -> CurrentTodo:
+        """Add a to-do repeating every rule, first due on due."""
+        description_text = " ".join(description)
+        if not description_text.endswith("."):
+            description_text += "."
+
+        series = {
+            "description": description_text,
+            "priority": priority,
+            "rule": every,
+            "start": parse_due(due),
+            "until": parse_due(until) if until is not None else None,
+        }
+        write = self._db_handler.write_series(series)
+        return CurrentTodo(write.todo, write.error)
+
+    def complete_occurrence(self, series_id: int, on: Optional[str] = None) -> CurrentTodo:
+        """Complete the occurrence of a series due on, or its next open one."""
+        day = parse_due(on) if on is not None else None
+        response = self._db_handler.complete_occurrence(series_id, day)
+        return CurrentTodo(response.todo, response.error)
+
+    def remove_series(self, series_id: int) -> CurrentTodo:
+        """Remove a recurring to-do and all of its occurrences."""
+        response = self._db_handler.delete_series(series_id)
+        return CurrentTodo(response.todo, response.error)
 
-    def get_todo_list(self) -> List[Dict[str, Any]]:
+    def import_todos(
+        self,
+        records: Iterable[Dict[str, Any]],
+        batch_size: int = 1000
+        ) -> ImportResult:
+        """Add records to the database in batches, as they are read."""
+        batches = transfer.batched(transfer.normalize(records), batch_size)
+        write = self._db_handler.write_todo_batches(batches)
+        return ImportResult(write.count, write.error)
+
+    def export_todos(self) -> Iterator[Dict[str, Any]]:
+        """Yield every to-do of the database, including its due date."""
+        return self._db_handler.stream_todos()
+
+    def to_arrays(
+        self,
+        completed: bool = True,
+        after: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Return the due, priority, done and progress of the to-dos due in
+        after <= due < before as NumPy arrays, see udo.report.
+        """
+        from udo import report
+
+        return report.to_arrays(self._db_handler.stream_columns(completed, after, before))
+
+    def get_todo_list(self) -> List[TodoRow]:
         """Return the current to-do list."""
         read = self._db_handler.read_todos()
         return read.todo_list
 
-    def get_sorted_todo_list(self, completed: bool) -> List[tuple[str, List[Dict[str, Any]]]]:
+    def get_sorted_todo_list(
+        self,
+        completed: bool,
+        where: Optional[str] = None
+        ) -> List[tuple[str, List[TodoRow]]]:
         """Return the current SORTED to-do list."""
-        read = self._db_handler.read_and_sort_todos(completed)
+        read = self._db_handler.read_and_sort_todos(completed, where)
         return read.todo_list
 
+    def stream_sorted_todo_list(
+        self,
+        completed: bool,
+        where: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+        ) -> Iterator[tuple[str, TodoRow]]:
+        """Yield (bucket, to-do) in the order of the SORTED to-do list."""
+        return self._db_handler.stream_sorted_todos(completed, where, limit, offset)
+
+    def next_bucket_change(self, completed: bool, where: Optional[str] = None) -> Optional[datetime]:
+        """Return when a to-do of the list moves to another bucket today, if one does."""
+        return self._db_handler.next_bucket_change(completed, where)
+
+    def stream_todo_list(
+        self,
+        completed: bool,
+        where: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+        ) -> Iterator[TodoRow]:
+        """Yield the to-dos matching where, ordered by sort."""
+        return self._db_handler.stream_query_todos(completed, where, sort, limit, offset)
+
+    def query_todo_list(
+        self,
+        completed: bool,
+        where: Optional[str] = None,
+        sort: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+        ) -> List[TodoRow]:
+        """Return the to-dos matching where, ordered by sort."""
+        read = self._db_handler.query_todos(completed, where, sort, limit, offset)
+        return read.todo_list
+
+    def search(
+        self,
+        text: str,
+        completed: bool = False,
+        bucket: Optional[str] = None,
+        limit: int = 50
+        ) -> SearchResult:
+        """Return the to-dos matching the search text, best match first."""
+        response = self._db_handler.search_todos(text, completed, bucket, limit)
+        return SearchResult(*response)
+
+    def reindex(self) -> ImportResult:
+        """Rebuild the search index and return the number of to-dos in it."""
+        response = self._db_handler.rebuild_search_index()
+        return ImportResult(*response)
+
+    def archive(self, older_than: int) -> ImportResult:
+        """
+        Move the completed to-dos due more than older_than days ago out of
+        the list table and return how many were moved.
+        """
+        before = datetime.now() - timedelta(days=older_than)
+        response = self._db_handler.archive_todos(before)
+        return ImportResult(*response)
+
+    def stats(self) -> StatsResult:
+        """Return the counts of the live to-dos per list bucket, priority and done."""
+        response = self._db_handler.read_stats()
+        return StatsResult(*response)
+
+    def check_stats(self) -> StatsCheck:
+        """
+        Count the to-dos again and return where the counts kept by stats
+        differed, which are then repaired.
+        """
+        response = self._db_handler.check_stats()
+        return StatsCheck(*response)
+
+    def rebalance(self) -> ImportResult:
+        """
+        Move the archive into one file per due year and return how many
+        to-dos were moved.
+        """
+        response = self._db_handler.rebalance_archive()
+        return ImportResult(*response)
+
     def set_done(self, todo_id: int) -> CurrentTodo:
         """Set a to-do as done."""
         response = self._db_handler.update_todo(todo_id, done=1, progress=100)
@@ -67,14 +273,12 @@ class Todoer:
         due: str = None
         ) -> CurrentTodo:
         """Update a to-do."""
-
-        print('description = ', description)
         if description != []:
             description_text = " ".join(description)
         else:
             description_text = None
 
-        sorted_due = sort_due(due)
+        sorted_due = sort_due(due) if due is not None else None
 
         todo = {
             "description": description_text,
@@ -97,6 +301,41 @@ class Todoer:
 
         return CurrentTodo(response.todo, response.error)
 
+    def find_todos(self, ranges=None, where: Optional[str] = None) -> BulkResult:
+        """Return the to-dos with an ID in ranges that match the filter where."""
+        response = self._db_handler.select_todos(ranges, where)
+        return BulkResult(*response)
+
+    def set_done_many(self, ranges=None, where: Optional[str] = None) -> BulkResult:
+        """Set the selected to-dos as done."""
+        response = self._db_handler.update_todos(ranges, where, done=1, progress=100)
+        return BulkResult(*response)
+
+    def update_many(
+        self,
+        ranges=None,
+        where: Optional[str] = None,
+        priority: int = None,
+        done: int = None,
+        progress: int = None,
+        due: str = None
+        ) -> BulkResult:
+        """Update the selected to-dos."""
+        todo = {
+            "priority": priority,
+            "done": done,
+            "progress": progress,
+            "due": sort_due(due) if due is not None else None
+        }
+        kwargs = {key: value for key, value in todo.items() if value is not None}
+        response = self._db_handler.update_todos(ranges, where, **kwargs)
+        return BulkResult(*response)
+
+    def remove_many(self, ranges=None, where: Optional[str] = None) -> BulkResult:
+        """Remove the selected to-dos."""
+        response = self._db_handler.delete_todos(ranges, where)
+        return BulkResult(*response)
+
     def remove_all(self) -> CurrentTodo:
         """Remove all to-dos from the database."""
         response = self._db_handler.delete_all()